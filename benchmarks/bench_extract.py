@@ -0,0 +1,220 @@
+"""
+Extract throughput benchmarks.
+
+Runs the extract functions against a synthetic ToteSys database (fake_totesys.FakeConnection)
+and moto S3, and reports rows/sec, bytes/sec and peak RSS for each case and scale factor.
+Every case runs in a fresh process so peak RSS is measured per case.
+
+    python benchmarks/bench_extract.py --scales 10000 100000 1000000
+    python benchmarks/bench_extract.py --cases initial_extract_streaming --scales 10000000
+
+The scale factor is the row count of the large tables (sales_order, transaction, payment,
+purchase_order). Peak RSS includes moto, which keeps every uploaded object in memory.
+"""
+
+from pathlib import Path
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path[:0] = [
+    str(Path(__file__).resolve().parent),
+    str(Path(__file__).resolve().parents[1] / "src" / "extract"),
+    str(Path(__file__).resolve().parents[1] / "src" / "common"),
+]
+
+DATA_BUCKET = "will-ingested-data-bucket"
+CODE_BUCKET = "will-code-bucket"
+DEFAULT_SCALES = [10_000, 100_000]
+
+
+def s3_setup():
+    """Starts moto and creates the extract buckets, returning the mock and an S3 client."""
+    from moto import mock_aws
+    import boto3
+
+    mock = mock_aws()
+    mock.start()
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket=DATA_BUCKET)
+    s3_client.create_bucket(Bucket=CODE_BUCKET)
+    return mock, s3_client
+
+
+def stored_bytes(s3_client, bucket=DATA_BUCKET):
+    """Total size of the objects in bucket."""
+    paginator = s3_client.get_paginator("list_objects_v2")
+    return sum(
+        obj["Size"]
+        for page in paginator.paginate(Bucket=bucket)
+        for obj in page.get("Contents", [])
+    )
+
+
+def extract_case(environment, continuous=False):
+    """Builds a case running initial_extract or continuous_extract under environment."""
+
+    def case(scale):
+        from fake_totesys import FakeConnection, created_at, table_sizes
+        import extract
+
+        os.environ.update(environment)
+        mock, s3_client = s3_setup()
+        conn = FakeConnection(scale)
+        sizes = table_sizes(scale)
+
+        if continuous:
+            # Only the newest 10% of every table is past its watermark
+            since = {table: int(size * 0.9) for table, size in sizes.items()}
+            watermarks = {
+                table: str(created_at(index - 1)) for table, index in since.items()
+            }
+            s3_client.put_object(
+                Body=str(created_at(0)), Bucket=CODE_BUCKET, Key="last_extracted.txt"
+            )
+            s3_client.put_object(
+                Body=json.dumps(watermarks), Bucket=CODE_BUCKET, Key="watermarks.json"
+            )
+            rows = sum(size - since[table] for table, size in sizes.items())
+        else:
+            rows = sum(sizes.values())
+
+        def run():
+            if continuous:
+                extract.continuous_extract(s3_client, conn)
+            else:
+                extract.initial_extract(s3_client, conn)
+            return rows, stored_bytes(s3_client)
+
+        return run
+
+    return case
+
+
+def format_to_csv_case(scale):
+    from fake_totesys import FakeConnection
+    from util_functions import format_to_csv
+
+    conn = FakeConnection(scale)
+    rows = conn.run("SELECT * FROM sales_order")
+    columns = [col["name"] for col in conn.columns]
+
+    def run():
+        csv_buffer = format_to_csv(rows, columns)
+        return len(rows), len(csv_buffer.getvalue().encode("utf-8"))
+
+    return run
+
+
+def store_in_s3_case(scale):
+    from fake_totesys import FakeConnection
+    from util_functions import format_to_csv, store_in_s3
+
+    mock, s3_client = s3_setup()
+    conn = FakeConnection(scale)
+    rows = conn.run("SELECT * FROM sales_order")
+    csv_buffer = format_to_csv(rows, [col["name"] for col in conn.columns])
+
+    def run():
+        store_in_s3(s3_client, csv_buffer, DATA_BUCKET, "sales_order/bench.csv")
+        return len(rows), stored_bytes(s3_client)
+
+    return run
+
+
+CASES = {
+    "initial_extract": extract_case({}),
+    "initial_extract_streaming": extract_case({"STREAM_EXTRACT": "true"}),
+    "initial_extract_copy": extract_case({"COPY_TABLES": "*"}),
+    "initial_extract_gzip": extract_case(
+        {"STREAM_EXTRACT": "true", "EXTRACT_COMPRESSION": "gzip"}
+    ),
+    "initial_extract_parquet": extract_case(
+        {"STREAM_EXTRACT": "true", "EXTRACT_FORMAT": "parquet"}
+    ),
+    "continuous_extract": extract_case({}, continuous=True),
+    "format_to_csv": format_to_csv_case,
+    "store_in_s3": store_in_s3_case,
+}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(name, scale, results):
+    """Child process entry point: sets the case up, times it and reports the metrics."""
+    for variable in (
+        "STREAM_EXTRACT",
+        "COPY_TABLES",
+        "EXTRACT_WORKERS",
+        "EXTRACT_COMPRESSION",
+        "EXTRACT_FORMAT",
+        "SCHEMA_CATALOG",
+    ):
+        os.environ.pop(variable, None)
+
+    run = CASES[name](scale)
+    start = time.perf_counter()
+    rows, size = run()
+    elapsed = time.perf_counter() - start
+    results.put((rows, size, elapsed, peak_rss_mb()))
+
+
+def benchmark(name, scale):
+    """Runs one case at one scale in a fresh process and returns its metrics."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_case, args=(name, scale, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"Benchmark {name} failed at scale {scale}")
+    rows, size, elapsed, peak = results.get()
+    return {
+        "case": name,
+        "scale": scale,
+        "rows": rows,
+        "bytes": size,
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed,
+        "bytes_per_sec": size / elapsed,
+        "peak_rss_mb": peak,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--cases", nargs="+", choices=sorted(CASES), default=list(CASES)
+    )
+    parser.add_argument("--scales", nargs="+", type=int, default=DEFAULT_SCALES)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+    header = f"{'case':<28}{'scale':>10}{'rows':>11}{'MiB':>9}{'sec':>9}{'rows/s':>12}{'MiB/s':>9}{'peak RSS MiB':>14}"
+    print(header)
+    print("-" * len(header))
+    for scale in args.scales:
+        for name in args.cases:
+            result = benchmark(name, scale)
+            print(
+                f"{result['case']:<28}{result['scale']:>10}{result['rows']:>11}"
+                f"{result['bytes'] / 2**20:>9.1f}{result['seconds']:>9.2f}"
+                f"{result['rows_per_sec']:>12.0f}{result['bytes_per_sec'] / 2**20:>9.1f}"
+                f"{result['peak_rss_mb']:>14.0f}",
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
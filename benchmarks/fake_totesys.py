@@ -0,0 +1,265 @@
+"""
+Synthetic ToteSys database for benchmarking the extract Lambda.
+
+FakeConnection stands in for pg8000.native.Connection: it answers the statements
+the extract functions send through run() and describes each result in columns,
+generating rows on demand so even the 10M row scale needs no stored data.
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pg8000 import converters
+import csv
+import io
+import re
+
+BASE_TIMESTAMP = datetime(2022, 11, 3, 14, 20, 49)
+
+# Tables that grow with the scale factor; the rest keep a fixed reference size.
+SCALED_TABLES = {"sales_order", "transaction", "payment", "purchase_order"}
+REFERENCE_ROWS = {
+    "design": 500,
+    "address": 300,
+    "counterparty": 200,
+    "payment_type": 4,
+    "staff": 100,
+    "currency": 3,
+    "department": 8,
+}
+
+CURRENCIES = ["GBP", "USD", "EUR"]
+CITIES = ["Leeds", "Manchester", "London", "Bristol", "Glasgow", "Cardiff"]
+COUNTRIES = ["United Kingdom", "Ireland", "France", "Germany"]
+DEPARTMENTS = ["Sales", "Purchasing", "Production", "Dispatch", "Finance"]
+PAYMENT_TYPES = ["SALES_RECEIPT", "SALES_REFUND", "PURCHASE_PAYMENT", "PURCHASE_REFUND"]
+
+
+def created_at(i):
+    """Rows are created one second apart, so a timestamp maps straight to a row index."""
+    return BASE_TIMESTAMP + timedelta(seconds=i)
+
+
+def integer(name, make):
+    return (name, converters.INTEGER, -1, make)
+
+
+def text(name, make):
+    return (name, converters.STRING, -1, make)
+
+
+def numeric(name, make):
+    return (name, converters.NUMERIC, ((10 << 16) | 2) + 4, make)
+
+
+def timestamps():
+    return [
+        ("created_at", converters.TIMESTAMP, -1, created_at),
+        ("last_updated", converters.TIMESTAMP, -1, created_at),
+    ]
+
+
+TABLE_COLUMNS = {
+    "sales_order": [
+        integer("sales_order_id", lambda i: i + 1),
+        *timestamps(),
+        integer("design_id", lambda i: i % 500 + 1),
+        integer("staff_id", lambda i: i % 100 + 1),
+        integer("counterparty_id", lambda i: i % 200 + 1),
+        integer("units_sold", lambda i: 1000 + i % 90000),
+        numeric("unit_price", lambda i: Decimal(200 + i % 300) / 100),
+        integer("currency_id", lambda i: i % 3 + 1),
+        text("agreed_delivery_date", lambda i: str(created_at(i).date())),
+        text("agreed_payment_date", lambda i: str(created_at(i).date())),
+        integer("agreed_delivery_location_id", lambda i: i % 300 + 1),
+    ],
+    "design": [
+        integer("design_id", lambda i: i + 1),
+        *timestamps(),
+        text("design_name", lambda i: f"Design {i}"),
+        text("file_location", lambda i: f"/usr/share/design-{i % 50}"),
+        text("file_name", lambda i: f"design-{i}.json"),
+    ],
+    "address": [
+        integer("address_id", lambda i: i + 1),
+        text("address_line_1", lambda i: f"{i} High Street"),
+        text("address_line_2", lambda i: None if i % 3 else f"Flat {i % 20}"),
+        text("district", lambda i: None if i % 2 else "Avon"),
+        text("city", lambda i: CITIES[i % len(CITIES)]),
+        text("postal_code", lambda i: f"LS{i % 30} {i % 9}AB"),
+        text("country", lambda i: COUNTRIES[i % len(COUNTRIES)]),
+        text("phone", lambda i: f"0113 {i:07d}"),
+        *timestamps(),
+    ],
+    "counterparty": [
+        integer("counterparty_id", lambda i: i + 1),
+        text("counterparty_legal_name", lambda i: f"Counterparty {i} Ltd"),
+        integer("legal_address_id", lambda i: i % 300 + 1),
+        text("commercial_contact", lambda i: f"Contact {i}"),
+        text("delivery_contact", lambda i: f"Courier {i}"),
+        *timestamps(),
+    ],
+    "transaction": [
+        integer("transaction_id", lambda i: i + 1),
+        text("transaction_type", lambda i: "SALE" if i % 2 else "PURCHASE"),
+        integer("sales_order_id", lambda i: i + 1 if i % 2 else None),
+        integer("purchase_order_id", lambda i: None if i % 2 else i + 1),
+        *timestamps(),
+    ],
+    "payment": [
+        integer("payment_id", lambda i: i + 1),
+        *timestamps(),
+        integer("transaction_id", lambda i: i + 1),
+        integer("counterparty_id", lambda i: i % 200 + 1),
+        numeric("payment_amount", lambda i: Decimal(10000 + i % 900000) / 100),
+        integer("currency_id", lambda i: i % 3 + 1),
+        integer("payment_type_id", lambda i: i % 4 + 1),
+        ("paid", converters.BOOLEAN, -1, lambda i: bool(i % 2)),
+        text("payment_date", lambda i: str(created_at(i).date())),
+        integer("company_ac_number", lambda i: 10000000 + i % 9000),
+        integer("counterparty_ac_number", lambda i: 20000000 + i % 9000),
+    ],
+    "payment_type": [
+        integer("payment_type_id", lambda i: i + 1),
+        text("payment_type_name", lambda i: PAYMENT_TYPES[i % len(PAYMENT_TYPES)]),
+        *timestamps(),
+    ],
+    "staff": [
+        integer("staff_id", lambda i: i + 1),
+        text("first_name", lambda i: f"First{i}"),
+        text("last_name", lambda i: f"Last{i}"),
+        integer("department_id", lambda i: i % 8 + 1),
+        text("email_address", lambda i: f"staff{i}@terrifictotes.com"),
+        *timestamps(),
+    ],
+    "currency": [
+        integer("currency_id", lambda i: i + 1),
+        text("currency_code", lambda i: CURRENCIES[i % len(CURRENCIES)]),
+        *timestamps(),
+    ],
+    "department": [
+        integer("department_id", lambda i: i + 1),
+        text("department_name", lambda i: DEPARTMENTS[i % len(DEPARTMENTS)]),
+        text("location", lambda i: CITIES[i % len(CITIES)]),
+        text("manager", lambda i: f"Manager {i}"),
+        *timestamps(),
+    ],
+    "purchase_order": [
+        integer("purchase_order_id", lambda i: i + 1),
+        *timestamps(),
+        integer("staff_id", lambda i: i % 100 + 1),
+        integer("counterparty_id", lambda i: i % 200 + 1),
+        text("item_code", lambda i: f"ITEM{i % 1000:04d}"),
+        integer("item_quantity", lambda i: 1 + i % 900),
+        numeric("item_unit_price", lambda i: Decimal(100 + i % 90000) / 100),
+        integer("currency_id", lambda i: i % 3 + 1),
+        text("agreed_delivery_date", lambda i: str(created_at(i).date())),
+        text("agreed_payment_date", lambda i: str(created_at(i).date())),
+        integer("agreed_delivery_location_id", lambda i: i % 300 + 1),
+    ],
+}
+
+SELECT_PATTERN = re.compile(
+    r"SELECT \* FROM (\w+)" r"(?: WHERE (\w+) > '([^']+)'(?: AND \w+ <= '([^']+)')?)?$"
+)
+
+
+def table_sizes(scale):
+    """Row count of every table at the given scale factor."""
+    return {
+        table: scale if table in SCALED_TABLES else REFERENCE_ROWS[table]
+        for table in TABLE_COLUMNS
+    }
+
+
+def row_index(timestamp):
+    """Index of the row created at timestamp."""
+    return int((datetime.fromisoformat(timestamp) - BASE_TIMESTAMP).total_seconds())
+
+
+class FakeConnection:
+    """
+    Stand-in for pg8000.native.Connection over a synthetic ToteSys database.
+    Supports the table listing, SELECT * with optional timestamp range, MAX probes,
+    server-side cursors and COPY ... TO STDOUT statements issued by the extract Lambda.
+    """
+
+    def __init__(self, scale):
+        self.sizes = table_sizes(scale)
+        self.columns = []
+        self.row_count = -1
+        self.cursor = None
+
+    def close(self):
+        pass
+
+    def run(self, sql, stream=None, **params):
+        sql = " ".join(sql.split())
+
+        if sql.startswith("SELECT table_name FROM information_schema.tables"):
+            self.columns = [{"name": "table_name", "type_oid": converters.NAME}]
+            return [[table] for table in self.sizes]
+
+        if sql in ("SELECT 1", "COMMIT", "ROLLBACK") or sql.startswith(
+            ("START TRANSACTION", "CLOSE")
+        ):
+            return None
+
+        max_match = re.fullmatch(r"SELECT MAX\((\w+)\) FROM (\w+)", sql)
+        if max_match:
+            size = self.sizes[max_match.group(2)]
+            return [[created_at(size - 1) if size else None]]
+
+        declare_match = re.fullmatch(r"DECLARE \w+ NO SCROLL CURSOR FOR (.*)", sql)
+        if declare_match:
+            self.cursor = self._select_range(declare_match.group(1))
+            return None
+
+        fetch_match = re.fullmatch(r"FETCH FORWARD (\d+) FROM \w+", sql)
+        if fetch_match:
+            table, start, stop = self.cursor
+            end = min(start + int(fetch_match.group(1)), stop)
+            self.cursor = (table, end, stop)
+            return self._rows(table, start, end)
+
+        copy_match = re.fullmatch(r"COPY \((.*)\) TO STDOUT WITH .*", sql)
+        if copy_match:
+            table, start, stop = self._select_range(copy_match.group(1))
+            self._copy(table, start, stop, stream)
+            return None
+
+        table, start, stop = self._select_range(sql)
+        return self._rows(table, start, stop)
+
+    def _select_range(self, sql):
+        """Parses a SELECT * statement into its table and row index range."""
+        match = SELECT_PATTERN.fullmatch(sql)
+        if not match:
+            raise ValueError(f"FakeConnection cannot answer: {sql}")
+
+        table, _, since, until = match.groups()
+        size = self.sizes[table]
+        start = 0 if since is None else min(max(row_index(since) + 1, 0), size)
+        stop = size if until is None else min(max(row_index(until) + 1, 0), size)
+        return table, start, max(start, stop)
+
+    def _rows(self, table, start, stop):
+        specs = TABLE_COLUMNS[table]
+        self.columns = [
+            {"name": name, "type_oid": oid, "type_modifier": modifier}
+            for name, oid, modifier, _ in specs
+        ]
+        self.row_count = stop - start
+        makers = [make for _, _, _, make in specs]
+        return [[make(i) for make in makers] for i in range(start, stop)]
+
+    def _copy(self, table, start, stop, stream, chunk_size=10000):
+        """Writes the range as csv bytes to stream, the way Postgres COPY would."""
+        for chunk_start in range(start, stop, chunk_size):
+            rows = self._rows(table, chunk_start, min(chunk_start + chunk_size, stop))
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if chunk_start == start:
+                writer.writerow([col["name"] for col in self.columns])
+            writer.writerows(rows)
+            stream.write(buffer.getvalue().encode("utf-8"))
+        self.row_count = stop - start
@@ -0,0 +1,82 @@
+"""
+Import-time profile of the Lambda handlers.
+
+Imports each handler module in a fresh interpreter under `python -X importtime`, as a cold
+Lambda container does during its init phase, and reports the total import time and the
+slowest imports by cumulative time.
+
+    python benchmarks/importtime.py
+    python benchmarks/importtime.py --lambdas transform --top 40
+
+Each Lambda only sees its own source directory and src/common on sys.path, as in its deployment package.
+"""
+
+from pathlib import Path
+import argparse
+import os
+import subprocess
+import sys
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+LAMBDAS = {
+    "extract": "extract",
+    "transform": "transform",
+}
+
+
+def profile_imports(lambda_name):
+    """Imports the handler module of lambda_name in a fresh interpreter and returns the
+    parsed -X importtime lines as (cumulative_us, self_us, indented_module_name)."""
+    environment = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([str(SRC / lambda_name), str(SRC / "common")]),
+        AWS_DEFAULT_REGION=os.environ.get("AWS_DEFAULT_REGION", "eu-west-2"),
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {LAMBDAS[lambda_name]}"],
+        env=environment,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        imports.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return imports
+
+
+def report(lambda_name, top):
+    imports = profile_imports(lambda_name)
+    handler = LAMBDAS[lambda_name]
+    total = next(
+        cumulative for cumulative, _, name in imports if name.strip() == handler
+    )
+
+    print(f"{lambda_name}: import {handler} took {total / 1000:.1f} ms")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative, self_us, name in sorted(imports, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--lambdas", nargs="+", choices=sorted(LAMBDAS), default=sorted(LAMBDAS)
+    )
+    parser.add_argument(
+        "--top", type=int, default=25, help="number of slowest imports to list"
+    )
+    args = parser.parse_args()
+
+    for lambda_name in args.lambdas:
+        report(lambda_name, args.top)
+
+
+if __name__ == "__main__":
+    main()
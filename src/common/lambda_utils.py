@@ -0,0 +1,333 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import contextvars
+import functools
+import json
+import logging
+import os
+import resource
+import sys
+import time
+
+# CloudWatch namespace of the stage metrics and the unit of each metric, in output order
+METRICS_NAMESPACE = "TerrificTotes"
+METRIC_UNITS = {
+    "Duration": "Milliseconds",
+    "Rows": "Count",
+    "Bytes": "Bytes",
+    "PeakMemory": "Megabytes",
+}
+
+# Multipart upload part size; S3 requires at least 5 MiB for every part but the last
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+# Prefix of the code bucket that profiles of invocations are saved under, and the
+# number of allocation sites listed in each allocation report
+PROFILE_PREFIX = "diagnostics"
+PROFILE_TOP_ALLOCATIONS = 50
+
+# Table the running stage works on, inherited by the stages nested in it
+_metrics_table = contextvars.ContextVar("metrics_table", default=None)
+
+# Set while an invocation is profiled, so work that would go to thread pools runs in the profiled thread
+_profiling = contextvars.ContextVar("profiling", default=False)
+
+
+def function_name():
+    """Name of the running Lambda function, or "local" outside Lambda."""
+    return os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")
+
+
+def metrics_enabled():
+    """Stage metrics are printed when EMF_METRICS=true, which is the default inside Lambda."""
+    default = "true" if os.environ.get("AWS_LAMBDA_FUNCTION_NAME") else "false"
+    return os.environ.get("EMF_METRICS", default).lower() == "true"
+
+
+def peak_memory_mb():
+    """
+    Returns the peak resident memory of the process so far in MiB.
+    ru_maxrss only grows, so a stage reports the high-water mark reached by the time it ends.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def emit_metrics(stage, table=None, **values):
+    """
+    Prints one CloudWatch Embedded Metric Format line for a stage. CloudWatch Logs turns
+    the line into metrics of METRICS_NAMESPACE, so no PutMetricData calls are made.
+
+    Args:
+        stage (str): Name of the stage, used as the Stage dimension.
+        table (str): Table the stage worked on, used as the Table dimension when given.
+        values: Values of the METRIC_UNITS metrics. Metrics without a value are left out.
+    """
+    values = {
+        name: values[name] for name in METRIC_UNITS if values.get(name) is not None
+    }
+    dimensions = {"Function": function_name(), "Stage": stage}
+    if table:
+        dimensions["Table"] = table
+
+    record = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": METRICS_NAMESPACE,
+                    "Dimensions": [list(dimensions)],
+                    "Metrics": [
+                        {"Name": name, "Unit": METRIC_UNITS[name]} for name in values
+                    ],
+                }
+            ],
+        },
+        **dimensions,
+        **values,
+    }
+    # One write per line, so lines printed by concurrent stages never interleave
+    sys.stdout.write(json.dumps(record) + "\n")
+    sys.stdout.flush()
+
+
+@contextmanager
+def measure(stage, table=None):
+    """
+    Times a block of code and emits its duration and peak memory with emit_metrics,
+    also when the block raises. The block can add "rows" and "bytes" to the yielded dict.
+    Stages measured inside the block are reported under its table unless they name their own.
+
+    Args:
+        stage (str): Name of the stage.
+        table (str): Table the stage works on, by default the table of the enclosing stage.
+    """
+    if not metrics_enabled():
+        yield {}
+        return
+
+    table = table or _metrics_table.get()
+    token = _metrics_table.set(table)
+    metrics = {}
+    start = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        _metrics_table.reset(token)
+        emit_metrics(
+            stage,
+            table,
+            Duration=(time.perf_counter() - start) * 1000,
+            Rows=metrics.get("rows"),
+            Bytes=metrics.get("bytes"),
+            PeakMemory=peak_memory_mb(),
+        )
+
+
+def instrumented(stage):
+    """
+    Decorator that measures every call of a function as a stage (see measure).
+
+    Args:
+        stage (str): Name of the stage.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with measure(stage):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def profiling_enabled(event):
+    """An invocation is profiled when its event sets "profile" or PROFILE_INVOCATIONS=true is set."""
+    if isinstance(event, dict) and event.get("profile"):
+        return True
+    return os.environ.get("PROFILE_INVOCATIONS", "false").lower() == "true"
+
+
+def profiling_active():
+    """Whether the running invocation is profiled; thread pools should then run their work serially."""
+    return _profiling.get()
+
+
+def save_profile(s3_client, bucket_name, context, profiler, snapshot, peak):
+    """
+    Uploads the cProfile stats and the top allocations of an invocation to
+    PROFILE_PREFIX/<function>/<request id> in an AWS S3 bucket. The .pstats file loads with
+    pstats.Stats or snakeviz once downloaded.
+
+    Args:
+        s3_client: A boto3 S3 client.
+        bucket_name (str): The name of the S3 bucket to store the profile in.
+        context: The Lambda context of the invocation.
+        profiler (cProfile.Profile): The disabled profiler of the invocation.
+        snapshot (tracemalloc.Snapshot): Memory allocations at the end of the invocation.
+        peak (int): Peak traced memory of the invocation in bytes.
+    Returns:
+        list: The keys of the uploaded files.
+    """
+    import marshal
+
+    request_id = getattr(context, "aws_request_id", None) or datetime.now(
+        timezone.utc
+    ).strftime("%Y%m%dT%H%M%S%f")
+    name = getattr(context, "function_name", None) or function_name()
+    prefix = f"{PROFILE_PREFIX}/{name}/{request_id}"
+
+    profiler.create_stats()
+    allocations = snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]
+    report = [f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB"]
+    report += [str(allocation) for allocation in allocations]
+
+    files = {
+        f"{prefix}.pstats": marshal.dumps(profiler.stats),
+        f"{prefix}.allocations.txt": "\n".join(report).encode("utf-8"),
+    }
+    for key, body in files.items():
+        s3_client.put_object(
+            Body=body,
+            Bucket=bucket_name,
+            Key=key,
+            Metadata={"request-id": request_id},
+        )
+    return list(files)
+
+
+def profiled(bucket_name, get_s3_client):
+    """
+    Decorator for a Lambda handler that runs profiled invocations (see profiling_enabled)
+    under cProfile and tracemalloc and saves the results with save_profile. Other invocations
+    call the handler directly. cProfile only sees the thread it runs in (and on Python 3.12 only
+    one profiler can be active), so profiled invocations do their work serially in the handler
+    thread (see profiling_active).
+
+    Args:
+        bucket_name (str): The name of the S3 bucket to store profiles in.
+        get_s3_client: Returns the S3 client to save profiles with, called once per saved profile.
+    """
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            if not profiling_enabled(event):
+                return handler(event, context)
+
+            # Imported here so invocations that are not profiled never load them
+            import cProfile
+            import tracemalloc
+
+            profiler = cProfile.Profile()
+            token = _profiling.set(True)
+            tracemalloc.start()
+            profiler.enable()
+            try:
+                return handler(event, context)
+            finally:
+                profiler.disable()
+                _profiling.reset(token)
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                try:
+                    save_profile(
+                        get_s3_client(), bucket_name, context, profiler, snapshot, peak
+                    )
+                except Exception as e:
+                    logging.error(f"Error saving profile: {e}")
+
+        return wrapper
+
+    return decorator
+
+
+class MultipartUploadWriter:
+    """
+    Write-only file-like object that uploads everything written to it to an AWS S3
+    bucket. Data is buffered until at least part_size bytes are available and then
+    sent as one part of a multipart upload, so memory use is bounded by the part size
+    regardless of the total object size. An object that never outgrows a single part
+    is stored with a plain put_object when the writer is closed.
+
+    Args:
+        s3_client: A boto3 S3 client.
+        bucket_name (str): The name of the S3 bucket to store the file in.
+        file_name (str): The name to assign to the file in the S3 bucket.
+        part_size (int): Minimum size of every part except the last one.
+    """
+
+    def __init__(self, s3_client, bucket_name, file_name, part_size=MIN_PART_SIZE):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.file_name = file_name
+        self.part_size = part_size
+        self.upload_id = None
+        self.parts = []
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def tell(self):
+        """Total number of bytes written so far, needed by the Parquet writer."""
+        return self.position
+
+    def write(self, data):
+        self.buffer.extend(data)
+        self.position += len(data)
+        if len(self.buffer) >= self.part_size:
+            self._upload_part()
+        return len(data)
+
+    def flush(self):
+        """Parts are only uploaded once they reach part_size, so there is nothing to flush."""
+
+    def close(self):
+        """Uploads whatever is still buffered and completes the upload. Closing again does nothing."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.upload_id is None:
+            self.s3_client.put_object(
+                Body=bytes(self.buffer), Bucket=self.bucket_name, Key=self.file_name
+            )
+            self.buffer.clear()
+            return
+
+        if self.buffer:
+            self._upload_part()
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=self.file_name,
+            MultipartUpload={"Parts": self.parts},
+            UploadId=self.upload_id,
+        )
+
+    def abort(self):
+        """Discards buffered data and any parts already uploaded."""
+        self.closed = True
+        self.buffer.clear()
+        if self.upload_id is not None:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=self.file_name, UploadId=self.upload_id
+            )
+
+    def _upload_part(self):
+        if self.upload_id is None:
+            upload = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name, Key=self.file_name
+            )
+            self.upload_id = upload["UploadId"]
+
+        part_number = len(self.parts) + 1
+        response = self.s3_client.upload_part(
+            Body=bytes(self.buffer),
+            Bucket=self.bucket_name,
+            Key=self.file_name,
+            PartNumber=part_number,
+            UploadId=self.upload_id,
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self.buffer.clear()
@@ -0,0 +1,128 @@
+from botocore.exceptions import ClientError
+import json
+
+# The catalog is kept in memory between invocations of a warm Lambda container,
+# so an unchanged schema costs one fingerprint query and no S3 request.
+_catalog_cache = {}
+
+FINGERPRINT_QUERY = """SELECT md5(string_agg(table_name || '.' || column_name || ':' || data_type, ',' ORDER BY table_name, ordinal_position))
+FROM information_schema.columns
+WHERE table_schema = 'public' AND table_name != '_prisma_migrations'"""
+
+COLUMNS_QUERY = """SELECT table_name, column_name, data_type
+FROM information_schema.columns
+WHERE table_schema = 'public' AND table_name != '_prisma_migrations'
+ORDER BY table_name, ordinal_position"""
+
+PRIMARY_KEYS_QUERY = """SELECT kcu.table_name, kcu.column_name
+FROM information_schema.table_constraints tc
+JOIN information_schema.key_column_usage kcu
+ON tc.constraint_name = kcu.constraint_name AND tc.table_schema = kcu.table_schema
+WHERE tc.constraint_type = 'PRIMARY KEY' AND tc.table_schema = 'public'
+ORDER BY kcu.table_name, kcu.ordinal_position"""
+
+
+def schema_fingerprint(conn):
+    """
+    Hashes the name and type of every column in the public schema with one cheap query.
+
+    Args:
+        conn: a connection to the ToteSys database
+    Returns:
+        str: md5 hex digest that changes whenever a table or column is added, dropped or retyped
+    """
+    return conn.run(FINGERPRINT_QUERY)[0][0]
+
+
+def introspect_schema(conn):
+    """
+    Reads the table names, column names and types and primary keys of the public schema.
+
+    Args:
+        conn: a connection to the ToteSys database
+    Returns:
+        dict: table name to its 'columns' (name and data_type) and 'primary_key' column names
+    """
+    tables = {}
+    for table_name, column_name, data_type in conn.run(COLUMNS_QUERY):
+        table = tables.setdefault(table_name, {"columns": [], "primary_key": []})
+        table["columns"].append({"name": column_name, "data_type": data_type})
+
+    for table_name, column_name in conn.run(PRIMARY_KEYS_QUERY):
+        if table_name in tables:
+            tables[table_name]["primary_key"].append(column_name)
+
+    return tables
+
+
+def load_catalog(s3_client, bucket_name, file_name):
+    """
+    Reads the schema catalog from an AWS S3 bucket.
+
+    Args:
+        s3_client: A boto3 S3 client.
+        bucket_name (str): The name of the S3 bucket holding the catalog.
+        file_name (str): The name of the catalog file in the S3 bucket.
+    Returns:
+        dict: the catalog, or None if no catalog has been stored yet.
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=file_name)
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "NoSuchKey":
+            return None
+        raise
+
+    return json.loads(response["Body"].read().decode("utf-8"))
+
+
+def save_catalog(s3_client, catalog, bucket_name, file_name):
+    """
+    Writes the schema catalog to an AWS S3 bucket as JSON.
+
+    Args:
+        s3_client: A boto3 S3 client.
+        catalog (dict): the catalog with its 'fingerprint' and 'tables'.
+        bucket_name (str): The name of the S3 bucket to store the catalog in.
+        file_name (str): The name to assign to the catalog file in the S3 bucket.
+    """
+    s3_client.put_object(
+        Body=json.dumps(catalog, indent=2, sort_keys=True),
+        Bucket=bucket_name,
+        Key=file_name,
+    )
+
+
+def get_catalog(s3_client, conn, bucket_name, file_name):
+    """
+    Returns the schema catalog, re-introspecting the database only when its fingerprint changed.
+    - runs the fingerprint query
+    - returns the catalog kept by a warm container if its fingerprint still matches
+    - otherwise reads the catalog from S3 and uses it if its fingerprint matches
+    - otherwise introspects the schema and stores the new catalog in S3
+
+    Args:
+        s3_client: A boto3 S3 client.
+        conn: a connection to the ToteSys database
+        bucket_name (str): The name of the S3 bucket holding the catalog.
+        file_name (str): The name of the catalog file in the S3 bucket.
+    Returns:
+        dict: catalog with the schema 'fingerprint' and its 'tables'
+    """
+    fingerprint = schema_fingerprint(conn)
+
+    catalog = _catalog_cache.get(file_name)
+    if catalog is None or catalog["fingerprint"] != fingerprint:
+        catalog = load_catalog(s3_client, bucket_name, file_name)
+
+    if catalog is None or catalog["fingerprint"] != fingerprint:
+        catalog = {"fingerprint": fingerprint, "tables": introspect_schema(conn)}
+        save_catalog(s3_client, catalog, bucket_name, file_name)
+
+    _catalog_cache[file_name] = catalog
+    return catalog
+
+
+def clear_catalog_cache():
+    """Forgets the catalog kept in memory, so the next lookup reads it from S3 again."""
+    _catalog_cache.clear()
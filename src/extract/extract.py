@@ -1,66 +1,542 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing, nullcontext
 from datetime import datetime
+from itertools import chain
 from pg8000.exceptions import InterfaceError, DatabaseError
 from botocore.exceptions import NoCredentialsError, ClientError
 from util_functions import (
     connect,
+    create_connection_pool,
+    close_connection_pool,
     create_s3_client,
     create_file_name,
     format_to_csv,
     store_in_s3,
+    fetch_in_chunks,
+    format_chunks_to_csv,
+    stream_to_s3,
+    open_compressor,
+    COMPRESSION_EXTENSIONS,
+    STREAM_CHUNK_SIZE,
+    write_parquet_chunks,
+    load_watermarks,
+    save_watermarks,
+    load_checkpoint,
+    save_checkpoint,
+    get_warm_s3_client,
+    get_warm_connection,
+    discard_warm_connection,
+    invalidate_resources,
+)
+from catalog import get_catalog, clear_catalog_cache
+from lambda_utils import (
+    measure,
+    instrumented,
+    profiled,
+    profiling_active,
+    MultipartUploadWriter,
 )
 import logging
+import os
 
 data_bucket = "will-ingested-data-bucket"
 code_bucket = "will-code-bucket"
+watermarks_key = "watermarks.json"
+catalog_key = "catalog.json"
+checkpoint_key = "backfill_checkpoint.json"
+
+# A backfill stops and saves its checkpoint once less than this much time is left
+backfill_safety_ms = 20000
+watermark_column = "last_updated"
+# Watermark of a table that is empty when the backfill probes it, so every row
+# inserted into it later is picked up by the continuous extract
+empty_table_watermark = datetime(1970, 1, 1)
 
 logging.basicConfig(
     level=logging.ERROR, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
 
-def initial_extract(s3_client, conn):
+def streaming_enabled():
+    """Streaming extraction is switched on by setting STREAM_EXTRACT=true on the Lambda."""
+    return os.environ.get("STREAM_EXTRACT", "false").lower() == "true"
+
+
+def compression_codec():
+    """
+    Codec extracted files are compressed with, set by EXTRACT_COMPRESSION on the
+    Lambda to gzip or zstd. Returns None when compression is switched off.
+    """
+    codec = os.environ.get("EXTRACT_COMPRESSION", "none").lower()
+    if codec in ("", "none"):
+        return None
+    if codec not in COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Unsupported compression codec: {codec}")
+    return codec
+
+
+def csv_file_name(table, codec=None):
+    """Creates the file name for a csv extract, with the codec's extension appended."""
+    if codec is None:
+        return create_file_name(table)
+    return create_file_name(table, f"csv.{COMPRESSION_EXTENSIONS[codec]}")
+
+
+def stream_table(s3_client, conn, table, query):
+    """
+    Function to extract a single table in bounded memory and store it in an S3 bucket.
+    - fetches rows in fixed-size chunks from a server-side cursor
+    - encodes each chunk to csv as it arrives
+    - uploads the encoded chunks to S3 with a multipart upload
+    Nothing is uploaded when the query returns no rows. The cursor's transaction is
+    rolled back as soon as the upload fails, so the connection can be reused.
+
+        Parameters:
+            s3_client: a low-level interface for interacting with S3 buckets
+            conn: a connection to the ToteSys database
+            table: name of the table being extracted
+            query: the SELECT statement to stream
+
+        Returns: True if a file was stored, False if the table had no rows
+    """
+
+    with closing(fetch_in_chunks(conn, query)) as row_chunks:
+        first_chunk = next(row_chunks, None)
+        if first_chunk is None:
+            return False
+
+        codec = compression_codec()
+        columns = [col["name"] for col in conn.columns]
+        csv_chunks = format_chunks_to_csv(chain([first_chunk], row_chunks), columns)
+        file_name = csv_file_name(table, codec)
+        stream_to_s3(s3_client, csv_chunks, data_bucket, file_name, codec=codec)
+        return True
+
+
+def output_format():
+    """
+    File format extracted tables are written in, set by EXTRACT_FORMAT on the
+    Lambda to csv (the default) or parquet.
+    """
+    file_format = os.environ.get("EXTRACT_FORMAT", "csv").lower()
+    if file_format not in ("csv", "parquet"):
+        raise ValueError(f"Unsupported extract format: {file_format}")
+    return file_format
+
+
+def parquet_table(s3_client, conn, table, query, streaming=False):
+    """
+    Function to extract a single table as typed Parquet and store it in an S3 bucket.
+    - fetches the rows in chunks from a server-side cursor when streaming, otherwise all at once
+    - maps the Postgres column types in conn.columns to Arrow types
+    - writes each chunk of rows as a Parquet row group straight into a MultipartUploadWriter
+    Parquet pages are compressed with the EXTRACT_COMPRESSION codec, or snappy when it is unset.
+    The file keeps the create_file_name path layout with a .parquet extension.
+    Nothing is stored when the query returns no rows. When streaming, the cursor's
+    transaction is rolled back as soon as the upload fails, so the connection can be reused.
+
+        Parameters:
+            s3_client: a low-level interface for interacting with S3 buckets
+            conn: a connection to the ToteSys database
+            table: name of the table being extracted
+            query: the SELECT statement that extracts the table
+            streaming: read the table through a server-side cursor
+
+        Returns: True if a file was stored, False if the table had no rows
+    """
+
+    if streaming:
+        chunks = closing(fetch_in_chunks(conn, query))
+    else:
+        rows = conn.run(query)
+        chunks = nullcontext(
+            iter(
+                [
+                    rows[i : i + STREAM_CHUNK_SIZE]
+                    for i in range(0, len(rows), STREAM_CHUNK_SIZE)
+                ]
+            )
+        )
+
+    with chunks as row_chunks:
+        first_chunk = next(row_chunks, None)
+        if first_chunk is None:
+            return False
+
+        writer = MultipartUploadWriter(
+            s3_client, data_bucket, create_file_name(table, "parquet")
+        )
+        try:
+            write_parquet_chunks(
+                chain([first_chunk], row_chunks),
+                conn.columns,
+                writer,
+                compression=compression_codec() or "snappy",
+            )
+            writer.close()
+        except Exception:
+            writer.abort()
+            raise
+
+    return True
+
+
+def copy_tables():
+    """
+    Tables exported with copy_table, set by COPY_TABLES on the Lambda as a
+    comma-separated list of table names, or * for every table.
+    """
+    setting = os.environ.get("COPY_TABLES", "")
+    return {table.strip() for table in setting.split(",") if table.strip()}
+
+
+def copy_table(s3_client, conn, table, query):
+    """
+    Function to export a single table with Postgres COPY and store it in an S3 bucket.
+    - runs COPY (query) TO STDOUT in csv format with a header row
+    - writes the bytes produced by the server straight into a MultipartUploadWriter,
+      through a compressor when EXTRACT_COMPRESSION is set
+    Rows are never decoded into Python objects, so the Lambda does almost no per-row work.
+    Nothing is stored when the query returns no rows.
+
+        Parameters:
+            s3_client: a low-level interface for interacting with S3 buckets
+            conn: a connection to the ToteSys database
+            table: name of the table being extracted
+            query: the SELECT statement to export
+
+        Returns: True if a file was stored, False if the table had no rows
+    """
+
+    codec = compression_codec()
+    writer = MultipartUploadWriter(s3_client, data_bucket, csv_file_name(table, codec))
+    try:
+        compressor = open_compressor(writer, codec)
+        conn.run(
+            f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)",
+            stream=compressor,
+        )
+        if not conn.row_count:
+            writer.abort()
+            return False
+        if compressor is not writer:
+            compressor.close()
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+
+    return True
+
+
+def extract_workers():
+    """Number of tables extracted concurrently, set by EXTRACT_WORKERS on the Lambda. One while profiling."""
+    if profiling_active():
+        return 1
+    return max(int(os.environ.get("EXTRACT_WORKERS", "1")), 1)
+
+
+def extract_table(s3_client, conn, table, query, streaming=False):
+    """
+    Function to extract a single table and store it in an S3 bucket as csv.
+    Writes the table with parquet_table when EXTRACT_FORMAT is parquet. Otherwise
+    exports the table with copy_table when it is listed in COPY_TABLES, streams it
+    when streaming is True, or selects all rows at once.
+    When EXTRACT_COMPRESSION is set, selected rows are encoded and compressed in
+    chunks on their way to S3 rather than being formatted into one buffer first.
+    The extract is measured as the extract_table stage of the table (see measure).
+
+        Parameters:
+            s3_client: a low-level interface for interacting with S3 buckets
+            conn: a connection to the ToteSys database
+            table: name of the table being extracted
+            query: the SELECT statement that extracts the table
+            streaming: extract the table with stream_table
+
+        Returns: True if a file was stored, False if the table had no rows
+    """
+
+    with measure("extract_table", table) as metrics:
+        if output_format() == "parquet":
+            return parquet_table(s3_client, conn, table, query, streaming)
+
+        copy = copy_tables()
+        if table in copy or "*" in copy:
+            return copy_table(s3_client, conn, table, query)
+
+        if streaming:
+            return stream_table(s3_client, conn, table, query)
+
+        codec = compression_codec()
+        file_name = csv_file_name(table, codec)
+        rows = conn.run(query)
+        columns = [col["name"] for col in conn.columns]
+        metrics["rows"] = len(rows)
+
+        if rows and codec:
+            row_chunks = (
+                rows[i : i + STREAM_CHUNK_SIZE]
+                for i in range(0, len(rows), STREAM_CHUNK_SIZE)
+            )
+            csv_chunks = format_chunks_to_csv(row_chunks, columns)
+            stream_to_s3(s3_client, csv_chunks, data_bucket, file_name, codec=codec)
+            return True
+
+        if rows:
+            csv_buffer = format_to_csv(rows, columns)
+            store_in_s3(s3_client, csv_buffer, data_bucket, file_name)
+            return True
+
+        return False
+
+
+def parallel_extract(s3_client, conn, queries, workers, streaming=False):
+    """
+    Function to extract several tables concurrently on a thread pool.
+    - opens a pool of database connections alongside conn, one per worker
+    - each worker borrows a connection, extracts one table and returns the connection
+    - a failing table is logged and does not stop the other tables
+
+        Parameters:
+            s3_client: a low-level interface for interacting with S3 buckets
+            conn: a connection to the ToteSys database, used as part of the pool
+            queries: dictionary of table name to the query that extracts it
+            workers: maximum number of tables extracted at the same time
+            streaming: extract each table with stream_table
+
+        Returns: dictionary declaring success, or failure with the tables that failed
+    """
+
+    workers = min(workers, len(queries))
+    pool = create_connection_pool(workers - 1)
+    pool.put(conn)
+
+    def extract_with_pooled_connection(table):
+        pooled_conn = pool.get()
+        try:
+            return extract_table(
+                s3_client, pooled_conn, table, queries[table], streaming
+            )
+        finally:
+            pool.put(pooled_conn)
+
+    failed_tables = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(extract_with_pooled_connection, table): table
+                for table in queries
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error(f"Error extracting {futures[future]}: {e}")
+                    failed_tables.append(futures[future])
+    finally:
+        close_connection_pool(pool, keep=conn)
+
+    if failed_tables:
+        return {"result": "Failure", "failed_tables": sorted(failed_tables)}
+
+    return {"result": "Success"}
+
+
+def extract_tables(s3_client, conn, queries, streaming=False):
+    """
+    Function to extract every table in queries, one after another over conn or
+    concurrently with parallel_extract when EXTRACT_WORKERS is above one.
+
+        Parameters:
+            s3_client: a low-level interface for interacting with S3 buckets
+            conn: a connection to the ToteSys database
+            queries: dictionary of table name to the query that extracts it
+            streaming: extract each table with stream_table
+
+        Returns: dictionary declaring success or failure of upload to S3
+    """
+
+    workers = extract_workers()
+    if workers > 1 and len(queries) > 1:
+        return parallel_extract(s3_client, conn, queries, workers, streaming)
+
+    for table, query in queries.items():
+        extract_table(s3_client, conn, table, query, streaming)
+
+    return {"result": "Success"}
+
+
+def catalog_enabled():
+    """Table names come from the schema catalog when SCHEMA_CATALOG=true is set on the Lambda."""
+    return os.environ.get("SCHEMA_CATALOG", "false").lower() == "true"
+
+
+def list_tables(s3_client, conn):
+    """
+    Function to list the names of the tables to extract.
+    Reads them from the schema catalog (see catalog.get_catalog) when SCHEMA_CATALOG
+    is set, which only re-introspects the database when its schema fingerprint changes.
+    Otherwise queries information_schema.tables.
+
+        Parameters:
+            s3_client: a low-level interface for interacting with S3 buckets
+            conn: a connection to the ToteSys database
+
+        Returns: list of table names
+    """
+
+    if catalog_enabled():
+        catalog = get_catalog(s3_client, conn, code_bucket, catalog_key)
+        return sorted(catalog["tables"])
+
+    query = conn.run(
+        "SELECT table_name FROM information_schema.tables WHERE table_schema = 'public' AND table_name != '_prisma_migrations'"
+    )
+    return [table[0] for table in query]
+
+
+@instrumented("initial_extract")
+def initial_extract(s3_client, conn, streaming=None):
     """
     Function to run an initial extract of all data currently in the ToteSys database and stores in an S3 bucket.
-    - runs query to find all table names in db
+    - lists all table names in db with list_tables
     - creates file name using create_file_name util function
     - runs query to select all data from each table
     - converts data to csv format
     - stores csv file in S3 bucket
+    In streaming mode each table is read through a server-side cursor and uploaded
+    in parts (see stream_table), so memory stays flat however large the table is.
+    Tables are extracted concurrently when EXTRACT_WORKERS is above one (see parallel_extract).
 
         Parameters:
             s3_client: a low-level interface for interacting with S3 buckets
             conn: a connection to the ToteSys database
+            streaming: use streaming mode; defaults to the STREAM_EXTRACT setting
 
         Returns: string declaring success or failure of upload to S3
     """
 
-    query = conn.run(
-        "SELECT table_name FROM information_schema.tables WHERE table_schema = 'public' AND table_name != '_prisma_migrations'"
-    )
+    if streaming is None:
+        streaming = streaming_enabled()
+
+    tables = list_tables(s3_client, conn)
 
     """Query each table to extract all information it contains"""
-    for table in query:
+    queries = {table: f"SELECT * FROM {table}" for table in tables}
 
-        file_name = create_file_name(table[0])
-        rows = conn.run(f"SELECT * FROM {table[0]}")
-        columns = [col["name"] for col in conn.columns]
+    return extract_tables(s3_client, conn, queries, streaming)
 
-        if rows:
-            csv_buffer = format_to_csv(rows, columns)
-            store_in_s3(s3_client, csv_buffer, data_bucket, file_name)
+
+def backfill_enabled():
+    """The initial extract runs as a resumable backfill when BACKFILL_EXTRACT=true is set on the Lambda."""
+    return os.environ.get("BACKFILL_EXTRACT", "false").lower() == "true"
+
+
+def backfill_page_size():
+    """Rows extracted per backfill page, set by BACKFILL_PAGE_SIZE on the Lambda."""
+    return int(os.environ.get("BACKFILL_PAGE_SIZE", "50000"))
+
+
+def primary_key(table, catalog=None):
+    """Primary key column of table, from the schema catalog when available,
+    otherwise the <table>_id naming convention used throughout ToteSys."""
+    if catalog and len(catalog["tables"].get(table, {}).get("primary_key", [])) == 1:
+        return catalog["tables"][table]["primary_key"][0]
+    return f"{table}_id"
+
+
+def backfill_extract(s3_client, conn, context, page_size=None):
+    """
+    Function to run the initial extract in restartable steps across several invocations.
+    - reads the checkpoint stored in backfill_checkpoint.json, if a backfill is in progress
+    - pages each unfinished table by its integer primary key, finding the id ending each page
+      with an index-only query and then extracting the page with extract_table
+    - stores the checkpoint after every page
+    - stops cleanly when the invocation is about to time out, so the next one resumes
+    - once every table is done, stores the latest last_updated value probed before each
+      table's first page as its watermark and deletes the checkpoint; tables that were empty
+      when probed get empty_table_watermark, so rows inserted during the backfill are extracted
+
+        Parameters:
+            s3_client: a low-level interface for interacting with S3 buckets
+            conn: a connection to the ToteSys database
+            context: the Lambda context, used for get_remaining_time_in_millis()
+            page_size: rows per page; defaults to the BACKFILL_PAGE_SIZE setting
+
+        Returns: dictionary declaring success, or 'Incomplete' when the backfill will resume later
+    """
+
+    page_size = page_size or backfill_page_size()
+    streaming = streaming_enabled()
+    catalog = (
+        get_catalog(s3_client, conn, code_bucket, catalog_key)
+        if catalog_enabled()
+        else None
+    )
+    checkpoint = load_checkpoint(s3_client, code_bucket, checkpoint_key)
+    get_remaining_time = getattr(context, "get_remaining_time_in_millis", None)
+
+    for table in list_tables(s3_client, conn):
+        state = checkpoint["tables"].setdefault(table, {"last_id": None, "done": False})
+        if "watermark" not in state:
+            latest = conn.run(f"SELECT MAX({watermark_column}) FROM {table}")[0][0]
+            state["watermark"] = (latest or empty_table_watermark).isoformat(sep=" ")
+
+        key = primary_key(table, catalog)
+        while not state["done"]:
+            if get_remaining_time and get_remaining_time() < backfill_safety_ms:
+                save_checkpoint(s3_client, checkpoint, code_bucket, checkpoint_key)
+                return {"result": "Incomplete"}
+
+            lower = (
+                "" if state["last_id"] is None else f"{key} > {int(state['last_id'])}"
+            )
+            where = f" WHERE {lower}" if lower else ""
+            boundary = conn.run(
+                f"SELECT {key} FROM {table}{where} ORDER BY {key} LIMIT 1 OFFSET {int(page_size) - 1}"
+            )
+
+            if boundary:
+                upper = f"{key} <= {int(boundary[0][0])}"
+                conditions = f"{lower} AND {upper}" if lower else upper
+                query = f"SELECT * FROM {table} WHERE {conditions}"
+                state["last_id"] = int(boundary[0][0])
+            else:
+                query = f"SELECT * FROM {table}{where}"
+                state["done"] = True
+
+            extract_table(s3_client, conn, table, query, streaming)
+            save_checkpoint(s3_client, checkpoint, code_bucket, checkpoint_key)
+
+    # Checkpoints saved before empty tables had a watermark hold None for them
+    watermarks = {
+        table: (
+            datetime.fromisoformat(state["watermark"])
+            if state["watermark"]
+            else empty_table_watermark
+        )
+        for table, state in checkpoint["tables"].items()
+    }
+    save_watermarks(s3_client, watermarks, code_bucket, watermarks_key)
+    s3_client.delete_object(Bucket=code_bucket, Key=checkpoint_key)
 
     return {"result": "Success"}
 
 
+@instrumented("continuous_extract")
 def continuous_extract(s3_client, conn):
     """
-    Function to run an extract of recently added data in the ToteSys db and stores in an S3 bucket.
-    - reads timestamp stored in last_extracted.txt
-    - runs db query to get all table names from db
-    - runs a db query to select all new data added since timestamp
+    Function to run an extract of recently added or updated data in the ToteSys db and stores in an S3 bucket.
+    - reads the per-table watermarks stored in watermarks.json, falling back to the
+      timestamp stored in last_extracted.txt for tables without a watermark
+    - lists all table names in db with list_tables
+    - probes each table for its latest last_updated value and skips tables with no new rows
+    - runs a db query per remaining table selecting rows between its watermark and the probed value
     - creates file name with create_file_name util function
     - converts data into csv format
     - stores csv file in S3 bucket
+    - stores the probed values as the new watermarks of every table that was stored successfully
+    Tables are extracted concurrently when EXTRACT_WORKERS is above one (see parallel_extract).
 
         Parameters:
             s3_client: a low-level interface for interacting with S3 buckets
@@ -72,32 +548,52 @@ def continuous_extract(s3_client, conn):
     response = s3_client.get_object(Bucket=code_bucket, Key="last_extracted.txt")
     readable_content = response["Body"].read().decode("utf-8")
     last_extracted_datetime = datetime.fromisoformat(readable_content)
-    query = conn.run(
-        "SELECT table_name FROM information_schema.tables WHERE table_schema = 'public' AND table_name != '_prisma_migrations'"
-    )
+    watermarks = load_watermarks(s3_client, code_bucket, watermarks_key)
+    tables = list_tables(s3_client, conn)
+
+    queries = {}
+    new_watermarks = dict(watermarks)
+    for table in tables:
+        since = watermarks.get(table, last_extracted_datetime)
+        latest = conn.run(f"SELECT MAX({watermark_column}) FROM {table}")[0][0]
+        if latest is None or latest <= since:
+            continue
 
-    for table in query:
-        file_name = create_file_name(table[0])
-        rows = conn.run(
-            f"SELECT * FROM {table[0]} WHERE created_at > '{last_extracted_datetime}'"
+        queries[table] = (
+            f"SELECT * FROM {table} WHERE {watermark_column} > '{since}' "
+            f"AND {watermark_column} <= '{latest}'"
         )
-        columns = [col["name"] for col in conn.columns]
+        new_watermarks[table] = latest
 
-        if rows:
-            csv_buffer = format_to_csv(rows, columns)
-            store_in_s3(s3_client, csv_buffer, data_bucket, file_name)
+    if not queries:
+        return {"result": "Success"}
 
-    return {"result": "Success"}
+    result = extract_tables(s3_client, conn, queries)
 
+    for table in result.get("failed_tables", []):
+        if table in watermarks:
+            new_watermarks[table] = watermarks[table]
+        else:
+            del new_watermarks[table]
 
+    save_watermarks(s3_client, new_watermarks, code_bucket, watermarks_key)
+
+    return result
+
+
+@profiled(code_bucket, get_warm_s3_client)
 def lambda_handler(event, context):
     """
     Function contains logic to extract data from ToteSys database based on whether an initial extract has taken place or not.
-    - creates an S3 client to interact with S3 bucket.
-    - creates a connection to the ToteSys database
+    - creates an S3 client to interact with S3 bucket, or reuses the one from a warm container
+    - creates a connection to the ToteSys database, or reuses a live one from a warm container
+    - drops every cached resource first when the event sets 'invalidate_resources'
+    - runs under cProfile and tracemalloc when the event sets 'profile' or PROFILE_INVOCATIONS is set,
+      saving the results under diagnostics/ in the code bucket (see profiled)
     - checks whether a 'last_extracted.txt' exists in AWS and invokes either 'initial_extract' or 'continuous_extract' accordingly
-    - creates (after initial_extract) OR updates (after continuous_extract)a file called 'last_extracted.txt' and uploads to S3
-    - closes connection
+      ('backfill_extract' instead of 'initial_extract' when BACKFILL_EXTRACT is set)
+    - creates (after initial_extract) OR updates (after continuous_extract)a file called 'last_extracted.txt' and uploads to S3,
+      only once every table has been extracted successfully
 
         Parameters:
             s3_client: a low-level interface for interacting with S3 buckets
@@ -106,8 +602,12 @@ def lambda_handler(event, context):
         Returns: string declaring success or failure
     """
 
+    if event.get("invalidate_resources"):
+        invalidate_resources()
+        clear_catalog_cache()
+
     try:
-        s3_client = create_s3_client()
+        s3_client = get_warm_s3_client(create_s3_client)
     except NoCredentialsError:
         logging.error("AWS credentials not found. Unable to create S3 client")
         return {
@@ -118,16 +618,30 @@ def lambda_handler(event, context):
         logging.error(f"Error creating S3 client: {e}")
         return {"result": "Failure", "error": "Error creating S3 client"}
 
-    conn = connect()
+    conn = get_warm_connection(connect)
 
-    response = s3_client.list_objects(Bucket=code_bucket)
-    if "Contents" in response and any(
-        obj["Key"] == "last_extracted.txt" for obj in response["Contents"]
-    ):
-        continuous_extract(s3_client, conn)
+    try:
+        response = s3_client.list_objects(Bucket=code_bucket)
+        if "Contents" in response and any(
+            obj["Key"] == "last_extracted.txt" for obj in response["Contents"]
+        ):
+            result = continuous_extract(s3_client, conn)
 
-    else:
-        initial_extract(s3_client, conn)
+        elif backfill_enabled():
+            result = backfill_extract(s3_client, conn, context)
+
+        else:
+            result = initial_extract(s3_client, conn)
+    except Exception:
+        discard_warm_connection()
+        raise
+
+    if result.get("result") == "Incomplete":
+        return {"result": "Incomplete"}
+
+    if result.get("result") == "Failure":
+        logging.error(f"Extract failed for tables: {result['failed_tables']}")
+        return {"result": "Failure", "error": "Extract failed for some tables"}
 
     try:
         last_extracted = datetime.now().isoformat().replace("T", " ")
@@ -142,7 +656,4 @@ def lambda_handler(event, context):
         logging.error(f"Unexpected error: {e}")
         return {"result": "Failure", "error": "Unexpected error"}
 
-    finally:
-        conn.close()
-
     return {"result": "Success"}
@@ -1,20 +1,68 @@
 from datetime import datetime
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import boto3
 import csv
+import gzip
 import io
+from pg8000 import converters
 from pg8000.native import Connection
+from lambda_utils import measure, MultipartUploadWriter, MIN_PART_SIZE
 import json
+import logging
+import os
+import queue
+import time
+
+STREAM_CHUNK_SIZE = 10000
+S3_MAX_POOL_CONNECTIONS = 20
+COMPRESSION_EXTENSIONS = {"gzip": "gz", "zstd": "zst"}
+
+# Arrow type names for the Postgres type OIDs found in conn.columns. Numeric columns
+# are mapped to decimals from their type modifier, anything unlisted is written as text.
+PG_ARROW_TYPES = {
+    converters.BOOLEAN: "bool",
+    converters.SMALLINT: "int16",
+    converters.INTEGER: "int32",
+    converters.BIGINT: "int64",
+    converters.OID: "int64",
+    converters.REAL: "float32",
+    converters.FLOAT: "float64",
+    converters.TEXT: "string",
+    converters.STRING: "string",
+    converters.CHAR: "string",
+    converters.NAME: "string",
+    converters.DATE: "date32",
+    converters.TIME: "time64[us]",
+    converters.TIMESTAMP: "timestamp[us]",
+    converters.BYTES: "binary",
+}
+
+# Secrets, the database connection and the S3 client survive between invocations
+# of a warm Lambda container. invalidate_resources() drops all of them.
+_secret_cache = {}
+_warm_resources = {}
+
+
+def secret_ttl():
+    """Seconds a secret is reused for, set by SECRET_TTL_SECONDS on the Lambda."""
+    return int(os.environ.get("SECRET_TTL_SECONDS", "900"))
 
 
 def get_secret(secret_name, region_name=None):
     """
-    Retrieves a secret from AWS Secrets Manager
+    Retrieves a secret from AWS Secrets Manager.
+    The secret is cached for secret_ttl() seconds so warm invocations skip the API call.
 
     Args:
         secret_name (str): The name of the secret in Secrets Manager
     Returns:
         dict: A dictionary of the secret values.
     """
+    cached = _secret_cache.get(secret_name)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
     region_name = "eu-west-2"
 
     client = boto3.client("secretsmanager", region_name=region_name)
@@ -23,8 +71,9 @@ def get_secret(secret_name, region_name=None):
         get_secret_value_response = client.get_secret_value(SecretId=secret_name)
 
         if "SecretString" in get_secret_value_response:
-            secret = get_secret_value_response["SecretString"]
-            return json.loads(secret)
+            secret = json.loads(get_secret_value_response["SecretString"])
+            _secret_cache[secret_name] = (time.monotonic() + secret_ttl(), secret)
+            return secret
         else:
             raise ValueError("Secret is stored as binary; function expects JSON.")
     except Exception as e:
@@ -51,18 +100,104 @@ def connect():
     )
 
 
+def create_connection_pool(size):
+    """Opens size connections to the ToteSys database and returns them in a
+    thread-safe queue, so worker threads can each borrow their own connection.
+    Connections already opened are closed again if one of them fails to connect.
+    """
+    pool = queue.Queue()
+    try:
+        for _ in range(size):
+            pool.put(connect())
+    except Exception:
+        close_connection_pool(pool)
+        raise
+
+    return pool
+
+
+def close_connection_pool(pool, keep=None):
+    """Closes every connection in the pool except keep, which belongs to the caller."""
+    while not pool.empty():
+        conn = pool.get()
+        if conn is not keep:
+            conn.close()
+
+
 def create_s3_client():
     """
-    Creates an S3 client using boto3
+    Creates an S3 client using boto3, with a connection pool large enough for
+    parallel extraction and TCP keep-alive so warm invocations reuse sockets.
+    """
+
+    config = Config(
+        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+        retries={"max_attempts": 5, "mode": "standard"},
+    )
+    return boto3.client("s3", config=config)
+
+
+def get_warm_s3_client(factory=create_s3_client):
+    """Returns the S3 client kept from a previous invocation, creating it with factory
+    on a cold start. boto3 clients are thread-safe, so one client is shared by all workers.
+    """
+    if "s3_client" not in _warm_resources:
+        _warm_resources["s3_client"] = factory()
+
+    return _warm_resources["s3_client"]
+
+
+def get_warm_connection(factory=connect):
+    """Returns the database connection kept from a previous invocation if it still
+    answers a liveness query, otherwise opens a new one with factory.
+    A connection that fails to open is retried once with freshly fetched secrets,
+    in case the credentials were rotated since they were cached.
     """
+    conn = _warm_resources.get("conn")
+    if conn is not None:
+        try:
+            conn.run("SELECT 1")
+            return conn
+        except Exception as e:
+            logging.warning(f"Discarding stale database connection: {e}")
+            discard_warm_connection()
+
+    try:
+        conn = factory()
+    except Exception as e:
+        logging.warning(f"Reconnecting with refreshed secrets: {e}")
+        _secret_cache.clear()
+        conn = factory()
 
-    return boto3.client("s3")
+    _warm_resources["conn"] = conn
+    return conn
 
 
-def create_file_name(table):
+def discard_warm_connection():
+    """Closes and forgets the kept database connection, ignoring errors from a dead socket."""
+    conn = _warm_resources.pop("conn", None)
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def invalidate_resources():
+    """Drops every cached secret, the kept database connection and the shared
+    S3 client, so the next invocation rebuilds them with current credentials.
+    """
+    _secret_cache.clear()
+    discard_warm_connection()
+    _warm_resources.clear()
+
+
+def create_file_name(table, extension="csv"):
     """Function takes a table name provided by either initial or continuous
     extract functions, creates a file system with the parent folder named after the table
     and subsequent folders named after time periods respectively.
+    The file extension defaults to csv and can be changed to reflect the file format and compression.
     Returns a full file name with a path to it. Path will be created in S3 busket by store_in_s3_bucket util function
     """
 
@@ -74,7 +209,7 @@ def create_file_name(table):
     day = datetime.now().strftime("%d")
     time_now = datetime.now().isoformat()
 
-    file_name = f"{table}/{year}/{month}/{day}/{time_now}.csv"
+    file_name = f"{table}/{year}/{month}/{day}/{time_now}.{extension}"
 
     return file_name
 
@@ -90,12 +225,15 @@ def format_to_csv(rows, columns):
     if not columns:
         raise ValueError("Column headers cannot be empty!")
 
-    csv_buffer = io.StringIO()
-    writer = csv.writer(csv_buffer)
-    writer.writerow(columns)
-    writer.writerows(rows)
+    with measure("format_to_csv") as metrics:
+        csv_buffer = io.StringIO()
+        writer = csv.writer(csv_buffer)
+        writer.writerow(columns)
+        writer.writerows(rows)
 
-    csv_buffer.seek(0)
+        metrics["rows"] = len(rows)
+        metrics["bytes"] = csv_buffer.tell()
+        csv_buffer.seek(0)
 
     return csv_buffer
 
@@ -110,4 +248,245 @@ def store_in_s3(s3_client, csv_buffer, bucket_name, file_name):
         bucket_name (str): The name of the S3 bucket to store the file in.
         file_name (str): The name to assign to the file in the S3 bucket.
     """
-    s3_client.put_object(Body=csv_buffer.getvalue(), Bucket=bucket_name, Key=file_name)
+    with measure("store_in_s3") as metrics:
+        body = csv_buffer.getvalue()
+        metrics["bytes"] = len(body)
+        s3_client.put_object(Body=body, Bucket=bucket_name, Key=file_name)
+
+
+def load_watermarks(s3_client, bucket_name, file_name):
+    """
+    Reads the per-table watermark manifest from an AWS S3 bucket.
+
+    Args:
+        s3_client: A boto3 S3 client.
+        bucket_name (str): The name of the S3 bucket holding the manifest.
+        file_name (str): The name of the manifest file in the S3 bucket.
+    Returns:
+        dict: Table name to the latest extracted timestamp, empty if no manifest exists yet.
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=file_name)
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "NoSuchKey":
+            return {}
+        raise
+
+    manifest = json.loads(response["Body"].read().decode("utf-8"))
+    return {table: datetime.fromisoformat(ts) for table, ts in manifest.items()}
+
+
+def save_watermarks(s3_client, watermarks, bucket_name, file_name):
+    """
+    Writes the per-table watermark manifest to an AWS S3 bucket as JSON.
+
+    Args:
+        s3_client: A boto3 S3 client.
+        watermarks (dict): Table name to the latest extracted timestamp.
+        bucket_name (str): The name of the S3 bucket to store the manifest in.
+        file_name (str): The name to assign to the manifest file in the S3 bucket.
+    """
+    manifest = {table: ts.isoformat(sep=" ") for table, ts in watermarks.items()}
+    s3_client.put_object(
+        Body=json.dumps(manifest, indent=2, sort_keys=True),
+        Bucket=bucket_name,
+        Key=file_name,
+    )
+
+
+def load_checkpoint(s3_client, bucket_name, file_name):
+    """
+    Reads the backfill checkpoint from an AWS S3 bucket.
+
+    Args:
+        s3_client: A boto3 S3 client.
+        bucket_name (str): The name of the S3 bucket holding the checkpoint.
+        file_name (str): The name of the checkpoint file in the S3 bucket.
+    Returns:
+        dict: the checkpoint, or an empty checkpoint if no backfill is in progress.
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=file_name)
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "NoSuchKey":
+            return {"tables": {}}
+        raise
+
+    return json.loads(response["Body"].read().decode("utf-8"))
+
+
+def save_checkpoint(s3_client, checkpoint, bucket_name, file_name):
+    """
+    Writes the backfill checkpoint to an AWS S3 bucket as JSON.
+
+    Args:
+        s3_client: A boto3 S3 client.
+        checkpoint (dict): per-table backfill progress.
+        bucket_name (str): The name of the S3 bucket to store the checkpoint in.
+        file_name (str): The name to assign to the checkpoint file in the S3 bucket.
+    """
+    s3_client.put_object(
+        Body=json.dumps(checkpoint, indent=2, sort_keys=True),
+        Bucket=bucket_name,
+        Key=file_name,
+    )
+
+
+def fetch_in_chunks(conn, query, chunk_size=STREAM_CHUNK_SIZE):
+    """Runs a query through a server-side cursor and yields its rows in lists of
+    at most chunk_size rows, so only one chunk is ever held in memory.
+    The cursor lives inside a read-only transaction which is committed once the
+    rows are exhausted, or rolled back if fetching fails or the caller stops early.
+    conn.columns describes the result after the first chunk has been yielded.
+    """
+
+    conn.run("START TRANSACTION READ ONLY")
+    try:
+        conn.run(f"DECLARE extract_cursor NO SCROLL CURSOR FOR {query}")
+        while True:
+            rows = conn.run(f"FETCH FORWARD {int(chunk_size)} FROM extract_cursor")
+            if not rows:
+                break
+            yield rows
+        conn.run("CLOSE extract_cursor")
+        conn.run("COMMIT")
+    except BaseException:
+        conn.run("ROLLBACK")
+        raise
+
+
+def open_compressor(fileobj, codec=None):
+    """Returns a writable object that compresses everything written to it with codec
+    and passes the compressed bytes on to fileobj as they are produced.
+    Closing the compressor writes the codec trailer but leaves fileobj open.
+    With no codec, fileobj itself is returned.
+    zstd needs the optional zstandard package.
+    """
+
+    if codec is None:
+        return fileobj
+
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=6, mtime=0)
+
+    if codec == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd compression requires the zstandard package")
+        return zstandard.ZstdCompressor(level=3).stream_writer(fileobj, closefd=False)
+
+    raise ValueError(f"Unsupported compression codec: {codec}")
+
+
+def format_chunks_to_csv(row_chunks, columns):
+    """Streaming counterpart of format_to_csv. Receives an iterable of row chunks
+    and yields each chunk encoded as UTF-8 CSV bytes, with the column headers
+    written ahead of the first chunk.
+    """
+
+    if not columns:
+        raise ValueError("Column headers cannot be empty!")
+
+    header = True
+    for rows in row_chunks:
+        csv_buffer = io.StringIO()
+        writer = csv.writer(csv_buffer)
+        if header:
+            writer.writerow(columns)
+            header = False
+        writer.writerows(rows)
+        yield csv_buffer.getvalue().encode("utf-8")
+
+
+def arrow_schema(columns):
+    """Builds a pyarrow schema from the column descriptions pg8000 exposes as
+    conn.columns, so Parquet output keeps the Postgres column types.
+    pyarrow is only imported when Parquet output is used.
+    """
+    import pyarrow as pa
+
+    fields = []
+    for col in columns:
+        type_oid = col["type_oid"]
+        if type_oid == converters.NUMERIC and col.get("type_modifier", -1) >= 4:
+            modifier = col["type_modifier"] - 4
+            arrow_type = pa.decimal128(modifier >> 16, modifier & 0xFFFF)
+        elif type_oid == converters.TIMESTAMPTZ:
+            arrow_type = pa.timestamp("us", tz="UTC")
+        elif type_oid in PG_ARROW_TYPES:
+            arrow_type = pa.type_for_alias(PG_ARROW_TYPES[type_oid])
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(col["name"], arrow_type))
+
+    return pa.schema(fields)
+
+
+def rows_to_record_batch(rows, schema):
+    """Converts a chunk of rows into a pyarrow RecordBatch matching schema.
+    Values of columns written as text are converted with str(), or to JSON for
+    the dicts and lists pg8000 decodes json columns into.
+    """
+    import pyarrow as pa
+
+    values = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for field, column in zip(schema, values):
+        if pa.types.is_string(field.type):
+            column = [
+                (
+                    None
+                    if value is None
+                    else (
+                        json.dumps(value)
+                        if isinstance(value, (dict, list))
+                        else str(value)
+                    )
+                )
+                for value in column
+            ]
+        arrays.append(pa.array(column, type=field.type))
+
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_parquet_chunks(row_chunks, columns, fileobj, compression="snappy"):
+    """Writes an iterable of row chunks to fileobj as Parquet, one row group per chunk,
+    so only one chunk of rows is held in memory at a time.
+    """
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(columns)
+    with pq.ParquetWriter(fileobj, schema, compression=compression) as writer:
+        for rows in row_chunks:
+            writer.write_batch(rows_to_record_batch(rows, schema))
+
+
+def stream_to_s3(
+    s3_client, chunks, bucket_name, file_name, part_size=MIN_PART_SIZE, codec=None
+):
+    """
+    Uploads an iterable of byte chunks to an AWS S3 bucket through a
+    MultipartUploadWriter, compressing them on the way when a codec is given.
+    The upload is aborted if anything goes wrong so no orphaned parts are left behind.
+
+    Args:
+        s3_client: A boto3 S3 client.
+        chunks: An iterable of bytes objects making up the file contents.
+        bucket_name (str): The name of the S3 bucket to store the file in.
+        file_name (str): The name to assign to the file in the S3 bucket.
+        part_size (int): Minimum size of every part except the last one.
+        codec (str): Compression codec, gzip or zstd, or None for no compression.
+    """
+    writer = MultipartUploadWriter(s3_client, bucket_name, file_name, part_size)
+    try:
+        compressor = open_compressor(writer, codec)
+        for chunk in chunks:
+            compressor.write(chunk)
+        if compressor is not writer:
+            compressor.close()
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
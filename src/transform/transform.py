@@ -1,29 +1,59 @@
-import boto3
-import pandas as pd
-from io import BytesIO
-from datetime import datetime
 import logging
-from transform_utils import extract_files_from_event, load_raw_data, perform_transformations, save_transformed_data 
+import transform_utils
+from lambda_utils import profiled
+from transform_utils import (
+    extract_files_from_event, load_raw_data, perform_transformations, save_transformed_data,
+    incremental_enabled, load_new_raw_data, record_processed_objects,
+    plan_transformations, streaming_enabled, stream_transformations, optimize_dtypes, CODE_BUCKET
+)
 
 
+@profiled(CODE_BUCKET, lambda: transform_utils.s3)
 def lambda_handler(event, context):
     """
     Entry point for the Lambda function. Handles both S3-triggered events
-    and batch processing scenarios.
+    and batch processing scenarios. Only the outputs affected by the event are rebuilt,
+    from the source tables they need, and dimensions are merged into their current snapshots.
+    With INCREMENTAL_TRANSFORM set, only objects missing from the ledger are loaded.
+    With STREAM_TRANSFORM set, row-local dimensions are built chunk by chunk in fixed memory.
+    With PROFILE_INVOCATIONS set, or 'profile' set on the event, the invocation is profiled (see profiled).
     """
     logging.info("Starting transformation process.")
     
     # Determine if this is triggered by S3 or a batch job
     triggered_files = extract_files_from_event(event)
 
-    # Load raw data
-    raw_data = load_raw_data(triggered_files)
+    # Work out which outputs the event affects and which sources they need
+    outputs, source_files = plan_transformations(triggered_files)
+    if not outputs:
+        logging.info("No outputs are affected by the triggered files.")
+        return {"statusCode": 200, "body": "Nothing to transform."}
 
-    # Perform transformations
-    transformed_data = perform_transformations(raw_data)
+    incremental = incremental_enabled()
+    new_objects = {}
 
-    # Save transformed data back to S3
-    save_transformed_data(transformed_data)
+    # Build row-local dimensions chunk by chunk, leaving the other outputs to the in-memory run
+    if streaming_enabled():
+        outputs, source_files, new_objects = stream_transformations(outputs, source_files, incremental)
+
+    if outputs:
+        # Load raw data
+        if incremental:
+            raw_data, loaded_objects = load_new_raw_data(source_files)
+            new_objects.update(loaded_objects)
+        else:
+            raw_data = load_raw_data(source_files)
+        raw_data = optimize_dtypes(raw_data)
+
+        # Perform transformations
+        transformed_data = perform_transformations(raw_data, outputs)
+
+        # Save transformed data back to S3, upserting dimensions into their current snapshots
+        save_transformed_data(transformed_data)
+
+    # Record the objects processed by an incremental run only once they are saved
+    if incremental:
+        record_processed_objects(new_objects)
 
     logging.info("Data transformed and saved successfully.")
     return {"statusCode": 200, "body": "Data transformation complete."}
@@ -1,139 +1,1339 @@
-import boto3
-import pandas as pd
+import csv
+import gzip
+import hashlib
+import importlib
+import importlib.util
+import json
+from collections import OrderedDict
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from io import BytesIO
+from urllib.parse import unquote_plus
 from datetime import datetime
+from lambda_utils import measure, profiling_active, MultipartUploadWriter
 import logging
+import os
+import tempfile
+import threading
+
+
+class LazyModule:
+    """
+    Stands in for a heavy module and imports it on first attribute access, so invocations
+    that return before needing it (e.g. events that affect no output) never pay for the import.
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attribute):
+        return getattr(importlib.import_module(self._name), attribute)
+
+
+class LazyClient:
+    """
+    Stands in for a boto3 client, built on first use and then shared by every thread
+    and by later invocations of the warm container.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attribute):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return getattr(self._client, attribute)
+
+
+pd = LazyModule('pandas')
+
+# Upper bound on concurrent object downloads, matched by the S3 client's connection pool
+MAX_LOAD_WORKERS = 32
+
+
+def create_s3_client():
+    import boto3
+    from botocore.config import Config
+    return boto3.client('s3', config=Config(max_pool_connections=MAX_LOAD_WORKERS))
+
 
 # Initialize S3 client and logger
-s3 = boto3.client('s3')
+s3 = LazyClient(create_s3_client)
 logging.basicConfig(level=logging.INFO)
 
 # Define source and target S3 buckets
 SOURCE_BUCKET = 'will-ingested-data-bucket'
 TARGET_BUCKET = 'will-processed-data-bucket'
 
-# Define table names
+# Schema catalog maintained by the extract Lambda
+CODE_BUCKET = 'will-code-bucket'
+CATALOG_KEY = 'catalog.json'
+
+# Extract output formats, plain or compressed, that can be loaded
+CSV_EXTENSIONS = ('.csv', '.csv.gz', '.csv.zst')
+
+# Use the multithreaded pyarrow CSV parser when pyarrow is installed
+CSV_ENGINE = 'pyarrow' if importlib.util.find_spec('pyarrow') else 'c'
+
+# Column that partitions the files of each non-dimension output into year=/month=/day= folders.
+# Outputs not listed are partitioned by the date of the run.
+PARTITION_COLUMNS = {'fact_sales_order': 'created_date'}
+
+# Columns identifying a version of a fact row; rows already saved in their partition are not appended again
+FACT_KEYS = {'fact_sales_order': ['sales_order_id', 'last_updated_date', 'last_updated_time']}
+
+# Date columns of sales_order that the dim_date calendar covers: the order date and every date fact_sales_order resolves
+CALENDAR_COLUMNS = ['order_date', 'created_at', 'last_updated', 'agreed_delivery_date', 'agreed_payment_date']
+
+# Outputs built row by row from a single source table, which STREAM_TRANSFORM runs chunk by chunk
+STREAMING_OUTPUTS = {'dim_counterparty', 'dim_currency', 'dim_address'}
+
+# Rows read per chunk by the streaming transform
+STREAM_CHUNK_SIZE = 50000
+
+# Low-cardinality string columns held as categoricals, in raw tables and in the outputs built from them.
+# Declared rather than detected, so that the saved Parquet schema is the same for every run.
+CATEGORICAL_COLUMNS = {
+    'currency': ['currency_code'],
+    'department': ['department_name', 'location'],
+    'address': ['city', 'country'],
+    'dim_currency': ['currency_code'],
+    'dim_staff': ['department_name', 'location'],
+    'dim_address': ['city', 'country'],
+}
+
+# Small, rarely changing tables kept parsed in the warm container between invocations
+REFERENCE_TABLES = {'department', 'payment', 'currency', 'payment_type'}
+
+# Where parsed reference objects spill to when they leave the in-memory cache
+REFERENCE_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'reference_cache')
+
+# Warm-container cache of parsed reference objects, least recently used first: {cache key: (DataFrame, bytes)}
+_reference_cache = OrderedDict()
+_reference_cache_lock = threading.Lock()
+
+# Held while spilled files are listed and evicted, as loads on several threads spill at once
+_reference_spill_lock = threading.Lock()
+
+# Ledger of processed objects (key and ETag) for incremental runs, one shard per directory of source keys,
+# so a run only reads and rewrites the shards of the days it lists
+LEDGER_PREFIX = 'transform_ledger'
+LEDGER_SHARD = '_ledger.json'
+
+# Natural key of each dimension, used to merge new rows into the existing dimension
+DIMENSION_KEYS = {
+    'dim_date': ['date_id'],
+    'dim_staff': ['staff_id'],
+    'dim_counterparty': ['counterparty_id'],
+    'dim_currency': ['currency_id'],
+    'dim_transaction': ['transaction_id'],
+    'dim_address': ['address_id'],
+}
+
+# Pointer to the current snapshot of each dimension, switched once a new snapshot is fully written
+SNAPSHOT_MANIFEST = '_snapshot.json'
+
+# Attempts at publishing a dimension snapshot when other runs keep publishing first
+SNAPSHOT_PUBLISH_ATTEMPTS = 3
+
+# Tables joined in full onto another table, keyed by the table they are joined onto
+LOOKUP_TABLES = {'staff': 'department', 'transaction': 'payment'}
+
+# Table names used when no schema catalog is available
 TABLES = [
     'sales_order', 'design', 'address', 'counterparty', 'transaction', 
     'payment', 'payment_type', 'staff', 'currency', 'department', 'purchase_order'
 ]
 
+def frame_bytes(dataframe):
+    """
+    In-memory size of a DataFrame's columns, without following object pointers into the strings they hold.
+    """
+    return int(dataframe.memory_usage(index=False).sum())
+
+def map_concurrently(function, items, workers):
+    """
+    Applies function to items on a thread pool of at most workers threads and returns the results in order.
+    Runs in the calling thread when one worker is enough or while the invocation is profiled, as cProfile
+    only sees the thread it runs in (see lambda_utils.profiled).
+    """
+    items = list(items)
+    workers = min(workers, len(items))
+    if workers <= 1 or profiling_active():
+        return [function(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, items))
+
+def load_catalog():
+    """
+    Loads the schema catalog (table names, columns, types and primary keys)
+    written by the extract Lambda. Returns None if it cannot be read.
+    """
+    try:
+        obj = s3.get_object(Bucket=CODE_BUCKET, Key=CATALOG_KEY)
+    except ClientError as e:
+        logging.warning(f"Schema catalog unavailable: {e}")
+        return None
+    return json.loads(obj['Body'].read())
+
+def load_table_names():
+    """
+    Returns the table names from the schema catalog, or TABLES when there is no catalog.
+    """
+    catalog = load_catalog()
+    if catalog is None:
+        return TABLES
+    return sorted(catalog['tables'])
+
+def event_records(event):
+    """
+    Returns the S3 records of an event, unwrapping the S3 notifications carried by SQS messages
+    so that a batch of queued notifications is handled like one S3 event. Messages without
+    records, such as the s3:TestEvent sent when the notification is configured, are skipped.
+    """
+    records = []
+    for record in event['Records']:
+        if record.get('eventSource') == 'aws:sqs':
+            records.extend(json.loads(record['body']).get('Records', []))
+        else:
+            records.append(record)
+    return records
+
+def coalesce_files(files):
+    """
+    Deduplicates the triggered files and drops those already covered by a prefix (a key ending in /)
+    of the same bucket, ordered by table so each table is listed once per run.
+    """
+    prefixes = {(file['bucket'], file['key']) for file in files if file['key'].endswith('/')}
+    unique = []
+    for file in sorted(files, key=lambda file: (file['key'].split('/')[0], file['key'])):
+        covered = any(
+            file['bucket'] == bucket and file['key'] != prefix and file['key'].startswith(prefix)
+            for bucket, prefix in prefixes
+        )
+        if file not in unique and not covered:
+            unique.append(file)
+    return unique
+
 def extract_files_from_event(event):
     """
-    Extracts file paths from an S3-triggered event or defaults to processing all tables.
-    Includes an 'initial_extract' prefix for batch scenarios.
+    Extracts file paths from an S3-triggered event, or a batch of them delivered through SQS,
+    or defaults to processing all tables listed in the schema catalog. Includes an 'initial_extract'
+    prefix for batch scenarios. Keys are URL-decoded and the files are coalesced (coalesce_files),
+    so one extract cycle gives one pass over exactly the files it wrote.
     """
     files = []
     if 'Records' in event:  # S3-triggered event
-        files = [
+        files = coalesce_files([
             {
                 'bucket': record['s3']['bucket']['name'],
-                'key': record['s3']['object']['key']
+                'key': unquote_plus(record['s3']['object']['key'])
             }
-            for record in event['Records']
-        ]
+            for record in event_records(event)
+        ])
         logging.info(f"Triggered by S3 event for files: {files}")
     else:
         # Add batch processing scenario for all tables and initial_extract
         logging.info("No S3 event detected; falling back to batch processing.")
-        files = [{"bucket": SOURCE_BUCKET, "key": f"{table}/"} for table in TABLES]
+        files = [{"bucket": SOURCE_BUCKET, "key": f"{table}/"} for table in load_table_names()]
         files.append({"bucket": SOURCE_BUCKET, "key": "initial_extract/"})
         logging.info(f"Including 'initial_extract/' in batch processing.")
 
     return files
 
 
-def load_raw_data(triggered_files):
+def group_files_by_table(triggered_files):
     """
-    Loads raw data from S3 for the specified files or tables.
+    Groups the triggered files by table, the first folder of their key.
     """
-    raw_data = {}
+    tables = {}
     for file in triggered_files:
         table_name = file['key'].split('/')[0]  # Extract table name from the key
-        raw_data[table_name] = load_table_from_s3(file['bucket'], file['key'])
-    return raw_data
+        tables.setdefault(table_name, []).append(file)
+    return tables
+
+def load_raw_data(triggered_files):
+    """
+    Loads raw data from S3 for the specified files or tables, one table per thread.
+    """
+    tables = group_files_by_table(triggered_files)
+
+    def load_table(table_name):
+        return pd.concat(
+            [
+                load_table_from_s3(
+                    file['bucket'], file['key'], READ_SPECS.get(table_name), table_name in REFERENCE_TABLES
+                )
+                for file in tables[table_name]
+            ],
+            ignore_index=True
+        )
+
+    return dict(zip(tables, map_concurrently(load_table, tables, len(tables))))
+
+def compact_dataframe(dataframe, table_name):
+    """
+    Converts a table to memory-compact dtypes with the same target type for every run: CATEGORICAL_COLUMNS
+    to categoricals of Arrow-backed strings, *_id columns to nullable Int32 (ToteSys keys are Postgres
+    integers) and columns read as strings (see READ_SPECS) or holding only strings to Arrow-backed strings,
+    also when a run has nothing but nulls in them. Written with arrow_schema, the Parquet schema is fixed too.
+    """
+    categorical = CATEGORICAL_COLUMNS.get(table_name, [])
+    strings = {column for spec in READ_SPECS.values() for column, dtype in spec.items() if dtype == 'string'}
+    converted = {}
+    for column in dataframe.columns:
+        values = dataframe[column]
+        if column in categorical:
+            if not (isinstance(values.dtype, pd.CategoricalDtype) and values.cat.categories.dtype == 'string'):
+                converted[column] = values.astype('string[pyarrow]').astype('category')
+        elif column.endswith('_id') and (pd.api.types.is_integer_dtype(values) or values.isna().all()):
+            if not values.isna().all() and (values.min() < -2**31 or values.max() >= 2**31):
+                raise ValueError(f"{table_name}.{column} has values that do not fit in Int32.")
+            if values.dtype != 'Int32':
+                converted[column] = values.astype('Int32')
+        elif column in strings or (
+            pd.api.types.is_string_dtype(values)
+            and pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty')
+        ):
+            if values.dtype != 'string[pyarrow]':
+                converted[column] = values.astype('string[pyarrow]')
+    return dataframe.assign(**converted) if converted else dataframe
+
+def optimize_dtypes(raw_data):
+    """
+    Converts every loaded table to memory-compact dtypes before the transformations run.
+    """
+    return {table_name: compact_dataframe(dataframe, table_name) for table_name, dataframe in raw_data.items()}
+
+def joined_tables(tables, changed):
+    """
+    Returns the tables among those loaded that must be read whole rather than as deltas: lookup tables
+    (LOOKUP_TABLES), joined onto every row of another table, and the tables they are joined onto
+    when the lookup table changed, as every one of their rows may then change.
+    """
+    lookups = {lookup for lookup in LOOKUP_TABLES.values() if lookup in tables}
+    return lookups | {table for table, lookup in LOOKUP_TABLES.items() if table in tables and lookup in changed}
+
+def plan_transformations(triggered_files):
+    """
+    Works out which outputs the triggered files affect, and which files their sources are read from.
+    An output is affected when one of its sources, or an output it is built from, is in the event;
+    lookup sources (LOOKUP_SOURCES) do not count.
+    Sources that are needed but missing from the event are read in full from SOURCE_BUCKET, as are
+    the tables that must be joined whole (see joined_tables), and files of tables that no affected
+    output reads are dropped.
+    Returns the affected outputs, in TRANSFORMATIONS order, and the files to load.
+    """
+    triggered = group_files_by_table(triggered_files)
+    triggered_tables = set(triggered)
+
+    affected = set()
+    changed = True
+    while changed:
+        changed = False
+        for output, (_, sources) in TRANSFORMATIONS.items():
+            triggers = set(sources) - LOOKUP_SOURCES.get(output, set())
+            if output not in affected and (triggered_tables | affected) & triggers:
+                affected.add(output)
+                changed = True
+    outputs = [output for output in TRANSFORMATIONS if output in affected]
+
+    needed = {
+        source for output in outputs for source in TRANSFORMATIONS[output][1]
+        if source not in TRANSFORMATIONS
+    }
+    full = (needed - triggered_tables) | joined_tables(needed, triggered_tables)
+    files = [file for file in triggered_files if file['key'].split('/')[0] in needed - full]
+    files += [
+        {'bucket': triggered[table][0]['bucket'] if table in triggered else SOURCE_BUCKET, 'key': f"{table}/"}
+        for table in sorted(full)
+    ]
+    return outputs, files
+
+def open_csv_object(body, file_key):
+    """
+    Wraps an S3 object body in a seekable stream of CSV text bytes, decompressing
+    gzip (.csv.gz) objects on the fly as pandas reads them and zstd (.csv.zst) objects up front.
+    """
+    if file_key.endswith('.gz'):
+        return gzip.GzipFile(fileobj=BytesIO(body.read()), mode='rb')
+    if file_key.endswith('.zst'):
+        import pyarrow as pa
+        return BytesIO(pa.input_stream(BytesIO(body.read()), compression='zstd').read())
+    return BytesIO(body.read())
+
+def read_csv_with_spec(stream, spec=None):
+    """
+    Reads a CSV stream, keeping only the columns of the read spec that are present in the
+    header, with their declared dtypes. Columns declared as 'datetime' are parsed as dates.
+    Without a spec every column is read and its type inferred.
+    """
+    if spec is None:
+        return pd.read_csv(stream, engine=CSV_ENGINE)
+
+    header = next(csv.reader([stream.readline().decode()]), [])
+    stream.seek(0)
+    columns = [column for column in header if column in spec]
+    return pd.read_csv(
+        stream,
+        engine=CSV_ENGINE,
+        usecols=columns,
+        dtype={column: spec[column] for column in columns if spec[column] != 'datetime'},
+        parse_dates=[column for column in columns if spec[column] == 'datetime'],
+    )
+
+def read_parquet_with_spec(buffer, spec=None):
+    """
+    Reads a Parquet buffer, keeping only the columns of the read spec that are present in
+    the file. Parquet files carry their own types, so the spec dtypes are not applied.
+    """
+    if spec is None:
+        return pd.read_parquet(buffer)
 
-def load_table_from_s3(bucket, prefix):
+    import pyarrow.parquet as pq
+    names = pq.read_schema(buffer).names
+    buffer.seek(0)
+    return pd.read_parquet(buffer, columns=[column for column in names if column in spec])
+
+def list_all_objects(bucket, prefix):
+    """
+    Lists every object under the prefix, following continuation tokens past the
+    1,000 keys returned by a single list_objects_v2 call.
+    """
+    paginator = s3.get_paginator('list_objects_v2')
+    return [
+        file
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+        for file in page.get('Contents', [])
+    ]
+
+def list_table_objects(bucket, prefix):
     """
-    Loads all CSV files from the specified bucket and prefix into a DataFrame.
+    Lists the loadable objects (CSV, compressed CSV and Parquet) under the prefix,
+    with their keys and ETags.
     """
-    files = s3.list_objects_v2(Bucket=bucket, Prefix=prefix)
-    if 'Contents' not in files:
+    files = list_all_objects(bucket, prefix)
+    if not files:
         logging.warning(f"No files found under prefix: {prefix}")
+        return []
+
+    return [
+        {'Key': file['Key'], 'ETag': file['ETag']}
+        for file in files
+        if file['Key'].endswith(CSV_EXTENSIONS + ('.parquet',))
+    ]
+
+def load_workers():
+    """
+    Number of objects downloaded and parsed at once, set by LOAD_WORKERS on the Lambda.
+    While one object is parsed the others keep downloading; 1 loads serially.
+    """
+    workers = int(os.environ.get('LOAD_WORKERS', '8'))
+    return max(1, min(workers, MAX_LOAD_WORKERS))
+
+def load_object(bucket, file_key, spec=None):
+    """
+    Downloads and parses one extract object. Parquet files keep the column types written by extract.
+    """
+    logging.info(f"Loading file: {file_key}")
+    obj = s3.get_object(Bucket=bucket, Key=file_key)
+    if file_key.endswith('.parquet'):
+        return read_parquet_with_spec(BytesIO(obj['Body'].read()), spec)
+    return read_csv_with_spec(open_csv_object(obj['Body'], file_key), spec)
+
+def reference_cache_limits():
+    """
+    Byte limits of the reference cache in memory and in /tmp, set in MiB by
+    REFERENCE_CACHE_MEMORY_MB and REFERENCE_CACHE_DISK_MB on the Lambda.
+    """
+    memory = int(os.environ.get('REFERENCE_CACHE_MEMORY_MB', '64')) * 1024 * 1024
+    disk = int(os.environ.get('REFERENCE_CACHE_DISK_MB', '256')) * 1024 * 1024
+    return memory, disk
+
+def clear_reference_cache():
+    """
+    Empties the in-memory reference cache. Files spilled to /tmp are left in place.
+    """
+    with _reference_cache_lock:
+        _reference_cache.clear()
+
+def remember_reference(cache_key, dataframe):
+    """
+    Adds a parsed object to the in-memory cache, evicting the least recently used
+    objects beyond the memory limit. They stay available from /tmp.
+    """
+    memory_limit, _ = reference_cache_limits()
+    size = int(dataframe.memory_usage(deep=True).sum())
+    with _reference_cache_lock:
+        _reference_cache[cache_key] = (dataframe, size)
+        _reference_cache.move_to_end(cache_key)
+        total = sum(cached_size for _, cached_size in _reference_cache.values())
+        while len(_reference_cache) > 1 and total > memory_limit:
+            _, (_, evicted_size) = _reference_cache.popitem(last=False)
+            total -= evicted_size
+
+def spill_reference(path, dataframe):
+    """
+    Writes a parsed object to /tmp as Parquet, then removes the least recently used
+    files beyond the disk limit. The file is written under a temporary name and renamed into
+    place, so an invocation cut short mid-write never leaves a truncated file behind.
+    """
+    _, disk_limit = reference_cache_limits()
+    os.makedirs(REFERENCE_CACHE_DIR, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=REFERENCE_CACHE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as spill:
+            dataframe.to_parquet(spill, index=False)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+    with _reference_spill_lock:
+        files = []
+        for name in os.listdir(REFERENCE_CACHE_DIR):
+            try:
+                stat = os.stat(os.path.join(REFERENCE_CACHE_DIR, name))
+            except FileNotFoundError:
+                continue
+            if name.endswith('.parquet'):
+                files.append((stat.st_mtime, stat.st_size, os.path.join(REFERENCE_CACHE_DIR, name)))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for _, size, file in files[:-1]:
+            if total <= disk_limit:
+                break
+            total -= size
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                pass
+
+def load_cached_object(bucket, file, spec=None):
+    """
+    Read-through cache for load_object, keyed by object key, ETag and read spec, so an unchanged
+    object is neither downloaded nor parsed again by a warm container. Objects are looked up in
+    memory, then in /tmp, and only then loaded from S3. A file evicted by another thread, or one
+    that cannot be read, counts as a miss.
+    """
+    identity = json.dumps([bucket, file['Key'], file['ETag'], spec], sort_keys=True)
+    cache_key = hashlib.sha256(identity.encode()).hexdigest()
+
+    with _reference_cache_lock:
+        if cache_key in _reference_cache:
+            _reference_cache.move_to_end(cache_key)
+            return _reference_cache[cache_key][0].copy(deep=False)
+
+    path = os.path.join(REFERENCE_CACHE_DIR, f"{cache_key}.parquet")
+    try:
+        dataframe = pd.read_parquet(path)
+        os.utime(path)
+        logging.info(f"Loaded file from cache: {file['Key']}")
+    except FileNotFoundError:
+        dataframe = None
+    except Exception as e:
+        logging.warning(f"Cached copy of {file['Key']} could not be read ({e}); loading it from S3.")
+        dataframe = None
+
+    if dataframe is None:
+        dataframe = load_object(bucket, file['Key'], spec)
+        spill_reference(path, dataframe)
+
+    remember_reference(cache_key, dataframe)
+    return dataframe.copy(deep=False)
+
+def load_objects(bucket, objects, spec=None, cached=False):
+    """
+    Loads the listed objects into one DataFrame, on a bounded thread pool.
+    The DataFrames are concatenated in listing order whatever order the downloads finish in.
+    A read spec (see READ_SPECS) limits the columns read and sets their dtypes.
+    With cached set, objects go through the reference cache (load_cached_object).
+    """
+    if not objects:
         return pd.DataFrame()
 
-    dataframes = []
-    for file in files['Contents']:
-        file_key = file['Key']
-        if file_key.endswith('.csv'):
-            logging.info(f"Loading file: {file_key}")
-            obj = s3.get_object(Bucket=bucket, Key=file_key)
-            df = pd.read_csv(BytesIO(obj['Body'].read()))
-            dataframes.append(df)
+    def load(file):
+        if cached:
+            return load_cached_object(bucket, file, spec)
+        return load_object(bucket, file['Key'], spec)
 
-    return pd.concat(dataframes, ignore_index=True) if dataframes else pd.DataFrame()
+    return pd.concat(map_concurrently(load, objects, load_workers()), ignore_index=True)
 
-def perform_transformations(raw_data):
+def load_table_from_s3(bucket, prefix, spec=None, cached=False):
     """
-    Performs transformations for all tables.
+    Loads all CSV files, plain or compressed, and Parquet files from the specified bucket
+    and prefix into a DataFrame.
     """
-    transformed_data = {}
-    
-    # Existing transformations
-    transformed_data['dim_date'] = transform_dim_date(raw_data.get('sales_order', pd.DataFrame()))
-    transformed_data['dim_staff'] = transform_dim_staff(
-        raw_data.get('staff', pd.DataFrame()), 
-        raw_data.get('department', pd.DataFrame())
+    with measure('load_table_from_s3', prefix.split('/')[0]) as metrics:
+        dataframe = load_objects(bucket, list_table_objects(bucket, prefix), spec, cached)
+        metrics['rows'] = len(dataframe)
+        metrics['bytes'] = frame_bytes(dataframe)
+    return dataframe
+
+def incremental_enabled():
+    """
+    Incremental processing is switched on by setting INCREMENTAL_TRANSFORM=true on the Lambda.
+    """
+    return os.environ.get('INCREMENTAL_TRANSFORM', 'false').lower() == 'true'
+
+def ledger_shard(key):
+    """
+    Returns the ledger shard of a source key: its directory, e.g. staff/2024/01/01.
+    """
+    return key.rpartition('/')[0]
+
+def read_ledger_file(ledger_key):
+    """
+    Reads a ledger file from the code bucket, or returns None if there is none.
+    """
+    try:
+        obj = s3.get_object(Bucket=CODE_BUCKET, Key=ledger_key)
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'NoSuchKey':
+            return None
+        raise
+    return json.loads(obj['Body'].read())
+
+def load_ledger(shard):
+    """
+    Loads the keys and ETags of the already processed objects of a ledger shard (see ledger_shard).
+    """
+    return read_ledger_file(f"{LEDGER_PREFIX}/{shard}/{LEDGER_SHARD}") or {}
+
+def save_ledger(shard, ledger):
+    """
+    Saves the keys and ETags of the processed objects of a ledger shard.
+    """
+    s3.put_object(
+        Bucket=CODE_BUCKET, Key=f"{LEDGER_PREFIX}/{shard}/{LEDGER_SHARD}", Body=json.dumps(ledger)
     )
-    
-    # Additional transformations
-    transformed_data['dim_counterparty'] = transform_dim_counterparty(raw_data.get('counterparty', pd.DataFrame()))
-    transformed_data['dim_currency'] = transform_dim_currency(raw_data.get('currency', pd.DataFrame()))
-    transformed_data['dim_transaction'] = transform_dim_transaction(
-        raw_data.get('transaction', pd.DataFrame()), 
-        raw_data.get('payment', pd.DataFrame())
+
+def migrate_ledger(table_name):
+    """
+    Splits the single ledger file a table had before ledgers were sharded into its shards, then deletes it.
+    Entries already in a shard are kept over those of the old file.
+    """
+    legacy_key = f"{LEDGER_PREFIX}/{table_name}.json"
+    legacy = read_ledger_file(legacy_key)
+    if legacy is None:
+        return
+
+    shards = {}
+    for key, etag in legacy.items():
+        shards.setdefault(ledger_shard(key), {})[key] = etag
+    for shard, entries in shards.items():
+        save_ledger(shard, {**entries, **load_ledger(shard)})
+    logging.info(f"Split the ledger of {table_name} into {len(shards)} shards.")
+    s3.delete_object(Bucket=CODE_BUCKET, Key=legacy_key)
+
+def list_source_objects(triggered_files):
+    """
+    Lists the loadable objects of each table of the triggered files. Returns {table: (bucket, objects)}.
+    """
+    objects = {}
+    for table_name, files in group_files_by_table(triggered_files).items():
+        listed = [obj for file in files for obj in list_table_objects(file['bucket'], file['key'])]
+        objects[table_name] = (files[0]['bucket'], listed)
+    return objects
+
+def select_new_objects(objects):
+    """
+    Keeps, for each table, the objects missing from the ledger or whose ETag changed since they were processed.
+    Only the ledger shards of the listed objects are loaded.
+    """
+    new_objects = {}
+    for table_name, (bucket, listed) in objects.items():
+        migrate_ledger(table_name)
+        shards = sorted({ledger_shard(file['Key']) for file in listed})
+        ledger = {}
+        for shard_ledger in map_concurrently(load_ledger, shards, len(shards)):
+            ledger.update(shard_ledger)
+        new_objects[table_name] = [file for file in listed if ledger.get(file['Key']) != file['ETag']]
+    return new_objects
+
+def whole_table_files(tables, whole):
+    """
+    Returns the files of tables grouped by group_files_by_table, with those of the tables in whole
+    replaced by their full table/ prefix in the same bucket.
+    """
+    return [
+        file
+        for table_name, files in tables.items()
+        for file in ([{'bucket': files[0]['bucket'], 'key': f"{table_name}/"}] if table_name in whole else files)
+    ]
+
+def load_new_raw_data(triggered_files):
+    """
+    Incremental counterpart of load_raw_data: loads only the objects of each table that are
+    missing from its ledger, or whose ETag changed since they were processed.
+    Lookup tables (LOOKUP_TABLES) are always loaded in full, and the table they are joined
+    onto is loaded in full too whenever the lookup table itself has new objects (see joined_tables).
+    Both are listed from their whole table/ prefix, whatever keys triggered the run.
+    Returns the raw data and the new objects of each table, to be recorded once saved.
+    """
+    tables = group_files_by_table(triggered_files)
+    lookups = joined_tables(tables, set())
+    objects = list_source_objects(whole_table_files({table: tables[table] for table in lookups}, lookups))
+    new_objects = select_new_objects(objects)
+
+    full_tables = joined_tables(tables, {table for table in lookups if new_objects[table]})
+    others = {table: files for table, files in tables.items() if table not in lookups}
+    other_objects = list_source_objects(whole_table_files(others, full_tables))
+    objects.update(other_objects)
+    new_objects.update(select_new_objects(other_objects))
+
+    def load_table(table_name):
+        bucket, listed = objects[table_name]
+        to_load = listed if table_name in full_tables else new_objects[table_name]
+        return load_objects(bucket, to_load, READ_SPECS.get(table_name), table_name in REFERENCE_TABLES)
+
+    raw_data = dict(zip(objects, map_concurrently(load_table, objects, len(objects))))
+    return raw_data, new_objects
+
+def record_processed_objects(new_objects):
+    """
+    Adds the objects processed by an incremental run to their ledger shards, rewriting only those shards.
+    The read-modify-write relies on transform runs never overlapping (see publish_snapshot).
+    """
+    processed = {}
+    for objects in new_objects.values():
+        for file in objects:
+            processed.setdefault(ledger_shard(file['Key']), {})[file['Key']] = file['ETag']
+    for shard, entries in processed.items():
+        save_ledger(shard, {**load_ledger(shard), **entries})
+
+def load_snapshot_manifest(table_name):
+    """
+    Loads the manifest pointing at the current snapshot of a dimension, or None if there is none.
+    """
+    try:
+        obj = s3.get_object(Bucket=TARGET_BUCKET, Key=f"{table_name}/{SNAPSHOT_MANIFEST}")
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'NoSuchKey':
+            return None
+        raise
+    return json.loads(obj['Body'].read())
+
+def latest_parquet_key(table_name):
+    """
+    Returns the key of the latest Parquet file saved for a table, or None if there is none.
+    """
+    files = list_all_objects(TARGET_BUCKET, f"{table_name}/")
+    keys = [file['Key'] for file in files if file['Key'].endswith('.parquet')]
+    return max(keys) if keys else None
+
+def current_snapshot_key(table_name):
+    """
+    Returns the key of the current snapshot of a dimension: the one named by its manifest or,
+    for dimensions saved before manifests were written, the latest Parquet file. None if there is none.
+    """
+    manifest = load_snapshot_manifest(table_name)
+    return manifest['snapshot'] if manifest else latest_parquet_key(table_name)
+
+def load_dimension_snapshot(table_name, key=None, columns=None):
+    """
+    Loads a snapshot of a dimension (the current one by default), or an empty DataFrame.
+    Of the requested columns, only those in the snapshot are read, so a snapshot saved in an
+    older layout comes back without the columns it lacks.
+    """
+    key = key or current_snapshot_key(table_name)
+    if key is None:
+        return pd.DataFrame()
+
+    obj = s3.get_object(Bucket=TARGET_BUCKET, Key=key)
+    return read_parquet_with_spec(BytesIO(obj['Body'].read()), columns)
+
+def merge_dimension(snapshot, batch, keys):
+    """
+    Upserts the batch rows into the snapshot on the natural key. When rows share a key the one with
+    the latest last_updated wins, and on equal or missing last_updated the batch row wins.
+    Returns the merged dimension sorted by its key.
+    """
+    merged = pd.concat([snapshot, batch], ignore_index=True)
+    if 'last_updated' in merged:
+        merged = merged.sort_values('last_updated', kind='stable', na_position='first')
+    merged = merged.drop_duplicates(subset=keys, keep='last')
+    return merged.sort_values(keys).reset_index(drop=True)
+
+def snapshot_key(table_name):
+    """
+    Returns a new, unique key for a snapshot of a dimension.
+    """
+    now = datetime.utcnow()
+    return f"{table_name}/{now.strftime('%Y/%m/%d')}/{table_name}-{now.strftime('%H%M%S%f')}.parquet"
+
+def write_snapshot(dataframe, table_name):
+    """
+    Writes a dimension snapshot as a new Parquet object, never overwriting an existing one.
+    Returns its key.
+    """
+    file_key = snapshot_key(table_name)
+    logging.info(f"Saving snapshot of {table_name} to: {file_key}")
+    write_parquet_to_s3(compact_dataframe(dataframe, table_name), TARGET_BUCKET, file_key)
+    return file_key
+
+def publish_snapshot(table_name, build):
+    """
+    Builds a new snapshot of a dimension on top of the current one and publishes it. build is called with
+    the key of the current snapshot (or None), writes the new snapshot to a new object and returns its key
+    and row count. The manifest is then switched to it, so readers only ever see complete snapshots.
+    Re-reading the manifest before the switch is not atomic, so it only catches a run that published
+    before this one finished building; concurrent runs are prevented by the transform Lambda's
+    reserved concurrency of 1. When the manifest did change, the snapshot is built again on top of it.
+    Only the new and the previous snapshots are kept: once the manifest is switched, the snapshot it
+    used to name as previous is deleted, so a reader that loaded the old manifest can still finish.
+    """
+    for _ in range(SNAPSHOT_PUBLISH_ATTEMPTS):
+        base_manifest = load_snapshot_manifest(table_name)
+        base_key = base_manifest['snapshot'] if base_manifest else latest_parquet_key(table_name)
+        new_key, rows = build(base_key)
+
+        if load_snapshot_manifest(table_name) == base_manifest:
+            manifest = {'snapshot': new_key, 'previous': base_key, 'rows': rows}
+            s3.put_object(
+                Bucket=TARGET_BUCKET, Key=f"{table_name}/{SNAPSHOT_MANIFEST}", Body=json.dumps(manifest)
+            )
+            expired = base_manifest.get('previous') if base_manifest else None
+            if expired and expired not in (base_key, new_key):
+                s3.delete_object(Bucket=TARGET_BUCKET, Key=expired)
+            return new_key
+
+        logging.warning(f"Snapshot of {table_name} changed while merging; retrying.")
+        s3.delete_object(Bucket=TARGET_BUCKET, Key=new_key)
+
+    raise RuntimeError(f"Could not publish a snapshot of {table_name} after {SNAPSHOT_PUBLISH_ATTEMPTS} attempts.")
+
+def upsert_dimension(dataframe, table_name):
+    """
+    Merges the rows of a run into the current snapshot of a dimension and publishes the result.
+    A snapshot without the dimension's key columns, saved in a layout older than snapshots, is replaced.
+    """
+    keys = DIMENSION_KEYS[table_name]
+
+    def build(base_key):
+        snapshot = load_dimension_snapshot(table_name, base_key)
+        if not snapshot.empty and not set(keys) <= set(snapshot.columns):
+            logging.warning(f"Snapshot {base_key} of {table_name} has no {keys} columns; replacing it.")
+            snapshot = pd.DataFrame()
+        merged = merge_dimension(snapshot, dataframe, keys)
+        return write_snapshot(merged, table_name), len(merged)
+
+    with measure('upsert_dimension', table_name) as metrics:
+        metrics['rows'] = len(dataframe)
+        metrics['bytes'] = frame_bytes(dataframe)
+        return publish_snapshot(table_name, build)
+
+def streaming_enabled():
+    """
+    Streaming of row-local outputs is switched on by setting STREAM_TRANSFORM=true on the Lambda.
+    """
+    return os.environ.get('STREAM_TRANSFORM', 'false').lower() == 'true'
+
+def open_csv_stream(body, file_key):
+    """
+    Wraps an S3 object body in a forward-only stream of CSV text bytes, decompressing as it is read,
+    so a chunked reader never holds the whole object.
+    """
+    if file_key.endswith('.gz'):
+        return gzip.GzipFile(fileobj=body, mode='rb')
+    if file_key.endswith('.zst'):
+        import pyarrow as pa
+        return pa.input_stream(pa.PythonFile(body, mode='r'), compression='zstd')
+    return body
+
+def iter_object_chunks(bucket, file_key, spec=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Reads one extract object as DataFrames of at most chunk_size rows, applying the read spec like load_object.
+    """
+    obj = s3.get_object(Bucket=bucket, Key=file_key)
+    if file_key.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(BytesIO(obj['Body'].read()))
+        names = parquet_file.schema_arrow.names
+        columns = None if spec is None else [column for column in names if column in spec]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    options = {}
+    if spec is not None:
+        options['usecols'] = lambda column: column in spec
+        options['dtype'] = {column: dtype for column, dtype in spec.items() if dtype != 'datetime'}
+    with pd.read_csv(open_csv_stream(obj['Body'], file_key), chunksize=chunk_size, **options) as reader:
+        for chunk in reader:
+            for column in chunk.columns:
+                if spec is not None and spec[column] == 'datetime':
+                    chunk[column] = pd.to_datetime(chunk[column], format='ISO8601')
+            yield chunk
+
+def latest_rows(keys, updated, positions):
+    """
+    Reduces rows to the winning row of each key, as a DataFrame of last_updated and position indexed by key.
+    The latest last_updated wins, missing ones count as oldest and later positions win ties.
+    """
+    rows = pd.DataFrame(
+        {'last_updated': updated.fillna(pd.Timestamp.min).to_numpy(), 'position': positions}, index=keys
     )
-    transformed_data['dim_address'] = transform_dim_address(raw_data.get('address', pd.DataFrame()))
-    
-    return transformed_data
+    rows = rows.sort_values('last_updated', kind='stable')
+    return rows[~rows.index.duplicated(keep='last')]
+
+def spool_transformed_chunks(table_name, bucket, objects, path):
+    """
+    First pass of a streamed dimension: transforms the source chunk by chunk into a local Parquet spool
+    written with arrow_schema. Only the winning row of each key is remembered (see latest_rows).
+    Returns those winners, the spool schema and its row count, or None if nothing was written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    function, sources = TRANSFORMATIONS[table_name]
+    key = DIMENSION_KEYS[table_name][0]
+    winners = None
+    writer = None
+    position = 0
+    try:
+        for file in objects:
+            for chunk in iter_object_chunks(bucket, file['Key'], READ_SPECS.get(sources[0])):
+                transformed = compact_dataframe(function(compact_dataframe(chunk, sources[0])), table_name)
+                if transformed.empty:
+                    continue
+                schema = writer.schema if writer else arrow_schema(transformed)
+                writer = writer or pq.ParquetWriter(path, schema)
+                writer.write_table(pa.Table.from_pandas(transformed, schema=schema, preserve_index=False))
+
+                updated = transformed.get('last_updated', pd.Series(pd.NaT, index=transformed.index))
+                chunk_winners = latest_rows(
+                    transformed[key].to_numpy(), updated, pd.RangeIndex(position, position + len(transformed))
+                )
+                winners = chunk_winners if winners is None else latest_rows(
+                    pd.concat([winners, chunk_winners]).index,
+                    pd.concat([winners['last_updated'], chunk_winners['last_updated']]),
+                    pd.concat([winners['position'], chunk_winners['position']]).to_numpy(),
+                )
+                position += len(transformed)
+    finally:
+        if writer is not None:
+            writer.close()
+    return (winners, writer.schema, position) if writer is not None else None
+
+def conform_table(table, schema):
+    """
+    Fits an Arrow table read from a snapshot to the schema of a new one. Columns missing from snapshots
+    saved in an older layout are added as nulls, as concatenating DataFrames does in merge_dimension.
+    """
+    import pyarrow as pa
+
+    for field in schema:
+        if field.name not in table.schema.names:
+            table = table.append_column(field.name, pa.nulls(table.num_rows, field.type))
+    return table.select(schema.names).cast(schema)
+
+def stream_dimension(table_name, bucket, objects):
+    """
+    Builds a row-local dimension in fixed memory: its source is transformed chunk by chunk into a
+    local spool, then the current snapshot and the spool are streamed into a new snapshot, keeping
+    the last-write-wins row of each key as merge_dimension does. Only the keys are held in memory,
+    and rows are filtered as Arrow batches. Rows are not sorted by key. The two passes are measured
+    as the transform and upsert_dimension stages, with the size of the spool as their bytes.
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    key = DIMENSION_KEYS[table_name][0]
+    with tempfile.TemporaryDirectory() as spool_dir:
+        spool_path = os.path.join(spool_dir, f"{table_name}.parquet")
+        with measure('transform', table_name) as metrics:
+            spooled = spool_transformed_chunks(table_name, bucket, objects, spool_path)
+            if spooled is not None:
+                metrics['rows'] = spooled[2]
+                metrics['bytes'] = os.path.getsize(spool_path)
+        if spooled is None:
+            logging.warning(f"No data to save for {table_name}.")
+            return None
+        winners, schema, spooled_rows = spooled
+
+        def build(base_key):
+            new_key = snapshot_key(table_name)
+            beaten = []
+            rows = 0
+            with parquet_writer_to_s3(TARGET_BUCKET, new_key, schema) as writer:
+                if base_key is not None:
+                    obj = s3.get_object(Bucket=TARGET_BUCKET, Key=base_key)
+                    for batch in pq.ParquetFile(BytesIO(obj['Body'].read())).iter_batches():
+                        keys = batch.column(key).to_pandas()
+                        if 'last_updated' in batch.schema.names:
+                            updated = batch.column('last_updated').to_pandas().fillna(pd.Timestamp.min)
+                        else:
+                            updated = pd.Series(pd.Timestamp.min, index=keys.index)
+                        in_batch = keys.isin(winners.index).to_numpy()
+                        batch_time = winners['last_updated'].reindex(keys).to_numpy()
+                        keep = ~in_batch | (updated.to_numpy() > batch_time)
+                        beaten.append(keys[in_batch & keep].to_numpy())
+                        if keep.any():
+                            kept = pa.Table.from_batches([batch.filter(pa.array(keep))])
+                            writer.write_table(conform_table(kept, schema))
+                            rows += int(keep.sum())
+
+                survivors = winners['position'].drop(index=np.concatenate(beaten)) if beaten else winners['position']
+                keep = np.zeros(spooled_rows, dtype=bool)
+                keep[survivors.to_numpy()] = True
+                position = 0
+                for batch in pq.ParquetFile(spool_path).iter_batches():
+                    batch_keep = keep[position:position + batch.num_rows]
+                    position += batch.num_rows
+                    if batch_keep.any():
+                        writer.write_table(pa.Table.from_batches([batch.filter(pa.array(batch_keep))]).cast(schema))
+                        rows += int(batch_keep.sum())
+            return new_key, rows
+
+        with measure('upsert_dimension', table_name) as metrics:
+            metrics['rows'] = spooled_rows
+            metrics['bytes'] = os.path.getsize(spool_path)
+            return publish_snapshot(table_name, build)
+
+def stream_transformations(outputs, source_files, incremental=False):
+    """
+    Runs the streaming outputs (STREAMING_OUTPUTS) whose source no other output needs, chunk by chunk.
+    Returns the outputs and files left for the in-memory run, and the new objects of the streamed
+    tables (empty unless incremental).
+    """
+    in_memory_sources = {
+        source for output in outputs if output not in STREAMING_OUTPUTS for source in TRANSFORMATIONS[output][1]
+    }
+    streamed = [
+        output for output in outputs
+        if output in STREAMING_OUTPUTS and TRANSFORMATIONS[output][1][0] not in in_memory_sources
+    ]
+    streamed_sources = {TRANSFORMATIONS[output][1][0] for output in streamed}
+
+    objects = list_source_objects(
+        [file for file in source_files if file['key'].split('/')[0] in streamed_sources]
+    )
+    new_objects = select_new_objects(objects) if incremental else {}
+    for output in streamed:
+        source = TRANSFORMATIONS[output][1][0]
+        if source in objects:
+            bucket, listed = objects[source]
+            stream_dimension(output, bucket, new_objects[source] if incremental else listed)
+
+    remaining_outputs = [output for output in outputs if output not in streamed]
+    remaining_files = [file for file in source_files if file['key'].split('/')[0] not in streamed_sources]
+    return remaining_outputs, remaining_files, new_objects
+
+def perform_transformations(raw_data, outputs=None):
+    """
+    Performs the transformations for the requested outputs (all of TRANSFORMATIONS by default)
+    and the outputs they are built from. Lookup sources that were not requested are passed as empty
+    DataFrames. Transformations whose inputs are ready run concurrently, each measured as the
+    transform stage of its output.
+    """
+    outputs = list(TRANSFORMATIONS) if outputs is None else outputs
+
+    pending = set()
+    stack = list(outputs)
+    while stack:
+        output = stack.pop()
+        if output not in pending:
+            pending.add(output)
+            stack.extend(
+                source for source in TRANSFORMATIONS[output][1]
+                if source in TRANSFORMATIONS and source not in LOOKUP_SOURCES.get(output, set())
+            )
+
+    results = {}
+
+    def run(output):
+        function, sources = TRANSFORMATIONS[output]
+        inputs = [
+            results.get(source, pd.DataFrame()) if source in TRANSFORMATIONS else raw_data.get(source, pd.DataFrame())
+            for source in sources
+        ]
+        with measure('transform', output) as metrics:
+            result = function(*inputs)
+            metrics['rows'] = len(result)
+            metrics['bytes'] = frame_bytes(result)
+        return result
+
+    while pending:
+        ready = [
+            output for output in TRANSFORMATIONS
+            if output in pending and not set(TRANSFORMATIONS[output][1]) & pending
+        ]
+        if not ready:
+            raise ValueError(f"Transformations depend on each other: {sorted(pending)}")
+        results.update(zip(ready, map_concurrently(run, ready, len(ready))))
+        pending.difference_update(ready)
+
+    return {output: results[output] for output in TRANSFORMATIONS if output in results}
 
 
 def save_transformed_data(transformed_data):
     """
-    Saves transformed data back to S3 as Parquet files.
+    Saves transformed data back to S3 as Parquet files. Dimensions are upserted into their
+    current snapshot, so a run only needs the rows that changed.
     """
     for table_name, dataframe in transformed_data.items():
-        if not dataframe.empty:
+        if dataframe.empty:
+            logging.warning(f"No data to save for {table_name}.")
+        elif table_name in DIMENSION_KEYS:
+            upsert_dimension(dataframe, table_name)
+        else:
             save_to_s3(dataframe, table_name)
+
+def row_group_size():
+    """
+    Rows per Parquet row group, set by PARQUET_ROW_GROUP_SIZE on the Lambda.
+    """
+    return int(os.environ.get('PARQUET_ROW_GROUP_SIZE', '100000'))
+
+def dictionary_columns():
+    """
+    Columns to dictionary-encode, set by PARQUET_DICTIONARY on the Lambda:
+    'true' for all columns, 'false' for none, or a comma-separated list of columns.
+    """
+    setting = os.environ.get('PARQUET_DICTIONARY', 'true').strip()
+    if setting.lower() in ('true', 'false'):
+        return setting.lower() == 'true'
+    return [column.strip() for column in setting.split(',') if column.strip()]
+
+@contextmanager
+def parquet_writer_to_s3(bucket, key, schema):
+    """
+    Opens a ParquetWriter that uploads to S3 as it writes, with dictionary encoding and column
+    min/max statistics so readers can skip row groups. The upload is aborted if anything fails.
+    """
+    import pyarrow.parquet as pq
+
+    sink = MultipartUploadWriter(s3, bucket, key)
+    try:
+        with pq.ParquetWriter(
+            sink, schema, use_dictionary=dictionary_columns(), write_statistics=True, compression='snappy'
+        ) as writer:
+            yield writer
+        sink.close()
+    except Exception:
+        sink.abort()
+        raise
+
+def arrow_schema(dataframe):
+    """
+    Arrow schema a compacted DataFrame is written with. Categoricals are always dictionaries of int32
+    indices, whatever the number of categories pandas sized their codes for, and strings (or columns
+    with only nulls) are always large strings.
+    """
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(dataframe, preserve_index=False)
+    fields = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), pa.large_string()))
+        elif pa.types.is_string(field.type) or pa.types.is_null(field.type):
+            field = field.with_type(pa.large_string())
+        fields.append(field)
+    return pa.schema(fields, metadata=schema.metadata)
+
+def write_parquet_to_s3(dataframe, bucket, key):
+    """
+    Writes a DataFrame to S3 as Parquet, one row group of row_group_size() rows at a time,
+    so each row group is converted and uploaded as it is written.
+    """
+    import pyarrow as pa
+
+    rows = row_group_size()
+    schema = arrow_schema(dataframe)
+    with parquet_writer_to_s3(bucket, key, schema) as writer:
+        for start in range(0, len(dataframe), rows):
+            chunk = dataframe.iloc[start:start + rows]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+def partition_paths(dataframe, table_name, run_time):
+    """
+    Splits a DataFrame into Hive-style year=/month=/day= partitions on its PARTITION_COLUMNS date,
+    or on the run date for outputs without one. Rows without a date go to the default partition.
+    Yields (path, rows) pairs.
+    """
+    column = PARTITION_COLUMNS.get(table_name)
+    if column is None:
+        yield f"{table_name}/year={run_time:%Y}/month={run_time:%m}/day={run_time:%d}", dataframe
+        return
+
+    dates = pd.to_datetime(dataframe[column])
+    for day, rows in dataframe.groupby(dates.dt.normalize(), sort=True, dropna=False):
+        if pd.isna(day):
+            yield f"{table_name}/year=__HIVE_DEFAULT_PARTITION__", rows
         else:
-            logging.warning(f"No data to save for {table_name}.")
+            yield f"{table_name}/year={day:%Y}/month={day:%m}/day={day:%d}", rows
+
+def fact_row_keys(table, columns):
+    """
+    Returns the FACT_KEYS columns of an Arrow table as a MultiIndex of integers, so rows saved by
+    earlier runs compare equal to new ones whatever the units of their dates and times.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    arrays = []
+    for column in columns:
+        values = table.column(column)
+        if pa.types.is_timestamp(values.type):
+            values = values.cast(pa.timestamp('us'))
+        arrays.append(pc.fill_null(values.cast(pa.int64()), -1).to_numpy())
+    return pd.MultiIndex.from_arrays(arrays, names=columns)
+
+def unsaved_rows(rows, table_name, saved_keys):
+    """
+    Drops the rows of a partition whose FACT_KEYS are already in one of its saved files, or repeated in the batch.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = FACT_KEYS[table_name]
+    keys = fact_row_keys(pa.Table.from_pandas(rows[columns], preserve_index=False), columns)
+    new = ~keys.duplicated(keep='last')
+    for key in saved_keys:
+        obj = s3.get_object(Bucket=TARGET_BUCKET, Key=key)
+        new &= ~keys.isin(fact_row_keys(pq.read_table(BytesIO(obj['Body'].read()), columns=columns), columns))
+    return rows[new]
 
 def save_to_s3(dataframe, table_name):
     """
-    Saves a DataFrame as a Parquet file to the target S3 bucket.
+    Saves a DataFrame as new Parquet files in Hive-style date partitions of the target S3 bucket,
+    so that each run of a fact table adds its rows instead of replacing those of earlier runs.
+    Rows already saved in their partition (see FACT_KEYS) are skipped, so reloading source objects
+    that were processed before does not duplicate them.
     """
-    buffer = BytesIO()
-    dataframe.to_parquet(buffer, index=False)
-    buffer.seek(0)
+    now = datetime.utcnow()
+    with measure('save_to_s3', table_name) as metrics:
+        saved = {}
+        if table_name in FACT_KEYS:
+            for file in list_all_objects(TARGET_BUCKET, f"{table_name}/"):
+                if file['Key'].endswith('.parquet'):
+                    saved.setdefault(file['Key'].rsplit('/', 1)[0], []).append(file['Key'])
 
-    file_key = f"{table_name}/{datetime.utcnow().strftime('%Y/%m/%d')}/{table_name}.parquet"
-    logging.info(f"Saving transformed data to: {file_key}")
-    s3.put_object(Bucket=TARGET_BUCKET, Key=file_key, Body=buffer.getvalue())
+        dataframe = compact_dataframe(dataframe, table_name)
+        metrics['rows'] = len(dataframe)
+        metrics['bytes'] = frame_bytes(dataframe)
+        for path, rows in partition_paths(dataframe, table_name, now):
+            if table_name in FACT_KEYS:
+                rows = unsaved_rows(rows, table_name, saved.get(path, []))
+                if rows.empty:
+                    logging.info(f"Rows for {path} are already saved.")
+                    continue
+            file_key = f"{path}/{table_name}-{now.strftime('%Y%m%dT%H%M%S%f')}.parquet"
+            logging.info(f"Saving transformed data to: {file_key}")
+            write_parquet_to_s3(rows, TARGET_BUCKET, file_key)
 
 # --- Transformation Functions ---
 
+# Columns each transformation reads from its source tables, with the dtypes to read them as
+READ_SPECS = {
+    'sales_order': {
+        'sales_order_id': 'Int64', 'order_date': 'datetime', 'created_at': 'datetime',
+        'last_updated': 'datetime', 'design_id': 'Int64', 'staff_id': 'Int64', 'counterparty_id': 'Int64',
+        'units_sold': 'Int64', 'unit_price': 'float64', 'currency_id': 'Int64',
+        'agreed_delivery_date': 'datetime', 'agreed_payment_date': 'datetime',
+        'agreed_delivery_location_id': 'Int64'
+    },
+    'staff': {
+        'staff_id': 'Int64', 'first_name': 'string', 'last_name': 'string',
+        'department_id': 'Int64', 'email_address': 'string', 'last_updated': 'datetime'
+    },
+    'department': {
+        'department_id': 'Int64', 'department_name': 'string', 'location': 'string', 'manager': 'string'
+    },
+    'counterparty': {
+        'counterparty_id': 'Int64', 'name': 'string', 'address_id': 'Int64', 'phone_number': 'string',
+        'last_updated': 'datetime'
+    },
+    'currency': {
+        'currency_id': 'Int64', 'currency_code': 'string', 'description': 'string', 'last_updated': 'datetime'
+    },
+    'transaction': {'transaction_id': 'Int64', 'timestamp': 'datetime', 'last_updated': 'datetime'},
+    'payment': {
+        'payment_id': 'Int64', 'transaction_id': 'Int64', 'amount': 'float64', 'payment_type_id': 'Int64'
+    },
+    'address': {
+        'address_id': 'Int64', 'street': 'string', 'city': 'string', 'state': 'string',
+        'zip_code': 'string', 'country': 'string', 'last_updated': 'datetime'
+    },
+}
+
+def with_last_updated(dataframe, columns):
+    """
+    Selects the columns of a dimension, keeping the source last_updated when there is one
+    so that snapshots can be merged last-write-wins.
+    """
+    if 'last_updated' in dataframe:
+        columns = columns + ['last_updated']
+    return dataframe[columns]
+
+def build_calendar(start, end):
+    """
+    Builds dim_date rows for every day from start to end inclusive, in one vectorized pass.
+    day_of_week runs from 1 (Monday) to 7 (Sunday).
+    """
+    dates = pd.date_range(start, end, freq='D', name='date_id')
+    return pd.DataFrame({
+        'date_id': dates,
+        'year': dates.year,
+        'month': dates.month,
+        'day': dates.day,
+        'day_of_week': dates.dayofweek + 1,
+        'day_name': dates.day_name(),
+        'month_name': dates.month_name(),
+        'quarter': dates.quarter,
+    })
+
+def load_calendar_range():
+    """
+    Returns the first and last dates of the saved dim_date snapshot, or None if there is none.
+    A dim_date saved before calendar snapshots (without date_id) does not count as one.
+    """
+    calendar = load_dimension_snapshot('dim_date', columns=['date_id'])
+    if 'date_id' not in calendar:
+        return None
+    return calendar['date_id'].min(), calendar['date_id'].max()
+
 def transform_dim_date(sales_order_df):
     """
-    Example transformation: Creates dim_date table from sales_order data.
+    Creates the dim_date rows needed by the sales_order data, covering all of its CALENDAR_COLUMNS. The saved dim_date snapshot acts as a cache: only whole calendar years outside
+    its range are built, and they are merged into it when saved.
     """
     if sales_order_df.empty:
         logging.warning("Sales order data is empty; skipping dim_date transformation.")
         return pd.DataFrame()
 
-    dim_date = sales_order_df[['order_date']].drop_duplicates()
-    dim_date['year'] = pd.to_datetime(dim_date['order_date']).dt.year
-    dim_date['month'] = pd.to_datetime(dim_date['order_date']).dt.month
-    return dim_date
+    dates = pd.concat([
+        pd.to_datetime(sales_order_df[column], format='ISO8601')
+        for column in CALENDAR_COLUMNS if column in sales_order_df
+    ]).dropna()
+    if dates.empty:
+        logging.warning("Sales order data has no dates; skipping dim_date transformation.")
+        return pd.DataFrame()
+    first = pd.Timestamp(dates.min().year, 1, 1)
+    last = pd.Timestamp(dates.max().year, 12, 31)
+
+    cached = load_calendar_range()
+    if cached is None:
+        return build_calendar(first, last)
+
+    cached_first, cached_last = cached
+    missing = []
+    if first < cached_first:
+        missing.append(build_calendar(first, cached_first - pd.Timedelta(days=1)))
+    if last > cached_last:
+        missing.append(build_calendar(cached_last + pd.Timedelta(days=1), last))
+    if not missing:
+        logging.info("Order dates are within the cached calendar; dim_date is unchanged.")
+        return pd.DataFrame()
+    return pd.concat(missing, ignore_index=True)
 
 def transform_dim_staff(staff_df, department_df):
     """
@@ -143,12 +1343,16 @@ def transform_dim_staff(staff_df, department_df):
         logging.warning("Staff or department data is empty; skipping dim_staff transformation.")
         return pd.DataFrame()
 
+    # The department table is loaded whole, with every saved version of a row; the last one listed is the latest
+    departments = department_df.drop_duplicates('department_id', keep='last')
     dim_staff = staff_df.merge(
-        department_df[['department_id', 'department_name', 'location', 'manager']],
+        departments[['department_id', 'department_name', 'location', 'manager']],
         on='department_id', how='left'
     )
     
-    return dim_staff[['staff_id', 'first_name', 'last_name', 'department_name', 'location', 'email_address']]
+    return with_last_updated(
+        dim_staff, ['staff_id', 'first_name', 'last_name', 'department_name', 'location', 'email_address']
+    )
 
 def transform_dim_counterparty(counterparty_df):
     """
@@ -158,7 +1362,9 @@ def transform_dim_counterparty(counterparty_df):
         logging.warning("Counterparty data is empty; skipping dim_counterparty transformation.")
         return pd.DataFrame()
 
-    dim_counterparty = counterparty_df[['counterparty_id', 'name', 'address_id', 'phone_number']].drop_duplicates()
+    dim_counterparty = with_last_updated(
+        counterparty_df, ['counterparty_id', 'name', 'address_id', 'phone_number']
+    ).drop_duplicates()
     return dim_counterparty
 
 def transform_dim_currency(currency_df):
@@ -169,7 +1375,7 @@ def transform_dim_currency(currency_df):
         logging.warning("Currency data is empty; skipping dim_currency transformation.")
         return pd.DataFrame()
 
-    dim_currency = currency_df[['currency_id', 'currency_code', 'description']].drop_duplicates()
+    dim_currency = with_last_updated(currency_df, ['currency_id', 'currency_code', 'description']).drop_duplicates()
     return dim_currency
 
 def transform_dim_transaction(transaction_df, payment_df):
@@ -180,12 +1386,16 @@ def transform_dim_transaction(transaction_df, payment_df):
         logging.warning("Transaction or payment data is empty; skipping dim_transaction transformation.")
         return pd.DataFrame()
 
+    # The payment table is loaded whole, with every saved version of a row; the last one listed is the latest
+    payments = payment_df.drop_duplicates('payment_id', keep='last')
     dim_transaction = transaction_df.merge(
-        payment_df[['payment_id', 'amount', 'payment_type_id']],
+        payments[['payment_id', 'transaction_id', 'amount', 'payment_type_id']],
         on='transaction_id', how='left'
     )
     
-    return dim_transaction[['transaction_id', 'payment_id', 'amount', 'payment_type_id', 'timestamp']]
+    return with_last_updated(
+        dim_transaction, ['transaction_id', 'payment_id', 'amount', 'payment_type_id', 'timestamp']
+    )
 
 def transform_dim_address(address_df):
     """
@@ -195,5 +1405,102 @@ def transform_dim_address(address_df):
         logging.warning("Address data is empty; skipping dim_address transformation.")
         return pd.DataFrame()
 
-    dim_address = address_df[['address_id', 'street', 'city', 'state', 'zip_code', 'country']].drop_duplicates()
-    return dim_address
\ No newline at end of file
+    dim_address = with_last_updated(
+        address_df, ['address_id', 'street', 'city', 'state', 'zip_code', 'country']
+    ).drop_duplicates()
+    return dim_address
+
+def dimension_key_index(table_name, dimension):
+    """
+    Returns the natural keys of a dimension as a pd.Index: those of its current snapshot, loaded once,
+    plus those of the rows built by this run. A snapshot saved before the key column existed counts as empty.
+    """
+    key = DIMENSION_KEYS[table_name][0]
+    snapshot = load_dimension_snapshot(table_name, columns=[key])
+    known = [frame[key] for frame in (snapshot, dimension) if key in frame and not frame.empty]
+    return pd.Index(pd.concat(known).dropna().unique()) if known else pd.Index([])
+
+def resolve_keys(values, table_name, index):
+    """
+    Checks natural keys against the key index of a dimension (see dimension_key_index) with one
+    vectorized hash lookup (pd.Index.get_indexer), rather than a row-wise apply.
+    Keys missing from the dimension are logged but kept: fact rows are only appended, never resolved
+    again, and the dimension row may arrive in a later batch.
+    """
+    found = index.get_indexer(values) >= 0
+    unresolved = int((~found & values.notna()).sum())
+    if unresolved:
+        logging.warning(f"{unresolved} keys not found in {table_name}.")
+    return values
+
+def time_of_day(timestamps):
+    """
+    Returns the time part of timestamps as an Arrow time64 column, written to Parquet as TIME.
+    """
+    import pyarrow as pa
+    micros = (timestamps - timestamps.dt.normalize()) // pd.Timedelta(microseconds=1)
+    times = pa.array(micros, type=pa.int64(), from_pandas=True).cast(pa.time64('us'))
+    return pd.Series(pd.arrays.ArrowExtensionArray(times), index=timestamps.index)
+
+def transform_fact_sales_order(sales_order_df, dim_date, dim_staff, dim_counterparty, dim_currency, dim_address):
+    """
+    Creates fact_sales_order from sales_order data, splitting created_at and last_updated into date and
+    time columns and resolving every dimension key column-wise. The delivery location resolves
+    against dim_address, the dimension holding locations. Each dimension's keys are indexed once.
+    """
+    if sales_order_df.empty:
+        logging.warning("Sales order data is empty; skipping fact_sales_order transformation.")
+        return pd.DataFrame()
+
+    dimensions = {
+        'dim_date': dim_date, 'dim_staff': dim_staff, 'dim_counterparty': dim_counterparty,
+        'dim_currency': dim_currency, 'dim_address': dim_address,
+    }
+    index = {table_name: dimension_key_index(table_name, dimension) for table_name, dimension in dimensions.items()}
+
+    created = pd.to_datetime(sales_order_df['created_at'], format='ISO8601')
+    updated = pd.to_datetime(sales_order_df['last_updated'], format='ISO8601')
+    return pd.DataFrame({
+        'sales_order_id': sales_order_df['sales_order_id'],
+        'created_date': resolve_keys(created.dt.normalize(), 'dim_date', index['dim_date']),
+        'created_time': time_of_day(created),
+        'last_updated_date': resolve_keys(updated.dt.normalize(), 'dim_date', index['dim_date']),
+        'last_updated_time': time_of_day(updated),
+        'sales_staff_id': resolve_keys(sales_order_df['staff_id'], 'dim_staff', index['dim_staff']),
+        'counterparty_id': resolve_keys(sales_order_df['counterparty_id'], 'dim_counterparty', index['dim_counterparty']),
+        'units_sold': sales_order_df['units_sold'],
+        'unit_price': sales_order_df['unit_price'],
+        'currency_id': resolve_keys(sales_order_df['currency_id'], 'dim_currency', index['dim_currency']),
+        'design_id': sales_order_df['design_id'],
+        'agreed_payment_date': resolve_keys(
+            pd.to_datetime(sales_order_df['agreed_payment_date'], format='ISO8601').dt.normalize(), 'dim_date', index['dim_date']
+        ),
+        'agreed_delivery_date': resolve_keys(
+            pd.to_datetime(sales_order_df['agreed_delivery_date'], format='ISO8601').dt.normalize(), 'dim_date', index['dim_date']
+        ),
+        'agreed_delivery_location_id': resolve_keys(
+            sales_order_df['agreed_delivery_location_id'], 'dim_address', index['dim_address']
+        ),
+    })
+
+# Output tables, with the function that builds each one and the tables it is built from.
+# Sources are extracted tables or other outputs; plan_transformations and
+# perform_transformations use them to load and run only what an event affects.
+TRANSFORMATIONS = {
+    'dim_date': (transform_dim_date, ['sales_order']),
+    'dim_staff': (transform_dim_staff, ['staff', 'department']),
+    'dim_counterparty': (transform_dim_counterparty, ['counterparty']),
+    'dim_currency': (transform_dim_currency, ['currency']),
+    'dim_transaction': (transform_dim_transaction, ['transaction', 'payment']),
+    'dim_address': (transform_dim_address, ['address']),
+    'fact_sales_order': (
+        transform_fact_sales_order,
+        ['sales_order', 'dim_date', 'dim_staff', 'dim_counterparty', 'dim_currency', 'dim_address']
+    ),
+}
+
+# Sources an output only looks keys up in. They are built first when they are affected too,
+# but changes to them alone do not rebuild the output.
+LOOKUP_SOURCES = {
+    'fact_sales_order': {'dim_date', 'dim_staff', 'dim_counterparty', 'dim_currency', 'dim_address'},
+}
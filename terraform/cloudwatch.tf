@@ -65,4 +65,45 @@ resource "aws_cloudwatch_metric_alarm" "transform_errors" {
   dimensions = {
     "FunctionName" = "transform"
   }
-}
\ No newline at end of file
+}
+#Stage metrics printed by both lambdas as Embedded Metric Format log lines (see measure),
+#one widget per metric with a line per function, stage and table (or per function and stage).
+locals {
+  stage_metric_stats = {
+    Duration   = "Average"
+    Rows       = "Sum"
+    Bytes      = "Sum"
+    PeakMemory = "Maximum"
+  }
+}
+
+resource "aws_cloudwatch_dashboard" "pipeline_stages" {
+  dashboard_name = "PipelineStages"
+  dashboard_body = jsonencode({
+    widgets = [
+      for index, metric in keys(local.stage_metric_stats) : {
+        type   = "metric"
+        x      = (index % 2) * 12
+        y      = floor(index / 2) * 6
+        width  = 12
+        height = 6
+        properties = {
+          title  = "${metric} by stage and table"
+          region = data.aws_region.current.name
+          period = 300
+          metrics = [
+            [{
+              id         = "search${index}"
+              expression = "SEARCH('{TerrificTotes,Function,Stage,Table} MetricName=\"${metric}\"', '${local.stage_metric_stats[metric]}', 300)"
+            }],
+            #Stages that span tables, such as initial_extract and continuous_extract, have no Table dimension
+            [{
+              id         = "stages${index}"
+              expression = "SEARCH('{TerrificTotes,Function,Stage} MetricName=\"${metric}\"', '${local.stage_metric_stats[metric]}', 300)"
+            }],
+          ]
+        }
+      }
+    ]
+  })
+}
@@ -27,7 +27,7 @@ resource "aws_iam_policy" "extract_lambda_policy" {
     Version = "2012-10-17"
     Statement = [
       {
-        Action = ["s3:GetObject", "s3:PutObject"],
+        Action = ["s3:GetObject", "s3:PutObject", "s3:DeleteObject"],
         Effect = "Allow",
         Resource = "arn:aws:s3:::will-code-bucket/*"
       },
@@ -37,7 +37,7 @@ resource "aws_iam_policy" "extract_lambda_policy" {
         Resource = "arn:aws:s3:::will-code-bucket"
       },
       {
-        Action = ["s3:PutObject"],
+        Action = ["s3:PutObject", "s3:AbortMultipartUpload"],
         Effect = "Allow",
         Resource = "arn:aws:s3:::will-ingested-data-bucket/*"
       },
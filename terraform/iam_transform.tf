@@ -17,11 +17,29 @@ resource "aws_iam_policy" "transform_lambda_policy" {
         Effect = "Allow",
         Resource = "arn:aws:s3:::will-code-bucket/*"
       },
+      {
+        Action = ["s3:PutObject"],
+        Effect = "Allow",
+        Resource = [
+          "arn:aws:s3:::will-code-bucket/transform_ledger/*",
+          "arn:aws:s3:::will-code-bucket/diagnostics/*"
+        ]
+      },
       {
         Action = ["s3:GetObject"],
         Effect = "Allow",
         Resource = "arn:aws:s3:::will-ingested-data-bucket/*"
       },
+      {
+        Action = ["s3:GetObject"],
+        Effect = "Allow",
+        Resource = "arn:aws:s3:::will-processed-data-bucket/*"
+      },
+      {
+        Action = ["s3:ListBucket"],
+        Effect = "Allow",
+        Resource = "arn:aws:s3:::will-code-bucket"
+      },
       {
         Action = ["s3:ListBucket"],
         Effect = "Allow",
@@ -33,10 +51,15 @@ resource "aws_iam_policy" "transform_lambda_policy" {
         Resource = "arn:aws:s3:::will-processed-data-bucket"
       },
       {
-        Action = ["s3:PutObject"],
+        Action = ["s3:PutObject", "s3:DeleteObject", "s3:AbortMultipartUpload"],
         Effect = "Allow",
         Resource = "arn:aws:s3:::will-processed-data-bucket/*"
       },
+      {
+        Action = ["sqs:ReceiveMessage", "sqs:DeleteMessage", "sqs:GetQueueAttributes"],
+        Effect = "Allow",
+        Resource = "arn:aws:sqs:eu-west-2:440744231761:ingested-data-events"
+      },
       {
         Action = [
           "logs:CreateLogGroup",
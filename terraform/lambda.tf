@@ -18,6 +18,16 @@ data "archive_file" "extract_lambda" {
     filename = "util_functions.py"
   }
 
+  source {
+    content  = file("${path.module}/../src/extract/catalog.py")
+    filename = "catalog.py"
+  }
+
+  source {
+    content  = file("${path.module}/../src/common/lambda_utils.py")
+    filename = "lambda_utils.py"
+  }
+
   output_path      = "${path.module}/../extract_function.zip"
 }
 
@@ -33,6 +43,19 @@ resource "aws_lambda_function" "extract" {
   layers           = [aws_lambda_layer_version.dependency_layer.arn]
   timeout          = 120
   depends_on       = [aws_lambda_layer_version.dependency_layer]
+
+  environment {
+    variables = {
+      STREAM_EXTRACT      = var.stream_extract
+      EXTRACT_WORKERS     = var.extract_workers
+      COPY_TABLES         = var.copy_tables
+      EXTRACT_COMPRESSION = var.extract_compression
+      SCHEMA_CATALOG      = var.schema_catalog
+      BACKFILL_EXTRACT    = var.backfill_extract
+      EMF_METRICS         = var.emf_metrics
+      PROFILE_INVOCATIONS = var.profile_invocations
+    }
+  }
 }
 
 data "archive_file" "transform_lambda" {
@@ -47,6 +70,10 @@ data "archive_file" "transform_lambda" {
     content  = file("${path.module}/../src/transform/transform_utils.py")
     filename = "transform_utils.py"
   } 
+  source {
+    content  = file("${path.module}/../src/common/lambda_utils.py")
+    filename = "lambda_utils.py"
+  }
 
   output_path = "${path.module}/../transform_function.zip"
 }
@@ -60,4 +87,22 @@ resource "aws_lambda_function" "transform" {
   runtime          = var.python_runtime
   layers           = ["arn:aws:lambda:eu-west-2:336392948345:layer:AWSSDKPandas-Python312:14"]
   timeout          = 120
+
+  #One transform at a time: runs read-modify-write the dimension manifests and the ledgers,
+  #which S3 cannot do atomically with the pinned botocore (no conditional puts)
+  reserved_concurrent_executions = 1
+
+  environment {
+    variables = {
+      INCREMENTAL_TRANSFORM     = var.incremental_transform
+      LOAD_WORKERS              = var.load_workers
+      PARQUET_ROW_GROUP_SIZE    = var.parquet_row_group_size
+      PARQUET_DICTIONARY        = var.parquet_dictionary
+      STREAM_TRANSFORM          = var.stream_transform
+      REFERENCE_CACHE_MEMORY_MB = var.reference_cache_memory_mb
+      REFERENCE_CACHE_DISK_MB   = var.reference_cache_disk_mb
+      EMF_METRICS               = var.emf_metrics
+      PROFILE_INVOCATIONS       = var.profile_invocations
+    }
+  }
 }
\ No newline at end of file
@@ -50,22 +50,16 @@ resource "aws_s3_object" "transform_lambda_code" {
   source = "${path.module}/../transform_function.zip"
 }
 
-#Create bucket notification when object is created in s3 
+#Create bucket notification when object is created in s3, queued so the transform lambda gets each extract cycle as one batch
 resource "aws_s3_bucket_notification" "bucket_notification" {
   bucket = aws_s3_bucket.ingested_data_bucket.id
 
-  lambda_function {
-    lambda_function_arn = aws_lambda_function.transform.arn
-    events              = ["s3:ObjectCreated:*"]
+  queue {
+    queue_arn = aws_sqs_queue.ingested_events.arn
+    events    = ["s3:ObjectCreated:*"]
   }
-}
-#Allow triggering lambda 
-resource "aws_lambda_permission" "s3_trigger" {
-  statement_id  = "AllowS3Invoke"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.transform.function_name
-  principal     = "s3.amazonaws.com"
-  source_arn    = aws_s3_bucket.ingested_data_bucket.arn
+
+  depends_on = [aws_sqs_queue_policy.ingested_events]
 }
 
   
@@ -0,0 +1,59 @@
+#Create queue collecting object created events of the ingested bucket
+resource "aws_sqs_queue" "ingested_events" {
+  name                       = "ingested-data-events"
+  visibility_timeout_seconds = 720
+  message_retention_seconds  = 86400
+
+  #A batch that keeps failing is moved aside after a few passes instead of retrying for the whole
+  #retention period, holding back every later extract cycle behind the single transform slot
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.ingested_events_dlq.arn
+    maxReceiveCount     = 3
+  })
+}
+
+#Create queue keeping the events of batches the transform lambda failed on, for inspection and redrive
+resource "aws_sqs_queue" "ingested_events_dlq" {
+  name                      = "ingested-data-events-dlq"
+  message_retention_seconds = 1209600
+}
+
+#Only allow the ingested events queue to use it as a dead-letter queue
+resource "aws_sqs_queue_redrive_allow_policy" "ingested_events_dlq" {
+  queue_url = aws_sqs_queue.ingested_events_dlq.id
+
+  redrive_allow_policy = jsonencode({
+    redrivePermission = "byQueue"
+    sourceQueueArns   = [aws_sqs_queue.ingested_events.arn]
+  })
+}
+
+#Allow the ingested bucket to send its events to the queue
+resource "aws_sqs_queue_policy" "ingested_events" {
+  queue_url = aws_sqs_queue.ingested_events.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect    = "Allow",
+        Principal = { Service = "s3.amazonaws.com" },
+        Action    = "sqs:SendMessage",
+        Resource  = aws_sqs_queue.ingested_events.arn,
+        Condition = {
+          ArnEquals = { "aws:SourceArn" = aws_s3_bucket.ingested_data_bucket.arn }
+        }
+      }
+    ]
+  })
+}
+
+#Deliver queued events to the transform lambda in batches, waiting for the rest of an extract cycle.
+#The function's reserved concurrency of 1 keeps passes from overlapping (scaling_config cannot go below 2);
+#batches that arrive during a pass stay on the queue until it ends.
+resource "aws_lambda_event_source_mapping" "transform_events" {
+  event_source_arn                   = aws_sqs_queue.ingested_events.arn
+  function_name                      = aws_lambda_function.transform.arn
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = var.transform_batching_window
+}
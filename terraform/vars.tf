@@ -22,4 +22,83 @@ variable "processed_data_bucket_prefix" {
 variable "code_bucket_prefix" {
   type    = string
   default = "will-code-bucket"
-}
\ No newline at end of file
+}
+variable "stream_extract" {
+  type    = string
+  default = "true"
+}
+
+variable "extract_workers" {
+  type    = string
+  default = "4"
+}
+
+variable "copy_tables" {
+  type    = string
+  default = "sales_order,transaction,payment"
+}
+
+variable "extract_compression" {
+  type    = string
+  default = "gzip"
+}
+
+variable "schema_catalog" {
+  type    = string
+  default = "true"
+}
+
+variable "backfill_extract" {
+  type    = string
+  default = "true"
+}
+
+variable "incremental_transform" {
+  type    = string
+  default = "true"
+}
+
+variable "load_workers" {
+  type    = string
+  default = "8"
+}
+
+variable "parquet_row_group_size" {
+  type    = string
+  default = "100000"
+}
+
+variable "parquet_dictionary" {
+  type    = string
+  default = "true"
+}
+
+variable "stream_transform" {
+  type    = string
+  default = "true"
+}
+
+variable "transform_batching_window" {
+  type    = number
+  default = 60
+}
+
+variable "reference_cache_memory_mb" {
+  type    = string
+  default = "64"
+}
+
+variable "reference_cache_disk_mb" {
+  type    = string
+  default = "256"
+}
+
+variable "emf_metrics" {
+  type    = string
+  default = "true"
+}
+
+variable "profile_invocations" {
+  type    = string
+  default = "false"
+}
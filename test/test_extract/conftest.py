@@ -0,0 +1,13 @@
+import pytest
+from util_functions import invalidate_resources
+from catalog import clear_catalog_cache
+
+
+@pytest.fixture(autouse=True)
+def cold_container():
+    """Start every test as a cold Lambda container with no cached resources."""
+    invalidate_resources()
+    clear_catalog_cache()
+    yield
+    invalidate_resources()
+    clear_catalog_cache()
@@ -0,0 +1,144 @@
+from extract import backfill_extract, primary_key, lambda_handler
+from moto import mock_aws
+from unittest.mock import patch, MagicMock
+from datetime import datetime
+import boto3
+import json
+import re
+import pytest
+
+
+def make_conn(tables):
+    """Connection over tables of consecutive integer ids, answering backfill queries."""
+    mock_conn = MagicMock()
+    mock_conn.columns = [{"name": "id"}]
+
+    def run(sql):
+        if sql.startswith("SELECT table_name"):
+            return [(table,) for table in tables]
+        match = re.fullmatch(r"SELECT MAX\(last_updated\) FROM (\w+)", sql)
+        if match:
+            rows = tables[match.group(1)]
+            return [[datetime(2024, 1, rows) if rows else None]]
+        match = re.fullmatch(
+            r"SELECT (\w+) FROM (\w+)(?: WHERE \w+ > (\d+))? ORDER BY \w+ LIMIT 1 OFFSET (\d+)",
+            sql,
+        )
+        if match:
+            after = int(match.group(3) or 0)
+            boundary = after + int(match.group(4)) + 1
+            return [[boundary]] if boundary <= tables[match.group(2)] else []
+        match = re.fullmatch(
+            r"SELECT \* FROM (\w+)(?: WHERE (?:\w+ > (\d+))?(?: AND )?(?:\w+ <= (\d+))?)?",
+            sql,
+        )
+        after = int(match.group(2) or 0)
+        upper = int(match.group(3) or tables[match.group(1)])
+        return [[i] for i in range(after + 1, upper + 1)]
+
+    mock_conn.run.side_effect = run
+    return mock_conn
+
+
+def make_context(remaining):
+    """Lambda context whose remaining time comes from the remaining list in turn."""
+    context = MagicMock()
+    context.get_remaining_time_in_millis.side_effect = remaining
+    return context
+
+
+@pytest.fixture
+def s3_client():
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket="will-code-bucket")
+        s3_client.create_bucket(Bucket="will-ingested-data-bucket")
+        yield s3_client
+
+
+def extracted_ids(s3_client, table):
+    response = s3_client.list_objects_v2(
+        Bucket="will-ingested-data-bucket", Prefix=f"{table}/"
+    )
+    ids = []
+    for obj in response.get("Contents", []):
+        body = s3_client.get_object(Bucket="will-ingested-data-bucket", Key=obj["Key"])
+        ids += [int(line) for line in body["Body"].read().decode().split()[1:]]
+    return sorted(ids)
+
+
+def test_backfill_extracts_every_row_in_pages(s3_client):
+    conn = make_conn({"staff": 5, "currency": 2})
+
+    result = backfill_extract(s3_client, conn, {}, page_size=2)
+
+    assert result == {"result": "Success"}
+    assert extracted_ids(s3_client, "staff") == [1, 2, 3, 4, 5]
+    assert extracted_ids(s3_client, "currency") == [1, 2]
+    conn.run.assert_any_call("SELECT * FROM staff WHERE staff_id > 2 AND staff_id <= 4")
+    conn.run.assert_any_call("SELECT * FROM staff WHERE staff_id > 4")
+
+
+def test_backfill_records_watermarks_and_removes_checkpoint(s3_client):
+    backfill_extract(s3_client, make_conn({"staff": 3}), {}, page_size=2)
+
+    watermarks = s3_client.get_object(Bucket="will-code-bucket", Key="watermarks.json")
+    assert json.loads(watermarks["Body"].read()) == {"staff": "2024-01-03 00:00:00"}
+    listing = s3_client.list_objects_v2(Bucket="will-code-bucket")
+    keys = [obj["Key"] for obj in listing["Contents"]]
+    assert "backfill_checkpoint.json" not in keys
+
+
+def test_backfill_records_watermark_of_tables_empty_when_probed(s3_client):
+    backfill_extract(s3_client, make_conn({"staff": 3, "currency": 0}), {}, page_size=2)
+
+    watermarks = s3_client.get_object(Bucket="will-code-bucket", Key="watermarks.json")
+    assert json.loads(watermarks["Body"].read()) == {
+        "staff": "2024-01-03 00:00:00",
+        "currency": "1970-01-01 00:00:00",
+    }
+
+
+def test_backfill_stops_before_timeout_and_resumes(s3_client):
+    conn = make_conn({"staff": 5})
+
+    first = backfill_extract(s3_client, conn, make_context([60000, 5000]), page_size=2)
+
+    assert first == {"result": "Incomplete"}
+    assert extracted_ids(s3_client, "staff") == [1, 2]
+    checkpoint = s3_client.get_object(
+        Bucket="will-code-bucket", Key="backfill_checkpoint.json"
+    )
+    assert json.loads(checkpoint["Body"].read())["tables"]["staff"]["last_id"] == 2
+
+    second = backfill_extract(s3_client, conn, make_context([60000] * 5), page_size=2)
+
+    assert second == {"result": "Success"}
+    assert extracted_ids(s3_client, "staff") == [1, 2, 3, 4, 5]
+
+
+def test_primary_key_prefers_catalog():
+    catalog = {"tables": {"staff": {"primary_key": ["id"]}}}
+
+    assert primary_key("staff", catalog) == "id"
+    assert primary_key("currency", catalog) == "currency_id"
+    assert primary_key("staff") == "staff_id"
+
+
+@patch.dict("os.environ", {"BACKFILL_EXTRACT": "true"})
+@patch("extract.create_s3_client")
+@patch("extract.connect")
+@patch("extract.backfill_extract")
+def test_lambda_handler_leaves_last_extracted_until_backfill_completes(
+    mock_backfill, mock_connect, mock_create_s3_client
+):
+    mock_s3 = mock_create_s3_client.return_value
+    mock_s3.list_objects.return_value = {}
+    mock_backfill.return_value = {"result": "Incomplete"}
+    context = MagicMock()
+
+    result = lambda_handler({}, context)
+
+    assert result == {"result": "Incomplete"}
+    mock_backfill.assert_called_once_with(mock_s3, mock_connect.return_value, context)
+    mock_s3.put_object.assert_not_called()
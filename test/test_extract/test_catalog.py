@@ -0,0 +1,134 @@
+from catalog import (
+    get_catalog,
+    introspect_schema,
+    load_catalog,
+    save_catalog,
+    FINGERPRINT_QUERY,
+    COLUMNS_QUERY,
+    PRIMARY_KEYS_QUERY,
+)
+from extract import list_tables
+from moto import mock_aws
+from unittest.mock import patch, MagicMock
+import boto3
+import pytest
+
+
+def make_conn(fingerprint="abc"):
+    """Connection answering the catalog queries for a two table schema."""
+    responses = {
+        FINGERPRINT_QUERY: [[fingerprint]],
+        COLUMNS_QUERY: [
+            ["currency", "currency_id", "integer"],
+            ["currency", "currency_code", "character varying"],
+            ["staff", "staff_id", "integer"],
+        ],
+        PRIMARY_KEYS_QUERY: [["currency", "currency_id"], ["staff", "staff_id"]],
+    }
+    mock_conn = MagicMock()
+    mock_conn.run.side_effect = lambda sql: responses[sql]
+    return mock_conn
+
+
+def introspections(mock_conn):
+    return [c.args[0] for c in mock_conn.run.call_args_list].count(COLUMNS_QUERY)
+
+
+@pytest.fixture
+def s3_client():
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket="test-bucket")
+        yield s3_client
+
+
+def test_introspect_schema_collects_columns_and_primary_keys():
+    assert introspect_schema(make_conn()) == {
+        "currency": {
+            "columns": [
+                {"name": "currency_id", "data_type": "integer"},
+                {"name": "currency_code", "data_type": "character varying"},
+            ],
+            "primary_key": ["currency_id"],
+        },
+        "staff": {
+            "columns": [{"name": "staff_id", "data_type": "integer"}],
+            "primary_key": ["staff_id"],
+        },
+    }
+
+
+def test_saved_catalog_can_be_loaded_back(s3_client):
+    catalog = {"fingerprint": "abc", "tables": {"staff": {}}}
+
+    save_catalog(s3_client, catalog, "test-bucket", "catalog.json")
+
+    assert load_catalog(s3_client, "test-bucket", "catalog.json") == catalog
+
+
+def test_load_catalog_returns_none_when_missing(s3_client):
+    assert load_catalog(s3_client, "test-bucket", "catalog.json") is None
+
+
+def test_get_catalog_introspects_and_stores_on_first_run(s3_client):
+    conn = make_conn()
+
+    catalog = get_catalog(s3_client, conn, "test-bucket", "catalog.json")
+
+    assert catalog["fingerprint"] == "abc"
+    assert sorted(catalog["tables"]) == ["currency", "staff"]
+    assert load_catalog(s3_client, "test-bucket", "catalog.json") == catalog
+
+
+def test_get_catalog_reuses_catalog_while_fingerprint_unchanged(s3_client):
+    get_catalog(s3_client, make_conn(), "test-bucket", "catalog.json")
+    conn = make_conn()
+
+    get_catalog(s3_client, conn, "test-bucket", "catalog.json")
+
+    conn.run.assert_called_once_with(FINGERPRINT_QUERY)
+
+
+def test_get_catalog_reads_stored_catalog_on_cold_start(s3_client):
+    save_catalog(
+        s3_client,
+        {"fingerprint": "abc", "tables": {"staff": {}}},
+        "test-bucket",
+        "catalog.json",
+    )
+    conn = make_conn()
+
+    catalog = get_catalog(s3_client, conn, "test-bucket", "catalog.json")
+
+    assert catalog["tables"] == {"staff": {}}
+    assert introspections(conn) == 0
+
+
+def test_get_catalog_reintrospects_when_fingerprint_changes(s3_client):
+    get_catalog(s3_client, make_conn("abc"), "test-bucket", "catalog.json")
+    conn = make_conn("def")
+
+    catalog = get_catalog(s3_client, conn, "test-bucket", "catalog.json")
+
+    assert catalog["fingerprint"] == "def"
+    assert introspections(conn) == 1
+    assert (
+        load_catalog(s3_client, "test-bucket", "catalog.json")["fingerprint"] == "def"
+    )
+
+
+@patch.dict("os.environ", {"SCHEMA_CATALOG": "true"})
+@patch("extract.get_catalog")
+def test_list_tables_reads_catalog_when_enabled(mock_get_catalog):
+    mock_get_catalog.return_value = {"tables": {"staff": {}, "currency": {}}}
+    conn = MagicMock()
+
+    assert list_tables(MagicMock(), conn) == ["currency", "staff"]
+    conn.run.assert_not_called()
+
+
+def test_list_tables_queries_information_schema_by_default():
+    conn = MagicMock()
+    conn.run.return_value = [("staff",), ("currency",)]
+
+    assert list_tables(MagicMock(), conn) == ["staff", "currency"]
@@ -0,0 +1,86 @@
+from util_functions import open_compressor, stream_to_s3, create_file_name
+from extract import extract_table, csv_file_name, compression_codec
+from unittest.mock import patch, MagicMock
+from datetime import datetime
+import gzip
+import io
+import pytest
+import zstandard
+
+
+class TestOpenCompressor:
+
+    def test_returns_fileobj_unchanged_without_codec(self):
+        buffer = io.BytesIO()
+
+        assert open_compressor(buffer, None) is buffer
+
+    def test_gzip_output_decompresses_to_input(self):
+        buffer = io.BytesIO()
+        compressor = open_compressor(buffer, "gzip")
+        compressor.write(b"id,name\n")
+        compressor.write(b"1,Test\n")
+        compressor.close()
+
+        assert gzip.decompress(buffer.getvalue()) == b"id,name\n1,Test\n"
+        assert not buffer.closed
+
+    def test_zstd_output_decompresses_to_input(self):
+        buffer = io.BytesIO()
+        compressor = open_compressor(buffer, "zstd")
+        compressor.write(b"id,name\n1,Test\n")
+        compressor.close()
+
+        reader = zstandard.ZstdDecompressor().stream_reader(buffer.getvalue())
+        assert reader.read() == b"id,name\n1,Test\n"
+        assert not buffer.closed
+
+    def test_raises_for_unknown_codec(self):
+        with pytest.raises(ValueError):
+            open_compressor(io.BytesIO(), "lz4")
+
+
+def test_stream_to_s3_compresses_chunks():
+    mock_s3_client = MagicMock()
+
+    stream_to_s3(mock_s3_client, [b"id\n", b"1\n"], "bucket", "key", codec="gzip")
+
+    body = mock_s3_client.put_object.call_args.kwargs["Body"]
+    assert gzip.decompress(body) == b"id\n1\n"
+
+
+def test_create_file_name_uses_given_extension():
+    with patch("util_functions.datetime") as mock_datetime:
+        mock_datetime.now.return_value = datetime(2023, 12, 25, 15, 30, 45, 456457)
+
+        file_name = create_file_name("test_table", "csv.gz")
+
+    assert file_name == "test_table/2023/12/25/2023-12-25T15:30:45.456457.csv.gz"
+
+
+@patch("extract.create_file_name", side_effect=lambda table, ext="csv": ext)
+def test_csv_file_name_reflects_codec(mock_create_file_name):
+    assert csv_file_name("table1") == "csv"
+    assert csv_file_name("table1", "gzip") == "csv.gz"
+    assert csv_file_name("table1", "zstd") == "csv.zst"
+
+
+@patch.dict("os.environ", {"EXTRACT_COMPRESSION": "brotli"})
+def test_compression_codec_rejects_unknown_codec():
+    with pytest.raises(ValueError):
+        compression_codec()
+
+
+@patch.dict("os.environ", {"EXTRACT_COMPRESSION": "gzip"})
+def test_extract_table_stores_compressed_csv():
+    mock_s3_client = MagicMock()
+    conn = MagicMock()
+    conn.run.return_value = [[1, "Test"], [2, "Test2"]]
+    conn.columns = [{"name": "id"}, {"name": "name"}]
+
+    assert extract_table(mock_s3_client, conn, "table1", "SELECT * FROM table1")
+
+    call = mock_s3_client.put_object.call_args
+    assert call.kwargs["Key"].startswith("table1/")
+    assert call.kwargs["Key"].endswith(".csv.gz")
+    assert gzip.decompress(call.kwargs["Body"]) == b"id,name\r\n1,Test\r\n2,Test2\r\n"
@@ -1,4 +1,7 @@
+import json
 import pytest
+from datetime import datetime
+from botocore.exceptions import ClientError
 from unittest.mock import patch, MagicMock
 from extract import continuous_extract
 
@@ -8,6 +11,7 @@ def mock_data():
     """Provide mock data for the tests."""
     return {
         "mock_table_data": [("table1",)],
+        "mock_latest": [[datetime(2024, 1, 2)]],
         "mock_rows": [
             {"id": 1, "name": "Test", "created_at": "2024-01-01 00:00:00"},
             {"id": 2, "name": "Test2", "created_at": "2024-01-02 00:00:00"},
@@ -16,14 +20,34 @@ def mock_data():
     }
 
 
+def make_s3_client(watermarks=None):
+    """Mock S3 client holding last_extracted.txt and, optionally, a watermark manifest."""
+    mock_s3 = MagicMock()
+
+    def get_object(Bucket, Key):
+        if Key == "last_extracted.txt":
+            return {"Body": MagicMock(read=lambda: b"2024-01-01 00:00:00")}
+        if watermarks is None:
+            raise ClientError(
+                {"Error": {"Code": "NoSuchKey", "Message": "Not found"}}, "GetObject"
+            )
+        return {"Body": MagicMock(read=lambda: json.dumps(watermarks).encode())}
+
+    mock_s3.get_object.side_effect = get_object
+    return mock_s3
+
+
+def saved_watermarks(mock_s3):
+    """Returns the manifest written by the last put_object to watermarks.json."""
+    for c in reversed(mock_s3.put_object.call_args_list):
+        if c.kwargs["Key"] == "watermarks.json":
+            return json.loads(c.kwargs["Body"])
+
+
 @pytest.fixture
 def mock_s3_client():
     """Mock the S3 client for storing data."""
-    mock_s3 = MagicMock()
-    mock_s3.get_object.return_value = {
-        "Body": MagicMock(read=lambda: "2024-01-01 00:00:00".encode("utf-8"))
-    }
-    return mock_s3
+    return make_s3_client()
 
 
 @pytest.fixture
@@ -32,6 +56,7 @@ def mock_db_connection(mock_data):
     mock_conn = MagicMock()
     mock_conn.run.side_effect = [
         mock_data["mock_table_data"],  # Response for table names query
+        mock_data["mock_latest"],  # Response for watermark probe
         mock_data["mock_rows"],  # Response for data query
     ]
     mock_conn.columns = mock_data["mock_columns"]
@@ -59,7 +84,7 @@ def test_continuous_extract_successful_extraction(
     assert result == {"result": "Success"}
 
     # Ensure S3 'get_object' method was called with the correct arguments
-    mock_s3_client.get_object.assert_called_once_with(
+    mock_s3_client.get_object.assert_any_call(
         Bucket="will-code-bucket", Key="last_extracted.txt"
     )
 
@@ -67,9 +92,72 @@ def test_continuous_extract_successful_extraction(
     mock_db_connection.run.assert_any_call(
         "SELECT table_name FROM information_schema.tables WHERE table_schema = 'public' AND table_name != '_prisma_migrations'"
     )
+    mock_db_connection.run.assert_any_call("SELECT MAX(last_updated) FROM table1")
     mock_db_connection.run.assert_any_call(
-        "SELECT * FROM table1 WHERE created_at > '2024-01-01 00:00:00'"
+        "SELECT * FROM table1 WHERE last_updated > '2024-01-01 00:00:00' "
+        "AND last_updated <= '2024-01-02 00:00:00'"
     )
 
-    # Ensure that the S3 store function was called with the correct parameters
-    mock_s3_client.put_object.assert_called_once()
+    # Ensure that the extracted file and the new watermark were stored
+    keys = [c.kwargs["Key"] for c in mock_s3_client.put_object.call_args_list]
+    assert keys[0].startswith("table1/")
+    assert keys[1] == "watermarks.json"
+    assert saved_watermarks(mock_s3_client) == {"table1": "2024-01-02 00:00:00"}
+
+
+def test_continuous_extract_uses_table_watermark_from_manifest(mock_data):
+    mock_s3 = make_s3_client({"table1": "2024-01-01 12:30:00.500000"})
+    mock_conn = MagicMock()
+    mock_conn.run.side_effect = [
+        mock_data["mock_table_data"],
+        mock_data["mock_latest"],
+        mock_data["mock_rows"],
+    ]
+    mock_conn.columns = mock_data["mock_columns"]
+
+    continuous_extract(mock_s3, mock_conn)
+
+    mock_conn.run.assert_any_call(
+        "SELECT * FROM table1 WHERE last_updated > '2024-01-01 12:30:00.500000' "
+        "AND last_updated <= '2024-01-02 00:00:00'"
+    )
+
+
+def test_continuous_extract_probes_unchanged_table_only_once():
+    mock_s3 = make_s3_client({"table1": "2024-01-02 00:00:00"})
+    mock_conn = MagicMock()
+    mock_conn.run.side_effect = [
+        [("table1",), ("table2",)],
+        [[datetime(2024, 1, 2)]],  # table1 unchanged since its watermark
+        [[None]],  # table2 is empty
+    ]
+
+    result = continuous_extract(mock_s3, mock_conn)
+
+    assert result == {"result": "Success"}
+    assert mock_conn.run.call_count == 3
+    mock_s3.put_object.assert_not_called()
+
+
+@patch("extract.extract_tables")
+def test_continuous_extract_keeps_old_watermark_for_failed_table(mock_extract_tables):
+    mock_s3 = make_s3_client({"table1": "2024-01-01 06:00:00"})
+    mock_conn = MagicMock()
+    mock_conn.run.side_effect = [
+        [("table1",), ("table2",), ("table3",)],
+        [[datetime(2024, 1, 2)]],
+        [[datetime(2024, 1, 3)]],
+        [[datetime(2024, 1, 4)]],
+    ]
+    mock_extract_tables.return_value = {
+        "result": "Failure",
+        "failed_tables": ["table1", "table3"],
+    }
+
+    result = continuous_extract(mock_s3, mock_conn)
+
+    assert result["result"] == "Failure"
+    assert saved_watermarks(mock_s3) == {
+        "table1": "2024-01-01 06:00:00",
+        "table2": "2024-01-03 00:00:00",
+    }
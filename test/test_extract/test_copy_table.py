@@ -0,0 +1,83 @@
+from extract import copy_table, extract_table
+from moto import mock_aws
+from unittest.mock import patch, MagicMock
+import boto3
+import pytest
+
+
+def make_copy_conn(output, row_count):
+    """Connection whose COPY writes output to the stream it is given."""
+    mock_conn = MagicMock()
+
+    def run(sql, stream=None):
+        stream.write(output)
+
+    mock_conn.run.side_effect = run
+    mock_conn.row_count = row_count
+    return mock_conn
+
+
+@mock_aws
+@patch("extract.create_file_name", return_value="table1/2024/01/01/file.csv")
+def test_copy_table_stores_server_output_unchanged(mock_create_file_name):
+    mock_s3_client = boto3.client("s3", region_name="us-east-1")
+    mock_s3_client.create_bucket(Bucket="will-ingested-data-bucket")
+    output = b"id,name\n1,Test\n2,Test2\n"
+    conn = make_copy_conn(output, 2)
+
+    result = copy_table(mock_s3_client, conn, "table1", "SELECT * FROM table1")
+
+    assert result is True
+    conn.run.assert_called_once()
+    assert conn.run.call_args.args[0] == (
+        "COPY (SELECT * FROM table1) TO STDOUT WITH (FORMAT csv, HEADER true)"
+    )
+    response = mock_s3_client.get_object(
+        Bucket="will-ingested-data-bucket", Key="table1/2024/01/01/file.csv"
+    )
+    assert response["Body"].read() == output
+
+
+def test_copy_table_skips_empty_table():
+    mock_s3_client = MagicMock()
+    conn = make_copy_conn(b"id,name\n", 0)
+
+    result = copy_table(mock_s3_client, conn, "table1", "SELECT * FROM table1")
+
+    assert result is False
+    mock_s3_client.put_object.assert_not_called()
+
+
+def test_copy_table_aborts_upload_on_failure():
+    mock_s3_client = MagicMock()
+    conn = MagicMock()
+    conn.run.side_effect = Exception("connection lost")
+
+    with pytest.raises(Exception, match="connection lost"):
+        copy_table(mock_s3_client, conn, "table1", "SELECT * FROM table1")
+
+    mock_s3_client.put_object.assert_not_called()
+
+
+@patch.dict("os.environ", {"COPY_TABLES": "table1, table2"})
+@patch("extract.copy_table")
+def test_extract_table_uses_copy_for_selected_tables(mock_copy_table):
+    mock_s3_client, conn = MagicMock(), MagicMock()
+
+    extract_table(mock_s3_client, conn, "table2", "SELECT * FROM table2")
+
+    mock_copy_table.assert_called_once_with(
+        mock_s3_client, conn, "table2", "SELECT * FROM table2"
+    )
+
+
+@patch.dict("os.environ", {"COPY_TABLES": "table1"})
+@patch("extract.copy_table")
+def test_extract_table_selects_tables_not_listed(mock_copy_table):
+    conn = MagicMock()
+    conn.run.return_value = []
+
+    extract_table(MagicMock(), conn, "table2", "SELECT * FROM table2")
+
+    mock_copy_table.assert_not_called()
+    conn.run.assert_called_once_with("SELECT * FROM table2")
@@ -0,0 +1,96 @@
+from util_functions import format_to_csv
+from lambda_utils import measure, instrumented
+from unittest.mock import MagicMock
+from extract import extract_table
+import json
+import pytest
+
+
+def metric_lines(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+@pytest.fixture
+def metrics_on(monkeypatch):
+    monkeypatch.setenv("EMF_METRICS", "true")
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_NAME", "extract")
+
+
+def test_nothing_is_printed_outside_lambda_by_default(monkeypatch, capsys):
+    monkeypatch.delenv("EMF_METRICS", raising=False)
+    monkeypatch.delenv("AWS_LAMBDA_FUNCTION_NAME", raising=False)
+
+    with measure("stage", "staff"):
+        pass
+
+    assert capsys.readouterr().out == ""
+
+
+def test_measure_prints_an_embedded_metric_format_line(metrics_on, capsys):
+    with measure("stage", "staff") as metrics:
+        metrics["rows"] = 3
+
+    [line] = metric_lines(capsys)
+    [directive] = line["_aws"]["CloudWatchMetrics"]
+    assert directive["Namespace"] == "TerrificTotes"
+    assert directive["Dimensions"] == [["Function", "Stage", "Table"]]
+    assert [metric["Name"] for metric in directive["Metrics"]] == [
+        "Duration",
+        "Rows",
+        "PeakMemory",
+    ]
+    assert line["Function"] == "extract"
+    assert line["Stage"] == "stage"
+    assert line["Table"] == "staff"
+    assert line["Rows"] == 3
+    assert line["Duration"] >= 0
+    assert line["PeakMemory"] > 0
+
+
+def test_metrics_are_printed_when_the_stage_fails(metrics_on, capsys):
+    with pytest.raises(RuntimeError):
+        with measure("stage", "staff"):
+            raise RuntimeError
+
+    assert [line["Stage"] for line in metric_lines(capsys)] == ["stage"]
+
+
+def test_nested_stages_are_reported_under_the_enclosing_table(metrics_on, capsys):
+    @instrumented("run")
+    def run():
+        with measure("outer", "staff"):
+            format_to_csv([[1, "a"], [2, "b"]], ["id", "name"])
+
+    run()
+
+    lines = metric_lines(capsys)
+    assert [(line["Stage"], line.get("Table")) for line in lines] == [
+        ("format_to_csv", "staff"),
+        ("outer", "staff"),
+        ("run", None),
+    ]
+    assert lines[0]["Rows"] == 2
+    assert lines[0]["Bytes"] == len("id,name\r\n1,a\r\n2,b\r\n")
+    assert lines[2]["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [
+        ["Function", "Stage"]
+    ]
+
+
+def test_extract_table_reports_each_stage_of_the_table(metrics_on, monkeypatch, capsys):
+    monkeypatch.delenv("EXTRACT_COMPRESSION", raising=False)
+    monkeypatch.delenv("EXTRACT_FORMAT", raising=False)
+    monkeypatch.delenv("COPY_TABLES", raising=False)
+    conn = MagicMock()
+    conn.run.return_value = [[1, "Jane"]]
+    conn.columns = [{"name": "staff_id"}, {"name": "first_name"}]
+
+    assert extract_table(MagicMock(), conn, "staff", "SELECT * FROM staff")
+
+    lines = metric_lines(capsys)
+    assert [(line["Stage"], line["Table"]) for line in lines] == [
+        ("format_to_csv", "staff"),
+        ("store_in_s3", "staff"),
+        ("extract_table", "staff"),
+    ]
+    assert lines[1]["Bytes"] == lines[0]["Bytes"]
+    assert lines[2]["Rows"] == 1
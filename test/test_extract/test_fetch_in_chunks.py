@@ -0,0 +1,75 @@
+from util_functions import fetch_in_chunks, format_chunks_to_csv
+from unittest.mock import MagicMock, call
+import csv
+import io
+import pytest
+
+
+@pytest.fixture
+def mock_conn():
+    """Connection whose cursor returns two chunks and is then exhausted."""
+    mock_conn = MagicMock()
+    mock_conn.run.side_effect = [
+        None,  # START TRANSACTION
+        None,  # DECLARE
+        [[1, "a"], [2, "b"]],  # first FETCH
+        [[3, "c"]],  # second FETCH
+        [],  # cursor exhausted
+        None,  # CLOSE
+        None,  # COMMIT
+    ]
+    return mock_conn
+
+
+class TestFetchInChunks:
+
+    def test_yields_each_fetched_chunk(self, mock_conn):
+        chunks = list(fetch_in_chunks(mock_conn, "SELECT * FROM table1", 2))
+
+        assert chunks == [[[1, "a"], [2, "b"]], [[3, "c"]]]
+
+    def test_runs_cursor_inside_read_only_transaction(self, mock_conn):
+        list(fetch_in_chunks(mock_conn, "SELECT * FROM table1", 2))
+
+        assert mock_conn.run.call_args_list == [
+            call("START TRANSACTION READ ONLY"),
+            call("DECLARE extract_cursor NO SCROLL CURSOR FOR SELECT * FROM table1"),
+            call("FETCH FORWARD 2 FROM extract_cursor"),
+            call("FETCH FORWARD 2 FROM extract_cursor"),
+            call("FETCH FORWARD 2 FROM extract_cursor"),
+            call("CLOSE extract_cursor"),
+            call("COMMIT"),
+        ]
+
+    def test_rolls_back_when_fetch_fails(self):
+        mock_conn = MagicMock()
+        mock_conn.run.side_effect = [None, None, Exception("connection lost"), None]
+
+        with pytest.raises(Exception, match="connection lost"):
+            list(fetch_in_chunks(mock_conn, "SELECT * FROM table1"))
+
+        mock_conn.run.assert_called_with("ROLLBACK")
+
+    def test_rolls_back_when_caller_stops_early(self, mock_conn):
+        chunks = fetch_in_chunks(mock_conn, "SELECT * FROM table1", 2)
+        next(chunks)
+        chunks.close()
+
+        mock_conn.run.assert_called_with("ROLLBACK")
+
+
+class TestFormatChunksToCsv:
+
+    def test_writes_header_once_before_first_chunk(self):
+        row_chunks = [[["John", "Doe"]], [["Jane", "Smith"]]]
+        columns = ["first_name", "last_name"]
+
+        encoded = list(format_chunks_to_csv(row_chunks, columns))
+        result = list(csv.reader(io.StringIO(b"".join(encoded).decode("utf-8"))))
+
+        assert len(encoded) == 2
+        assert result == [columns, ["John", "Doe"], ["Jane", "Smith"]]
+
+    def test_raises_exception_for_empty_columns(self):
+        with pytest.raises(ValueError):
+            list(format_chunks_to_csv([[["John", "Doe"]]], []))
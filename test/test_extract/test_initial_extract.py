@@ -1,4 +1,4 @@
-from extract import initial_extract
+from extract import initial_extract, stream_table
 import pytest
 from unittest.mock import patch, MagicMock, call
 from io import StringIO
@@ -118,3 +118,70 @@ def test_initial_extract_multiple_tables(mock_data, mock_s3_client, mock_db_conn
     # Call function
     result = initial_extract(mock_s3_client, mock_db_connection)
     assert result == {"result": "Success"}
+
+
+@patch("extract.stream_to_s3")
+def test_initial_extract_streaming_uploads_each_table(
+    mock_stream_to_s3, mock_data, mock_s3_client
+):
+    mock_conn = MagicMock()
+    mock_conn.run.side_effect = [
+        mock_data["mock_table_data"],  # Table names
+        None,  # START TRANSACTION
+        None,  # DECLARE
+        [[1, "Test", "2024-01-01 00:00:00"]],  # first FETCH
+        [],  # cursor exhausted
+        None,  # CLOSE
+        None,  # COMMIT
+    ]
+    mock_conn.columns = mock_data["mock_columns"]
+    mock_stream_to_s3.side_effect = lambda s3, chunks, bucket, key, **kwargs: list(
+        chunks
+    )
+
+    result = initial_extract(mock_s3_client, mock_conn, streaming=True)
+
+    assert result == {"result": "Success"}
+    mock_stream_to_s3.assert_called_once()
+    assert mock_stream_to_s3.call_args.args[2] == "will-ingested-data-bucket"
+    assert mock_stream_to_s3.call_args.args[3].startswith("table1/")
+    mock_conn.run.assert_any_call(
+        "DECLARE extract_cursor NO SCROLL CURSOR FOR SELECT * FROM table1"
+    )
+    mock_s3_client.put_object.assert_not_called()
+
+
+def test_initial_extract_streaming_skips_empty_table(mock_data, mock_s3_client):
+    mock_conn = MagicMock()
+    mock_conn.run.side_effect = [
+        mock_data["mock_table_data"],
+        None,
+        None,
+        [],
+        None,
+        None,
+    ]
+
+    result = initial_extract(mock_s3_client, mock_conn, streaming=True)
+
+    assert result == {"result": "Success"}
+    mock_s3_client.create_multipart_upload.assert_not_called()
+
+
+@patch("extract.stream_to_s3", side_effect=Exception("S3 upload failed"))
+def test_stream_table_rolls_back_the_cursor_when_the_upload_fails(
+    mock_stream_to_s3, mock_data, mock_s3_client
+):
+    mock_conn = MagicMock()
+    mock_conn.run.side_effect = [
+        None,  # START TRANSACTION
+        None,  # DECLARE
+        [[1, "Test", "2024-01-01 00:00:00"]],  # first FETCH
+        None,  # ROLLBACK
+    ]
+    mock_conn.columns = mock_data["mock_columns"]
+
+    with pytest.raises(Exception, match="S3 upload failed"):
+        stream_table(mock_s3_client, mock_conn, "table1", "SELECT * FROM table1")
+
+    assert mock_conn.run.call_args == call("ROLLBACK")
@@ -115,3 +115,55 @@ def test_unexpected_error_during_put_object(mock_create_s3_client, mock_conn):
 
     assert result["result"] == "Failure"
     assert "Unexpected error" in result["error"]
+
+
+@patch("extract.create_s3_client")
+@patch("extract.connect")
+@patch("extract.initial_extract")
+def test_last_extracted_not_written_when_a_table_fails(
+    mock_initial, mock_connect, mock_create_s3_client
+):
+    mock_s3 = MagicMock()
+    mock_s3.list_objects.return_value = {}
+    mock_create_s3_client.return_value = mock_s3
+    mock_initial.return_value = {"result": "Failure", "failed_tables": ["staff"]}
+
+    result = lambda_handler({}, {})
+
+    assert result["result"] == "Failure"
+    mock_s3.put_object.assert_not_called()
+
+
+@patch("extract.create_s3_client")
+@patch("extract.connect")
+@patch("extract.initial_extract")
+def test_warm_invocation_reuses_s3_client_and_connection(
+    mock_initial, mock_connect, mock_create_s3_client
+):
+    mock_create_s3_client.return_value.list_objects.return_value = {}
+    mock_initial.return_value = {"result": "Success"}
+
+    lambda_handler({}, {})
+    lambda_handler({}, {})
+
+    mock_create_s3_client.assert_called_once()
+    mock_connect.assert_called_once()
+    mock_connect.return_value.run.assert_called_once_with("SELECT 1")
+    mock_connect.return_value.close.assert_not_called()
+
+
+@patch("extract.create_s3_client")
+@patch("extract.connect")
+@patch("extract.initial_extract")
+def test_invalidate_resources_event_rebuilds_everything(
+    mock_initial, mock_connect, mock_create_s3_client
+):
+    mock_create_s3_client.return_value.list_objects.return_value = {}
+    mock_initial.return_value = {"result": "Success"}
+
+    lambda_handler({}, {})
+    lambda_handler({"invalidate_resources": True}, {})
+
+    assert mock_create_s3_client.call_count == 2
+    assert mock_connect.call_count == 2
+    mock_connect.return_value.close.assert_called_once()
@@ -0,0 +1,118 @@
+from extract import parallel_extract, extract_tables
+from util_functions import create_connection_pool, close_connection_pool
+from unittest.mock import patch, MagicMock
+import queue
+import pytest
+
+
+def make_conn(rows):
+    """Connection answering every data query with rows."""
+    mock_conn = MagicMock()
+    mock_conn.run.return_value = rows
+    mock_conn.columns = [{"name": "id"}, {"name": "name"}]
+    return mock_conn
+
+
+@pytest.fixture
+def queries():
+    return {
+        "table1": "SELECT * FROM table1",
+        "table2": "SELECT * FROM table2",
+        "table3": "SELECT * FROM table3",
+    }
+
+
+@patch("util_functions.connect")
+def test_parallel_extract_stores_every_table(mock_connect, queries):
+    mock_connect.side_effect = [make_conn([[1, "a"]]), make_conn([[2, "b"]])]
+    conn = make_conn([[3, "c"]])
+    mock_s3_client = MagicMock()
+
+    result = parallel_extract(mock_s3_client, conn, queries, workers=3)
+
+    assert result == {"result": "Success"}
+    assert mock_connect.call_count == 2
+    stored = sorted(
+        c.kwargs["Key"].split("/")[0] for c in mock_s3_client.put_object.call_args_list
+    )
+    assert stored == ["table1", "table2", "table3"]
+
+
+@patch("util_functions.connect")
+def test_parallel_extract_closes_pooled_connections_but_not_callers(
+    mock_connect, queries
+):
+    pooled = [make_conn([]), make_conn([])]
+    mock_connect.side_effect = pooled
+    conn = make_conn([])
+
+    parallel_extract(MagicMock(), conn, queries, workers=3)
+
+    for pooled_conn in pooled:
+        pooled_conn.close.assert_called_once()
+    conn.close.assert_not_called()
+
+
+@patch("util_functions.connect")
+def test_parallel_extract_isolates_failing_table(mock_connect, queries):
+    mock_connect.return_value = make_conn([[1, "a"]])
+    mock_s3_client = MagicMock()
+
+    def put_object(Body, Bucket, Key):
+        if Key.startswith("table2/"):
+            raise Exception("S3 upload failed")
+
+    mock_s3_client.put_object.side_effect = put_object
+
+    result = parallel_extract(mock_s3_client, make_conn([[1, "a"]]), queries, workers=2)
+
+    assert result == {"result": "Failure", "failed_tables": ["table2"]}
+    assert mock_s3_client.put_object.call_count == 3
+
+
+@patch("extract.parallel_extract")
+def test_extract_tables_runs_sequentially_by_default(mock_parallel, queries):
+    conn = make_conn([[1, "a"]])
+
+    result = extract_tables(MagicMock(), conn, queries)
+
+    assert result == {"result": "Success"}
+    mock_parallel.assert_not_called()
+    assert conn.run.call_count == 3
+
+
+@patch.dict("os.environ", {"EXTRACT_WORKERS": "4"})
+@patch("extract.parallel_extract")
+def test_extract_tables_runs_in_parallel_when_workers_configured(
+    mock_parallel, queries
+):
+    mock_s3_client = MagicMock()
+    conn = make_conn([])
+
+    extract_tables(mock_s3_client, conn, queries)
+
+    mock_parallel.assert_called_once_with(mock_s3_client, conn, queries, 4, False)
+
+
+@patch("util_functions.connect")
+def test_create_connection_pool_closes_opened_connections_on_failure(mock_connect):
+    opened = make_conn([])
+    mock_connect.side_effect = [opened, Exception("connection refused")]
+
+    with pytest.raises(Exception, match="connection refused"):
+        create_connection_pool(2)
+
+    opened.close.assert_called_once()
+
+
+def test_close_connection_pool_keeps_callers_connection():
+    keep, other = MagicMock(), MagicMock()
+    pool = queue.Queue()
+    pool.put(keep)
+    pool.put(other)
+
+    close_connection_pool(pool, keep=keep)
+
+    keep.close.assert_not_called()
+    other.close.assert_called_once()
+    assert pool.empty()
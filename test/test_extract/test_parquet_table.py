@@ -0,0 +1,121 @@
+from extract import parquet_table, extract_table
+from util_functions import arrow_schema, rows_to_record_batch
+from unittest.mock import patch, MagicMock
+from datetime import datetime, date
+from decimal import Decimal
+import io
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+
+@pytest.fixture
+def columns():
+    """Column descriptions as pg8000 reports them in conn.columns."""
+    return [
+        {"name": "id", "type_oid": 23, "type_modifier": -1},
+        {"name": "name", "type_oid": 1043, "type_modifier": 104},
+        {"name": "amount", "type_oid": 1700, "type_modifier": ((10 << 16) | 2) + 4},
+        {"name": "created_at", "type_oid": 1114, "type_modifier": -1},
+        {"name": "due_date", "type_oid": 1082, "type_modifier": -1},
+        {"name": "details", "type_oid": 114, "type_modifier": -1},
+    ]
+
+
+@pytest.fixture
+def rows():
+    return [
+        [1, "Test", Decimal("1.50"), datetime(2024, 1, 1), date(2024, 2, 1), {"a": 1}],
+        [2, None, None, None, None, None],
+    ]
+
+
+class TestArrowSchema:
+
+    def test_maps_postgres_types_to_arrow_types(self, columns):
+        schema = arrow_schema(columns)
+
+        assert schema.types == [
+            pa.int32(),
+            pa.string(),
+            pa.decimal128(10, 2),
+            pa.timestamp("us"),
+            pa.date32(),
+            pa.string(),
+        ]
+        assert schema.names == [
+            "id",
+            "name",
+            "amount",
+            "created_at",
+            "due_date",
+            "details",
+        ]
+
+    def test_unconstrained_numeric_is_written_as_text(self):
+        schema = arrow_schema([{"name": "n", "type_oid": 1700, "type_modifier": -1}])
+
+        assert schema.types == [pa.string()]
+
+
+def test_rows_to_record_batch_keeps_values_and_nulls(columns, rows):
+    batch = rows_to_record_batch(rows, arrow_schema(columns))
+
+    assert batch.num_rows == 2
+    assert batch.column("amount").to_pylist() == [Decimal("1.50"), None]
+    assert batch.column("details").to_pylist() == ['{"a": 1}', None]
+
+
+def test_parquet_table_stores_typed_parquet(columns, rows):
+    mock_s3_client = MagicMock()
+    conn = MagicMock()
+    conn.run.return_value = rows
+    conn.columns = columns
+
+    result = parquet_table(mock_s3_client, conn, "table1", "SELECT * FROM table1")
+
+    assert result is True
+    call = mock_s3_client.put_object.call_args
+    assert call.kwargs["Key"].startswith("table1/")
+    assert call.kwargs["Key"].endswith(".parquet")
+    table = pq.read_table(io.BytesIO(call.kwargs["Body"]))
+    assert table.schema == arrow_schema(columns)
+    assert table.column("id").to_pylist() == [1, 2]
+
+
+def test_parquet_table_skips_empty_table(columns):
+    mock_s3_client = MagicMock()
+    conn = MagicMock()
+    conn.run.return_value = []
+    conn.columns = columns
+
+    assert parquet_table(mock_s3_client, conn, "table1", "SELECT 1") is False
+    mock_s3_client.put_object.assert_not_called()
+
+
+@patch("extract.write_parquet_chunks", side_effect=Exception("S3 upload failed"))
+def test_streamed_parquet_table_rolls_back_the_cursor_when_the_upload_fails(
+    mock_write_parquet_chunks, columns, rows
+):
+    conn = MagicMock()
+    conn.run.side_effect = [None, None, rows, None]
+    conn.columns = columns
+
+    with pytest.raises(Exception, match="S3 upload failed"):
+        parquet_table(MagicMock(), conn, "table1", "SELECT 1", streaming=True)
+
+    assert conn.run.call_args.args == ("ROLLBACK",)
+
+
+@patch.dict("os.environ", {"EXTRACT_FORMAT": "parquet", "COPY_TABLES": "*"})
+@patch("extract.parquet_table")
+@patch("extract.copy_table")
+def test_extract_table_prefers_parquet_format(mock_copy_table, mock_parquet_table):
+    mock_s3_client, conn = MagicMock(), MagicMock()
+
+    extract_table(mock_s3_client, conn, "table1", "SELECT * FROM table1")
+
+    mock_parquet_table.assert_called_once_with(
+        mock_s3_client, conn, "table1", "SELECT * FROM table1", False
+    )
+    mock_copy_table.assert_not_called()
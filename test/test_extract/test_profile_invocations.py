@@ -0,0 +1,112 @@
+from lambda_utils import profiled
+from extract import extract_workers
+from moto import mock_aws
+from unittest.mock import patch, MagicMock
+import boto3
+import pstats
+import pytest
+import tracemalloc
+
+BUCKET = "will-code-bucket"
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    monkeypatch.delenv("PROFILE_INVOCATIONS", raising=False)
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket=BUCKET)
+        yield s3_client
+
+
+def mock_s3_client():
+    return boto3.client("s3", region_name="us-east-1")
+
+
+def keys(s3_client):
+    response = s3_client.list_objects_v2(Bucket=BUCKET)
+    return sorted(obj["Key"] for obj in response.get("Contents", []))
+
+
+def context():
+    return MagicMock(aws_request_id="req-1", function_name="extract")
+
+
+@profiled(BUCKET, mock_s3_client)
+def handler(event, context):
+    assert event["tracing"] == tracemalloc.is_tracing()
+    rows = [list(range(100)) for _ in range(100)]
+    return {"result": "Success", "rows": len(rows)}
+
+
+def test_invocations_are_not_profiled_by_default(s3_client):
+    assert handler({"tracing": False}, context()) == {"result": "Success", "rows": 100}
+
+    assert keys(s3_client) == []
+
+
+def test_event_flag_saves_stats_and_allocations_under_the_request_id(
+    s3_client, tmp_path
+):
+    assert handler({"profile": True, "tracing": True}, context()) == {
+        "result": "Success",
+        "rows": 100,
+    }
+
+    assert keys(s3_client) == [
+        "diagnostics/extract/req-1.allocations.txt",
+        "diagnostics/extract/req-1.pstats",
+    ]
+    stats_file = tmp_path / "req-1.pstats"
+    stats_file.write_bytes(
+        s3_client.get_object(Bucket=BUCKET, Key="diagnostics/extract/req-1.pstats")[
+            "Body"
+        ].read()
+    )
+    functions = [name for _, _, name in pstats.Stats(str(stats_file)).stats]
+    assert "handler" in functions
+
+    allocations = s3_client.get_object(
+        Bucket=BUCKET, Key="diagnostics/extract/req-1.allocations.txt"
+    )
+    assert allocations["Metadata"] == {"request-id": "req-1"}
+    assert allocations["Body"].read().decode().startswith("Peak traced memory:")
+    assert not tracemalloc.is_tracing()
+
+
+def test_environment_variable_profiles_every_invocation(s3_client, monkeypatch):
+    monkeypatch.setenv("PROFILE_INVOCATIONS", "true")
+
+    handler({"tracing": True}, context())
+
+    assert len(keys(s3_client)) == 2
+
+
+def test_failed_invocations_are_profiled_too(s3_client):
+    @profiled(BUCKET, mock_s3_client)
+    def failing(event, context):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        failing({"profile": True}, context())
+
+    assert len(keys(s3_client)) == 2
+
+
+def test_failing_to_save_a_profile_does_not_fail_the_invocation(s3_client):
+    with patch("lambda_utils.save_profile", side_effect=Exception("denied")):
+        assert handler({"profile": True, "tracing": True}, context()) == {
+            "result": "Success",
+            "rows": 100,
+        }
+
+
+def test_profiled_invocations_extract_tables_serially(s3_client, monkeypatch):
+    monkeypatch.setenv("EXTRACT_WORKERS", "4")
+
+    @profiled(BUCKET, mock_s3_client)
+    def workers(event, context):
+        return extract_workers()
+
+    assert workers({}, context()) == 4
+    assert workers({"profile": True}, context()) == 1
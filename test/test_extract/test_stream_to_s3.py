@@ -0,0 +1,70 @@
+from util_functions import stream_to_s3
+from moto import mock_aws
+from botocore.exceptions import ClientError
+from unittest.mock import MagicMock
+import boto3
+import pytest
+
+
+@mock_aws
+def test_stream_to_s3_successfully_uploads():
+    """
+    Streams several chunks into a mock bucket and checks the completed object
+    is the concatenation of every chunk.
+    """
+    bucket_name = "test-bucket"
+    file_name = "test-file.csv"
+    chunks = [b"column1,column2\n", b"value1,value2\n", b"value3,value4\n"]
+
+    mock_s3_client = boto3.client("s3", region_name="us-east-1")
+    mock_s3_client.create_bucket(Bucket=bucket_name)
+
+    stream_to_s3(mock_s3_client, iter(chunks), bucket_name, file_name)
+
+    response = mock_s3_client.get_object(Bucket=bucket_name, Key=file_name)
+    assert response["Body"].read() == b"".join(chunks)
+
+
+def test_stream_to_s3_uploads_a_part_each_time_part_size_is_reached():
+    mock_s3_client = MagicMock()
+    mock_s3_client.create_multipart_upload.return_value = {"UploadId": "abc"}
+    mock_s3_client.upload_part.side_effect = [{"ETag": "1"}, {"ETag": "2"}]
+
+    stream_to_s3(mock_s3_client, [b"aaa", b"bbb", b"c"], "bucket", "key", part_size=5)
+
+    bodies = [c.kwargs["Body"] for c in mock_s3_client.upload_part.call_args_list]
+    assert bodies == [b"aaabbb", b"c"]
+    mock_s3_client.complete_multipart_upload.assert_called_once_with(
+        Bucket="bucket",
+        Key="key",
+        MultipartUpload={
+            "Parts": [{"ETag": "1", "PartNumber": 1}, {"ETag": "2", "PartNumber": 2}]
+        },
+        UploadId="abc",
+    )
+
+
+def test_stream_to_s3_aborts_upload_on_failure():
+    mock_s3_client = MagicMock()
+    mock_s3_client.create_multipart_upload.return_value = {"UploadId": "abc"}
+    error_response = {"Error": {"Code": "AccessDenied", "Message": "Access Denied"}}
+    mock_s3_client.upload_part.side_effect = ClientError(error_response, "UploadPart")
+
+    with pytest.raises(ClientError):
+        stream_to_s3(mock_s3_client, [b"data"], "bucket", "key", part_size=4)
+
+    mock_s3_client.abort_multipart_upload.assert_called_once_with(
+        Bucket="bucket", Key="key", UploadId="abc"
+    )
+    mock_s3_client.complete_multipart_upload.assert_not_called()
+
+
+def test_stream_to_s3_uses_single_put_when_data_fits_in_one_part():
+    mock_s3_client = MagicMock()
+
+    stream_to_s3(mock_s3_client, [b"column1\n", b"value1\n"], "bucket", "key")
+
+    mock_s3_client.put_object.assert_called_once_with(
+        Body=b"column1\nvalue1\n", Bucket="bucket", Key="key"
+    )
+    mock_s3_client.create_multipart_upload.assert_not_called()
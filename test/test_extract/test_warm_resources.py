@@ -0,0 +1,89 @@
+from util_functions import (
+    get_secret,
+    get_warm_connection,
+    get_warm_s3_client,
+    invalidate_resources,
+)
+from unittest.mock import patch, MagicMock
+import json
+import pytest
+
+
+def make_secrets_client(values):
+    mock_client = MagicMock()
+    mock_client.get_secret_value.return_value = {"SecretString": json.dumps(values)}
+    return mock_client
+
+
+@patch("util_functions.boto3.client")
+def test_get_secret_is_cached_between_calls(mock_boto_client):
+    mock_boto_client.return_value = make_secrets_client({"user": "a"})
+
+    assert get_secret("Plan-B") == {"user": "a"}
+    assert get_secret("Plan-B") == {"user": "a"}
+
+    mock_boto_client.return_value.get_secret_value.assert_called_once()
+
+
+@patch.dict("os.environ", {"SECRET_TTL_SECONDS": "0"})
+@patch("util_functions.boto3.client")
+def test_get_secret_is_fetched_again_once_ttl_expires(mock_boto_client):
+    mock_boto_client.return_value = make_secrets_client({"user": "a"})
+
+    get_secret("Plan-B")
+    get_secret("Plan-B")
+
+    assert mock_boto_client.return_value.get_secret_value.call_count == 2
+
+
+@patch("util_functions.boto3.client")
+def test_invalidate_resources_forgets_cached_secrets(mock_boto_client):
+    mock_boto_client.return_value = make_secrets_client({"user": "a"})
+
+    get_secret("Plan-B")
+    invalidate_resources()
+    get_secret("Plan-B")
+
+    assert mock_boto_client.return_value.get_secret_value.call_count == 2
+
+
+def test_get_warm_s3_client_creates_client_once():
+    factory = MagicMock()
+
+    assert get_warm_s3_client(factory) is get_warm_s3_client(factory)
+    factory.assert_called_once()
+
+
+def test_get_warm_connection_replaces_dead_connection():
+    dead_conn, new_conn = MagicMock(), MagicMock()
+    dead_conn.run.side_effect = Exception("network error")
+    factory = MagicMock(side_effect=[dead_conn, new_conn])
+
+    get_warm_connection(factory)
+    conn = get_warm_connection(factory)
+
+    assert conn is new_conn
+    dead_conn.close.assert_called_once()
+
+
+@patch("util_functions.boto3.client")
+def test_get_warm_connection_retries_with_refreshed_secret(mock_boto_client):
+    mock_boto_client.return_value = make_secrets_client({"password": "old"})
+    get_secret("Plan-B")
+    mock_boto_client.return_value = make_secrets_client({"password": "new"})
+
+    def factory():
+        if get_secret("Plan-B")["password"] != "new":
+            raise Exception("password authentication failed")
+        return "connection"
+
+    assert get_warm_connection(factory) == "connection"
+
+
+def test_get_warm_connection_raises_when_retry_fails():
+    factory = MagicMock(side_effect=Exception("connection refused"))
+
+    with pytest.raises(Exception, match="connection refused"):
+        get_warm_connection(factory)
+
+    assert factory.call_count == 2
@@ -0,0 +1,36 @@
+from util_functions import load_watermarks, save_watermarks
+from moto import mock_aws
+from datetime import datetime
+from botocore.exceptions import ClientError
+import boto3
+import pytest
+
+
+@pytest.fixture
+def s3_client():
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket="test-bucket")
+        yield s3_client
+
+
+def test_load_watermarks_returns_empty_dict_when_manifest_missing(s3_client):
+    assert load_watermarks(s3_client, "test-bucket", "watermarks.json") == {}
+
+
+def test_saved_watermarks_can_be_loaded_back(s3_client):
+    watermarks = {
+        "staff": datetime(2024, 1, 1, 12, 0, 0, 123000),
+        "currency": datetime(2023, 6, 30),
+    }
+
+    save_watermarks(s3_client, watermarks, "test-bucket", "watermarks.json")
+
+    assert load_watermarks(s3_client, "test-bucket", "watermarks.json") == watermarks
+
+
+def test_load_watermarks_raises_other_client_errors(s3_client):
+    with pytest.raises(ClientError) as err_info:
+        load_watermarks(s3_client, "invalid-bucket", "watermarks.json")
+
+    assert err_info.value.response["Error"]["Code"] == "NoSuchBucket"
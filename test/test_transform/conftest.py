@@ -0,0 +1,34 @@
+from unittest.mock import patch
+
+import boto3
+import pytest
+import transform_utils
+from moto import mock_aws
+
+BUCKETS = [
+    "ingested",
+    "test-bucket",
+    "will-code-bucket",
+    "will-ingested-data-bucket",
+    "will-processed-data-bucket",
+]
+
+
+@pytest.fixture(autouse=True)
+def cold_container(tmp_path, monkeypatch):
+    """Start every test as a cold Lambda container with an empty reference cache."""
+    monkeypatch.setattr(transform_utils, "REFERENCE_CACHE_DIR", str(tmp_path / "cache"))
+    transform_utils.clear_reference_cache()
+    yield
+    transform_utils.clear_reference_cache()
+
+
+@pytest.fixture
+def s3_client():
+    """Mocked S3 with every bucket the transform tests use, patched into transform_utils."""
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        for bucket in BUCKETS:
+            s3_client.create_bucket(Bucket=bucket)
+        with patch("transform_utils.s3", s3_client):
+            yield s3_client
@@ -0,0 +1,100 @@
+from transform_utils import arrow_schema, compact_dataframe, optimize_dtypes
+import io
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+
+def currency(codes, ids):
+    return pd.DataFrame(
+        {
+            "currency_id": pd.array(ids, dtype="Int64"),
+            "currency_code": codes,
+            "description": ["a description"] * len(ids),
+            "rate": [1.5] * len(ids),
+        }
+    )
+
+
+def test_columns_get_compact_dtypes():
+    compact = compact_dataframe(currency(["GBP", "USD"], [1, 2]), "currency")
+
+    assert compact.dtypes.astype(str).to_dict() == {
+        "currency_id": "Int32",
+        "currency_code": "category",
+        "description": "string",
+        "rate": "float64",
+    }
+    assert compact["description"].dtype.storage == "pyarrow"
+
+
+def test_ids_too_large_for_int32_are_rejected():
+    with pytest.raises(ValueError, match="currency.currency_id"):
+        compact_dataframe(currency(["GBP"], [2**40]), "currency")
+
+
+def test_mixed_object_columns_are_left_alone():
+    compact = compact_dataframe(pd.DataFrame({"notes": ["a", 1]}), "other")
+
+    assert compact["notes"].dtype == object
+
+
+def test_optimize_dtypes_applies_each_tables_categoricals():
+    raw_data = {
+        "currency": currency(["GBP"], [1]),
+        "address": pd.DataFrame({"city": ["Leeds"], "currency_code": ["GBP"]}),
+    }
+
+    optimized = optimize_dtypes(raw_data)
+
+    assert str(optimized["currency"]["currency_code"].dtype) == "category"
+    assert str(optimized["address"]["city"].dtype) == "category"
+    assert str(optimized["address"]["currency_code"].dtype) == "string"
+
+
+def test_parquet_schema_is_the_same_whatever_the_data():
+    schemas = []
+    for codes, ids in [(["GBP", "USD"], [1, 2]), (["EUR"], [3])]:
+        buffer = io.BytesIO()
+        compact_dataframe(currency(codes, ids), "dim_currency").to_parquet(
+            buffer, index=False
+        )
+        schemas.append(pq.read_schema(io.BytesIO(buffer.getvalue())))
+        read_back = pd.read_parquet(io.BytesIO(buffer.getvalue()))
+        assert str(read_back["currency_code"].dtype) == "category"
+        assert str(read_back["currency_id"].dtype) == "Int32"
+
+    assert schemas[0].remove_metadata() == schemas[1].remove_metadata()
+
+
+def address(cities, streets, ids):
+    return pd.DataFrame(
+        {
+            "address_id": ids,
+            "street": pd.Series(streets, dtype=object),
+            "city": cities,
+            "country": ["UK"] * len(ids),
+        }
+    )
+
+
+def test_arrow_schema_is_the_same_whatever_the_categories_and_nulls():
+    few = compact_dataframe(address(["Leeds"], [None], [None]), "dim_address")
+    many = compact_dataframe(
+        address(
+            [f"city {i}" for i in range(300)],
+            [f"{i} Street" for i in range(300)],
+            list(range(300)),
+        ),
+        "dim_address",
+    )
+
+    schema = arrow_schema(few)
+
+    assert schema.remove_metadata() == arrow_schema(many).remove_metadata()
+    assert schema.field("city").type == pa.dictionary(pa.int32(), pa.large_string())
+    assert schema.field("street").type == pa.large_string()
+    assert schema.field("address_id").type == pa.int32()
+    table = pa.Table.from_pandas(many, schema=schema, preserve_index=False)
+    assert table.column("city").to_pylist()[223] == "city 223"
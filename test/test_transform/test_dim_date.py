@@ -0,0 +1,86 @@
+from transform_utils import (
+    build_calendar,
+    load_dimension_snapshot,
+    transform_dim_date,
+    upsert_dimension,
+)
+import pandas as pd
+
+
+def orders(*dates):
+    return pd.DataFrame({"order_date": pd.to_datetime(list(dates))})
+
+
+def test_calendar_has_one_row_per_day_with_its_attributes():
+    calendar = build_calendar("2024-02-28", "2024-03-01")
+
+    assert calendar.to_dict("records")[0] == {
+        "date_id": pd.Timestamp("2024-02-28"),
+        "year": 2024,
+        "month": 2,
+        "day": 28,
+        "day_of_week": 3,
+        "day_name": "Wednesday",
+        "month_name": "February",
+        "quarter": 1,
+    }
+    assert calendar["day"].tolist() == [28, 29, 1]
+
+
+def test_first_run_builds_whole_years_around_the_orders(s3_client):
+    dim_date = transform_dim_date(orders("2023-06-01", "2024-02-10"))
+
+    assert dim_date["date_id"].min() == pd.Timestamp("2023-01-01")
+    assert dim_date["date_id"].max() == pd.Timestamp("2024-12-31")
+    assert len(dim_date) == 365 + 366
+
+
+def test_orders_within_the_cached_calendar_build_nothing(s3_client):
+    upsert_dimension(build_calendar("2024-01-01", "2024-12-31"), "dim_date")
+
+    assert transform_dim_date(orders("2024-03-01")).empty
+    assert "order_date" not in load_dimension_snapshot("dim_date")
+
+
+def test_calendar_is_extended_only_by_the_missing_years(s3_client):
+    upsert_dimension(build_calendar("2024-01-01", "2024-12-31"), "dim_date")
+
+    dim_date = transform_dim_date(orders("2023-12-31", "2025-01-01"))
+
+    assert dim_date["year"].unique().tolist() == [2023, 2025]
+    assert len(dim_date) == 365 + 365
+
+
+def test_calendar_covers_the_dates_the_fact_resolves(s3_client):
+    sales_order = pd.DataFrame(
+        {
+            "created_at": pd.to_datetime(["2024-12-20"]),
+            "last_updated": pd.to_datetime(["2024-12-20"]),
+            "agreed_delivery_date": ["2025-01-10"],
+            "agreed_payment_date": [None],
+        }
+    )
+
+    dim_date = transform_dim_date(sales_order)
+
+    assert dim_date["date_id"].min() == pd.Timestamp("2024-01-01")
+    assert dim_date["date_id"].max() == pd.Timestamp("2025-12-31")
+
+
+def test_empty_sales_order_is_skipped(s3_client):
+    assert transform_dim_date(pd.DataFrame()).empty
+
+
+def test_dim_date_saved_before_calendar_snapshots_is_rebuilt(s3_client):
+    s3_client.put_object(
+        Bucket="will-processed-data-bucket",
+        Key="dim_date/2024/01/01/dim_date.parquet",
+        Body=orders("2024-01-01").to_parquet(index=False),
+    )
+
+    dim_date = transform_dim_date(orders("2024-03-01"))
+    upsert_dimension(dim_date, "dim_date")
+
+    assert len(dim_date) == 366
+    assert transform_dim_date(orders("2024-03-01")).empty
+    assert "order_date" not in load_dimension_snapshot("dim_date")
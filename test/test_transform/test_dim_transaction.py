@@ -0,0 +1,72 @@
+from transform_utils import transform_dim_transaction, load_dimension_snapshot
+from transform import lambda_handler
+import pandas as pd
+
+
+def transaction():
+    return pd.DataFrame(
+        {
+            "transaction_id": pd.array([1, 2], dtype="Int64"),
+            "timestamp": pd.to_datetime(["2024-01-01", "2024-01-02"]),
+            "last_updated": pd.to_datetime(["2024-01-01", "2024-01-02"]),
+        }
+    )
+
+
+def payment():
+    return pd.DataFrame(
+        {
+            "payment_id": pd.array([10, 20, 10], dtype="Int64"),
+            "transaction_id": pd.array([1, 2, 1], dtype="Int64"),
+            "amount": [5.0, 7.5, 6.0],
+            "payment_type_id": pd.array([1, 2, 1], dtype="Int64"),
+        }
+    )
+
+
+def test_transactions_are_joined_to_their_latest_payment():
+    dim_transaction = transform_dim_transaction(transaction(), payment())
+
+    assert dim_transaction.columns.tolist() == [
+        "transaction_id",
+        "payment_id",
+        "amount",
+        "payment_type_id",
+        "timestamp",
+        "last_updated",
+    ]
+    assert dim_transaction["payment_id"].tolist() == [10, 20]
+    assert dim_transaction["amount"].tolist() == [6.0, 7.5]
+
+
+def test_empty_payment_is_skipped():
+    assert transform_dim_transaction(transaction(), pd.DataFrame()).empty
+
+
+def test_transaction_event_saves_every_dimension_of_the_batch(s3_client):
+    bodies = {
+        "transaction/2024/01/01/a.csv": b"transaction_id,timestamp,last_updated\n"
+        b"1,2024-01-01,2024-01-01\n",
+        "payment/2024/01/01/a.csv": b"payment_id,transaction_id,amount,payment_type_id\n"
+        b"10,1,5.0,1\n",
+        "currency/2024/01/01/a.csv": b"currency_id,currency_code,description\n"
+        b"1,GBP,Pound\n",
+    }
+    for key, body in bodies.items():
+        s3_client.put_object(Bucket="will-ingested-data-bucket", Key=key, Body=body)
+    event = {
+        "Records": [
+            {
+                "s3": {
+                    "bucket": {"name": "will-ingested-data-bucket"},
+                    "object": {"key": key},
+                }
+            }
+            for key in ["transaction/2024/01/01/a.csv", "currency/2024/01/01/a.csv"]
+        ]
+    }
+
+    lambda_handler(event, None)
+
+    assert load_dimension_snapshot("dim_transaction")["payment_id"].tolist() == [10]
+    assert load_dimension_snapshot("dim_currency")["currency_id"].tolist() == [1]
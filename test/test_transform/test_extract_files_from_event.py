@@ -0,0 +1,98 @@
+from transform_utils import extract_files_from_event, TABLES
+import json
+
+
+def test_returns_records_of_s3_event(s3_client):
+    event = {
+        "Records": [
+            {"s3": {"bucket": {"name": "bucket"}, "object": {"key": "staff/a.csv"}}}
+        ]
+    }
+
+    assert extract_files_from_event(event) == [
+        {"bucket": "bucket", "key": "staff/a.csv"}
+    ]
+
+
+def test_batch_mode_lists_tables_from_catalog(s3_client):
+    catalog = {"fingerprint": "abc", "tables": {"staff": {}, "currency": {}}}
+    s3_client.put_object(
+        Bucket="will-code-bucket", Key="catalog.json", Body=json.dumps(catalog)
+    )
+
+    keys = [file["key"] for file in extract_files_from_event({})]
+
+    assert keys == ["currency/", "staff/", "initial_extract/"]
+
+
+def test_batch_mode_falls_back_to_known_tables_without_catalog(s3_client):
+    keys = [file["key"] for file in extract_files_from_event({})]
+
+    assert keys == [f"{table}/" for table in TABLES] + ["initial_extract/"]
+
+
+def s3_record(key, bucket="bucket"):
+    return {"s3": {"bucket": {"name": bucket}, "object": {"key": key}}}
+
+
+def test_keys_are_url_decoded(s3_client):
+    event = {"Records": [s3_record("staff/2024/2024-01-01T10%3A00%3A00.csv")]}
+
+    assert extract_files_from_event(event) == [
+        {"bucket": "bucket", "key": "staff/2024/2024-01-01T10:00:00.csv"}
+    ]
+
+
+def test_records_are_deduplicated_and_ordered_by_table(s3_client):
+    event = {
+        "Records": [
+            s3_record("staff/b.csv"),
+            s3_record("currency/a.csv"),
+            s3_record("staff/a.csv"),
+            s3_record("staff/b.csv"),
+        ]
+    }
+
+    assert [file["key"] for file in extract_files_from_event(event)] == [
+        "currency/a.csv",
+        "staff/a.csv",
+        "staff/b.csv",
+    ]
+
+
+def test_keys_covered_by_a_prefix_are_dropped(s3_client):
+    event = {
+        "Records": [
+            s3_record("staff/a.csv"),
+            s3_record("staff/"),
+            s3_record("staff/a.csv", bucket="other"),
+        ]
+    }
+
+    assert extract_files_from_event(event) == [
+        {"bucket": "bucket", "key": "staff/"},
+        {"bucket": "other", "key": "staff/a.csv"},
+    ]
+
+
+def test_sqs_batches_of_s3_notifications_are_unwrapped(s3_client):
+    def message(*keys):
+        body = {"Records": [s3_record(key) for key in keys]}
+        return {"eventSource": "aws:sqs", "body": json.dumps(body)}
+
+    test_event = {
+        "eventSource": "aws:sqs",
+        "body": json.dumps({"Event": "s3:TestEvent"}),
+    }
+    event = {
+        "Records": [
+            message("staff/a.csv"),
+            message("currency/a.csv", "staff/a.csv"),
+            test_event,
+        ]
+    }
+
+    assert [file["key"] for file in extract_files_from_event(event)] == [
+        "currency/a.csv",
+        "staff/a.csv",
+    ]
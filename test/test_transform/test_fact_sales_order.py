@@ -0,0 +1,152 @@
+from transform_utils import (
+    transform_fact_sales_order,
+    transform_dim_date,
+    plan_transformations,
+    build_calendar,
+    upsert_dimension,
+)
+from unittest.mock import patch
+import datetime
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def sales_order():
+    return pd.DataFrame(
+        {
+            "sales_order_id": pd.array([1, 2], dtype="Int64"),
+            "created_at": pd.to_datetime(
+                ["2024-01-01 10:30:00.5", "2024-01-02 08:00"], format="ISO8601"
+            ),
+            "last_updated": pd.to_datetime(["2024-01-03 11:00", "2024-01-02 08:00"]),
+            "design_id": pd.array([3, 4], dtype="Int64"),
+            "staff_id": pd.array([1, 99], dtype="Int64"),
+            "counterparty_id": pd.array([1, 1], dtype="Int64"),
+            "units_sold": pd.array([10, 20], dtype="Int64"),
+            "unit_price": [2.5, 3.0],
+            "currency_id": pd.array([1, 2], dtype="Int64"),
+            "agreed_delivery_date": pd.to_datetime(["2024-01-10", "2024-01-11"]),
+            "agreed_payment_date": pd.to_datetime(["2024-01-12", "2024-01-13"]),
+            "agreed_delivery_location_id": pd.array([5, 6], dtype="Int64"),
+        }
+    )
+
+
+def dims():
+    return dict(
+        dim_date=build_calendar("2024-01-01", "2024-12-31"),
+        dim_staff=pd.DataFrame({"staff_id": pd.array([1], dtype="Int64")}),
+        dim_counterparty=pd.DataFrame({"counterparty_id": [1]}),
+        dim_currency=pd.DataFrame({"currency_id": [1, 2]}),
+        dim_address=pd.DataFrame({"address_id": [5, 6]}),
+    )
+
+
+def test_splits_timestamps_into_dates_and_times(s3_client, sales_order):
+    fact = transform_fact_sales_order(sales_order, **dims())
+
+    assert fact["created_date"].tolist() == [
+        pd.Timestamp("2024-01-01"),
+        pd.Timestamp("2024-01-02"),
+    ]
+    assert fact["created_time"].tolist() == [
+        datetime.time(10, 30, 0, 500000),
+        datetime.time(8, 0),
+    ]
+    assert fact["last_updated_date"].tolist()[0] == pd.Timestamp("2024-01-03")
+
+
+def test_resolves_dimension_keys(s3_client, sales_order, caplog):
+    fact = transform_fact_sales_order(sales_order, **dims())
+
+    assert fact.columns.tolist() == [
+        "sales_order_id",
+        "created_date",
+        "created_time",
+        "last_updated_date",
+        "last_updated_time",
+        "sales_staff_id",
+        "counterparty_id",
+        "units_sold",
+        "unit_price",
+        "currency_id",
+        "design_id",
+        "agreed_payment_date",
+        "agreed_delivery_date",
+        "agreed_delivery_location_id",
+    ]
+    assert fact["sales_staff_id"].tolist() == [1, 99]
+    assert fact["currency_id"].tolist() == [1, 2]
+    assert fact["agreed_delivery_location_id"].tolist() == [5, 6]
+    assert "1 keys not found in dim_staff." in caplog.messages
+
+
+def test_resolves_keys_from_saved_dimension_snapshots(s3_client, sales_order, caplog):
+    upsert_dimension(
+        pd.DataFrame({"staff_id": pd.array([99], dtype="Int64")}), "dim_staff"
+    )
+
+    fact = transform_fact_sales_order(sales_order, **dims())
+
+    assert fact["sales_staff_id"].tolist() == [1, 99]
+    assert not [message for message in caplog.messages if "not found" in message]
+
+
+def test_dates_in_the_next_year_are_in_the_calendar(s3_client, sales_order):
+    sales_order["created_at"] = pd.to_datetime(["2024-12-20", "2024-12-21"])
+    sales_order["agreed_delivery_date"] = pd.to_datetime(["2025-01-10", "2025-01-11"])
+
+    dim_date = transform_dim_date(sales_order)
+    fact = transform_fact_sales_order(sales_order, **{**dims(), "dim_date": dim_date})
+
+    assert dim_date["date_id"].max() == pd.Timestamp("2025-12-31")
+    assert fact["agreed_delivery_date"].tolist()[0] == pd.Timestamp("2025-01-10")
+
+
+def test_each_dimension_snapshot_is_loaded_once_per_build(s3_client, sales_order):
+    with patch(
+        "transform_utils.load_dimension_snapshot", return_value=pd.DataFrame()
+    ) as load:
+        transform_fact_sales_order(sales_order, **dims())
+
+    assert sorted(call.args[0] for call in load.call_args_list) == [
+        "dim_address",
+        "dim_counterparty",
+        "dim_currency",
+        "dim_date",
+        "dim_staff",
+    ]
+
+
+def test_dim_date_saved_before_calendar_snapshots_has_no_keys(s3_client, sales_order):
+    s3_client.put_object(
+        Bucket="will-processed-data-bucket",
+        Key="dim_date/2024/01/01/dim_date.parquet",
+        Body=pd.DataFrame(
+            {"order_date": pd.to_datetime(["2023-01-01"]), "year": [2023], "month": [1]}
+        ).to_parquet(index=False),
+    )
+
+    fact = transform_fact_sales_order(sales_order, **dims())
+
+    assert fact["created_date"].tolist() == [
+        pd.Timestamp("2024-01-01"),
+        pd.Timestamp("2024-01-02"),
+    ]
+
+
+def test_empty_sales_order_is_skipped(s3_client):
+    assert transform_fact_sales_order(pd.DataFrame(), **dims()).empty
+
+
+def test_sales_order_events_rebuild_the_fact():
+    outputs, _ = plan_transformations([{"bucket": "b", "key": "sales_order/a.csv"}])
+
+    assert outputs == ["dim_date", "fact_sales_order"]
+
+
+def test_dimension_changes_alone_do_not_rebuild_the_fact():
+    outputs, _ = plan_transformations([{"bucket": "b", "key": "currency/a.csv"}])
+
+    assert outputs == ["dim_currency"]
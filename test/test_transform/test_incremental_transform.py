@@ -0,0 +1,178 @@
+from transform_utils import (
+    load_new_raw_data,
+    record_processed_objects,
+    load_ledger,
+)
+from unittest.mock import patch
+import transform_utils
+import io
+import json
+import pandas as pd
+
+
+def triggered(*tables):
+    return [{"bucket": "ingested", "key": f"{table}/"} for table in tables]
+
+
+def test_first_run_loads_every_object(s3_client):
+    s3_client.put_object(Bucket="ingested", Key="currency/a.csv", Body=b"id\n1\n")
+    s3_client.put_object(Bucket="ingested", Key="currency/b.csv", Body=b"id\n2\n")
+
+    raw_data, new_objects = load_new_raw_data(triggered("currency"))
+
+    assert raw_data["currency"]["id"].tolist() == [1, 2]
+    assert [file["Key"] for file in new_objects["currency"]] == [
+        "currency/a.csv",
+        "currency/b.csv",
+    ]
+
+
+def test_recorded_objects_are_skipped(s3_client):
+    s3_client.put_object(Bucket="ingested", Key="currency/a.csv", Body=b"id\n1\n")
+    _, new_objects = load_new_raw_data(triggered("currency"))
+    record_processed_objects(new_objects)
+    s3_client.put_object(Bucket="ingested", Key="currency/b.csv", Body=b"id\n2\n")
+
+    raw_data, new_objects = load_new_raw_data(triggered("currency"))
+
+    assert raw_data["currency"]["id"].tolist() == [2]
+    assert list(load_ledger("currency")) == ["currency/a.csv"]
+
+
+def test_rewritten_objects_are_reloaded(s3_client):
+    s3_client.put_object(Bucket="ingested", Key="currency/a.csv", Body=b"id\n1\n")
+    record_processed_objects(load_new_raw_data(triggered("currency"))[1])
+    s3_client.put_object(Bucket="ingested", Key="currency/a.csv", Body=b"id\n3\n")
+
+    raw_data, _ = load_new_raw_data(triggered("currency"))
+
+    assert raw_data["currency"]["id"].tolist() == [3]
+
+
+def test_nothing_new_loads_empty_table(s3_client):
+    s3_client.put_object(Bucket="ingested", Key="currency/a.csv", Body=b"id\n1\n")
+    record_processed_objects(load_new_raw_data(triggered("currency"))[1])
+
+    raw_data, new_objects = load_new_raw_data(triggered("currency"))
+
+    assert raw_data["currency"].empty
+    assert new_objects["currency"] == []
+
+
+def test_lookup_tables_are_loaded_in_full(s3_client):
+    s3_client.put_object(Bucket="ingested", Key="staff/a.csv", Body=b"id\n1\n")
+    s3_client.put_object(Bucket="ingested", Key="department/a.csv", Body=b"id\n1\n")
+    record_processed_objects(load_new_raw_data(triggered("staff", "department"))[1])
+    s3_client.put_object(Bucket="ingested", Key="staff/b.csv", Body=b"id\n2\n")
+
+    raw_data, _ = load_new_raw_data(triggered("staff", "department"))
+
+    assert raw_data["staff"]["id"].tolist() == [2]
+    assert raw_data["department"]["id"].tolist() == [1]
+
+
+def test_new_lookup_rows_reload_the_joined_table(s3_client):
+    s3_client.put_object(Bucket="ingested", Key="staff/a.csv", Body=b"id\n1\n")
+    s3_client.put_object(Bucket="ingested", Key="department/a.csv", Body=b"id\n1\n")
+    record_processed_objects(load_new_raw_data(triggered("staff", "department"))[1])
+    s3_client.put_object(Bucket="ingested", Key="department/b.csv", Body=b"id\n2\n")
+
+    raw_data, _ = load_new_raw_data(triggered("staff", "department"))
+
+    assert raw_data["staff"]["id"].tolist() == [1]
+
+
+def test_key_level_triggers_load_lookup_tables_in_full(s3_client):
+    s3_client.put_object(Bucket="ingested", Key="staff/a.csv", Body=b"id\n1\n")
+    s3_client.put_object(Bucket="ingested", Key="department/a.csv", Body=b"id\n1\n")
+    s3_client.put_object(Bucket="ingested", Key="department/b.csv", Body=b"id\n3\n")
+    record_processed_objects(load_new_raw_data(triggered("staff", "department"))[1])
+    s3_client.put_object(Bucket="ingested", Key="staff/b.csv", Body=b"id\n2\n")
+
+    raw_data, new_objects = load_new_raw_data(
+        [
+            {"bucket": "ingested", "key": "staff/b.csv"},
+            {"bucket": "ingested", "key": "department/a.csv"},
+        ]
+    )
+
+    assert raw_data["staff"]["id"].tolist() == [2]
+    assert raw_data["department"]["id"].tolist() == [1, 3]
+    assert new_objects["department"] == []
+
+
+def test_key_level_lookup_delta_reloads_the_joined_table_in_full(s3_client):
+    s3_client.put_object(Bucket="ingested", Key="staff/a.csv", Body=b"id\n1\n")
+    s3_client.put_object(Bucket="ingested", Key="department/a.csv", Body=b"id\n1\n")
+    record_processed_objects(load_new_raw_data(triggered("staff", "department"))[1])
+    s3_client.put_object(Bucket="ingested", Key="staff/b.csv", Body=b"id\n2\n")
+    s3_client.put_object(Bucket="ingested", Key="department/b.csv", Body=b"id\n2\n")
+
+    raw_data, new_objects = load_new_raw_data(
+        [
+            {"bucket": "ingested", "key": "staff/b.csv"},
+            {"bucket": "ingested", "key": "department/b.csv"},
+        ]
+    )
+
+    assert raw_data["staff"]["id"].tolist() == [1, 2]
+    assert raw_data["department"]["id"].tolist() == [1, 2]
+    assert [file["Key"] for file in new_objects["staff"]] == ["staff/b.csv"]
+
+
+def test_ledger_is_sharded_by_key_directory(s3_client):
+    s3_client.put_object(
+        Bucket="ingested", Key="currency/2024/01/01/a.csv", Body=b"id\n1\n"
+    )
+    s3_client.put_object(
+        Bucket="ingested", Key="currency/2024/01/02/b.csv", Body=b"id\n2\n"
+    )
+    record_processed_objects(load_new_raw_data(triggered("currency"))[1])
+    s3_client.put_object(
+        Bucket="ingested", Key="currency/2024/01/02/c.csv", Body=b"id\n3\n"
+    )
+
+    with patch(
+        "transform_utils.load_ledger", wraps=transform_utils.load_ledger
+    ) as loads:
+        raw_data, new_objects = load_new_raw_data(
+            [{"bucket": "ingested", "key": "currency/2024/01/02/c.csv"}]
+        )
+        record_processed_objects(new_objects)
+
+    assert raw_data["currency"]["id"].tolist() == [3]
+    assert {call.args[0] for call in loads.call_args_list} == {"currency/2024/01/02"}
+    assert list(load_ledger("currency/2024/01/01")) == ["currency/2024/01/01/a.csv"]
+    assert list(load_ledger("currency/2024/01/02")) == [
+        "currency/2024/01/02/b.csv",
+        "currency/2024/01/02/c.csv",
+    ]
+
+
+def test_ledger_saved_before_sharding_is_split_into_shards(s3_client):
+    s3_client.put_object(
+        Bucket="ingested", Key="currency/2024/01/01/a.csv", Body=b"id\n1\n"
+    )
+    s3_client.put_object(
+        Bucket="ingested", Key="currency/2024/01/02/b.csv", Body=b"id\n2\n"
+    )
+    etags = {
+        obj["Key"]: obj["ETag"]
+        for obj in s3_client.list_objects_v2(Bucket="ingested")["Contents"]
+    }
+    s3_client.put_object(
+        Bucket="will-code-bucket",
+        Key="transform_ledger/currency.json",
+        Body=json.dumps(
+            {"currency/2024/01/01/a.csv": etags["currency/2024/01/01/a.csv"]}
+        ),
+    )
+
+    raw_data, _ = load_new_raw_data(triggered("currency"))
+
+    assert raw_data["currency"]["id"].tolist() == [2]
+    assert list(load_ledger("currency/2024/01/01")) == ["currency/2024/01/01/a.csv"]
+    listing = s3_client.list_objects_v2(Bucket="will-code-bucket")
+    assert "transform_ledger/currency.json" not in [
+        obj["Key"] for obj in listing["Contents"]
+    ]
@@ -0,0 +1,30 @@
+from pathlib import Path
+import os
+import subprocess
+import sys
+
+SRC = Path(__file__).resolve().parents[2] / "src"
+
+CHECK = """
+import sys
+import transform
+result = transform.lambda_handler(
+    {"Records": [{"s3": {"bucket": {"name": "b"}, "object": {"key": "design/a.csv"}}}]}, None
+)
+print(result["body"], "pandas" in sys.modules, "boto3" in sys.modules)
+"""
+
+
+def test_events_affecting_no_output_skip_heavy_imports():
+    result = subprocess.run(
+        [sys.executable, "-c", CHECK],
+        env=dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join([str(SRC / "transform"), str(SRC / "common")]),
+        ),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.split() == ["Nothing", "to", "transform.", "False", "False"]
@@ -0,0 +1,131 @@
+from transform_utils import load_table_from_s3
+import gzip
+import io
+import pandas as pd
+import pytest
+import zstandard
+
+
+def compress_zstd(data):
+    """Compress the way the extract Lambda does, as a stream without a content size."""
+    buffer = io.BytesIO()
+    with zstandard.ZstdCompressor().stream_writer(buffer, closefd=False) as writer:
+        writer.write(data)
+    return buffer.getvalue()
+
+
+def test_loads_plain_csv_files(s3_client):
+    s3_client.put_object(Bucket="test-bucket", Key="staff/a.csv", Body=b"id\n1\n")
+    s3_client.put_object(Bucket="test-bucket", Key="staff/b.csv", Body=b"id\n2\n")
+
+    df = load_table_from_s3("test-bucket", "staff/")
+
+    assert df["id"].tolist() == [1, 2]
+
+
+def test_loads_compressed_csv_files_transparently(s3_client):
+    s3_client.put_object(Bucket="test-bucket", Key="staff/a.csv", Body=b"id\n1\n")
+    s3_client.put_object(
+        Bucket="test-bucket", Key="staff/b.csv.gz", Body=gzip.compress(b"id\n2\n")
+    )
+    s3_client.put_object(
+        Bucket="test-bucket", Key="staff/c.csv.zst", Body=compress_zstd(b"id\n3\n")
+    )
+
+    df = load_table_from_s3("test-bucket", "staff/")
+
+    assert df["id"].tolist() == [1, 2, 3]
+
+
+def test_ignores_other_files(s3_client):
+    s3_client.put_object(Bucket="test-bucket", Key="staff/a.csv", Body=b"id\n1\n")
+    s3_client.put_object(Bucket="test-bucket", Key="staff/notes.txt", Body=b"hello")
+
+    df = load_table_from_s3("test-bucket", "staff/")
+
+    assert df["id"].tolist() == [1]
+
+
+def test_returns_empty_dataframe_for_missing_prefix(s3_client):
+    assert load_table_from_s3("test-bucket", "staff/").empty
+
+
+def test_loads_parquet_files_with_their_types(s3_client):
+    buffer = io.BytesIO()
+    pd.DataFrame({"id": [2], "created_at": [pd.Timestamp("2024-01-01")]}).to_parquet(
+        buffer, index=False
+    )
+    s3_client.put_object(
+        Bucket="test-bucket", Key="staff/b.parquet", Body=buffer.getvalue()
+    )
+
+    df = load_table_from_s3("test-bucket", "staff/")
+
+    assert df["id"].tolist() == [2]
+    assert pd.api.types.is_datetime64_any_dtype(df["created_at"])
+
+
+def test_lists_past_the_first_page_of_keys(s3_client):
+    for i in range(1005):
+        s3_client.put_object(
+            Bucket="test-bucket", Key=f"staff/{i:04}.csv", Body=f"id\n{i}\n".encode()
+        )
+
+    df = load_table_from_s3("test-bucket", "staff/")
+
+    assert len(df) == 1005
+
+
+@pytest.mark.parametrize("workers", ["1", "4"])
+def test_concurrent_loads_keep_listing_order(s3_client, monkeypatch, workers):
+    monkeypatch.setenv("LOAD_WORKERS", workers)
+    for i in range(20):
+        s3_client.put_object(
+            Bucket="test-bucket", Key=f"staff/{i:02}.csv", Body=f"id\n{i}\n".encode()
+        )
+
+    df = load_table_from_s3("test-bucket", "staff/")
+
+    assert df["id"].tolist() == list(range(20))
+
+
+def test_read_spec_prunes_columns_and_sets_dtypes(s3_client):
+    s3_client.put_object(
+        Bucket="test-bucket",
+        Key="staff/a.csv.gz",
+        Body=gzip.compress(
+            b"staff_id,first_name,notes,created_at\n1,Ann,x,2024-01-01\n"
+        ),
+    )
+    spec = {"staff_id": "Int64", "first_name": "string", "created_at": "datetime"}
+
+    df = load_table_from_s3("test-bucket", "staff/", spec)
+
+    assert df.columns.tolist() == ["staff_id", "first_name", "created_at"]
+    assert str(df["staff_id"].dtype) == "Int64"
+    assert str(df["first_name"].dtype) == "string"
+    assert pd.api.types.is_datetime64_any_dtype(df["created_at"])
+
+
+def test_read_spec_skips_columns_missing_from_the_file(s3_client):
+    s3_client.put_object(
+        Bucket="test-bucket", Key="staff/a.csv", Body=b"staff_id,notes\n1,x\n"
+    )
+
+    df = load_table_from_s3(
+        "test-bucket", "staff/", {"staff_id": "Int64", "email": "string"}
+    )
+
+    assert df.columns.tolist() == ["staff_id"]
+
+
+def test_read_spec_prunes_parquet_columns(s3_client):
+    buffer = io.BytesIO()
+    pd.DataFrame({"staff_id": [1], "notes": ["x"]}).to_parquet(buffer, index=False)
+    s3_client.put_object(
+        Bucket="test-bucket", Key="staff/a.parquet", Body=buffer.getvalue()
+    )
+
+    df = load_table_from_s3("test-bucket", "staff/", {"staff_id": "Int64"})
+
+    assert df.columns.tolist() == ["staff_id"]
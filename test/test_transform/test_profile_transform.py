@@ -0,0 +1,52 @@
+from transform import lambda_handler
+from transform_utils import map_concurrently
+from lambda_utils import profiled
+from unittest.mock import MagicMock
+import marshal
+import pytest
+import threading
+
+BUCKET = "will-code-bucket"
+
+
+@pytest.fixture(autouse=True)
+def lambda_environment(monkeypatch):
+    monkeypatch.delenv("PROFILE_INVOCATIONS", raising=False)
+
+
+def keys(s3_client):
+    response = s3_client.list_objects_v2(Bucket=BUCKET)
+    return sorted(obj["Key"] for obj in response.get("Contents", []))
+
+
+def test_profiled_invocations_save_their_profile_to_the_code_bucket(s3_client):
+    context = MagicMock(aws_request_id="req-2", function_name="transform")
+
+    result = lambda_handler({"profile": True, "Records": []}, context)
+
+    assert result["body"] == "Nothing to transform."
+    assert keys(s3_client) == [
+        "diagnostics/transform/req-2.allocations.txt",
+        "diagnostics/transform/req-2.pstats",
+    ]
+
+
+def test_other_invocations_save_nothing(s3_client):
+    lambda_handler({"Records": []}, None)
+
+    assert keys(s3_client) == []
+
+
+def test_profiled_invocations_run_thread_pool_work_in_the_profiled_thread(s3_client):
+    @profiled(BUCKET, lambda: s3_client)
+    def handler(event, context):
+        return map_concurrently(lambda _: threading.get_ident(), range(4), 4)
+
+    assert handler({"profile": True}, None) == [threading.get_ident()] * 4
+    stats = marshal.loads(
+        s3_client.get_object(
+            Bucket=BUCKET,
+            Key=[key for key in keys(s3_client) if key.endswith(".pstats")][0],
+        )["Body"].read()
+    )
+    assert "<lambda>" in {name for _, _, name in stats}
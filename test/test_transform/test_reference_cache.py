@@ -0,0 +1,117 @@
+from transform_utils import load_cached_object, load_raw_data, clear_reference_cache
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import os
+import transform_utils
+
+
+def put(s3_client, key, body):
+    etag = s3_client.put_object(Bucket="ingested", Key=key, Body=body)["ETag"]
+    return {"Key": key, "ETag": etag}
+
+
+def test_unchanged_objects_are_not_downloaded_again(s3_client):
+    file = put(s3_client, "department/a.csv", b"department_id\n1\n")
+    load_cached_object("ingested", file)
+
+    with patch("transform_utils.load_object") as load_object:
+        df = load_cached_object("ingested", file)
+
+    load_object.assert_not_called()
+    assert df["department_id"].tolist() == [1]
+
+
+def test_objects_spilled_to_tmp_survive_memory_eviction(s3_client):
+    file = put(s3_client, "department/a.csv", b"department_id\n1\n")
+    load_cached_object("ingested", file)
+    clear_reference_cache()
+
+    with patch("transform_utils.load_object") as load_object:
+        df = load_cached_object("ingested", file)
+
+    load_object.assert_not_called()
+    assert df["department_id"].tolist() == [1]
+
+
+def test_changed_etag_reloads_the_object(s3_client):
+    load_cached_object("ingested", put(s3_client, "department/a.csv", b"id\n1\n"))
+
+    df = load_cached_object("ingested", put(s3_client, "department/a.csv", b"id\n2\n"))
+
+    assert df["id"].tolist() == [2]
+
+
+def test_cached_frames_are_not_changed_by_callers(s3_client):
+    file = put(s3_client, "department/a.csv", b"id\n1\n")
+    df = load_cached_object("ingested", file)
+    df["extra"] = 1
+
+    assert load_cached_object("ingested", file).columns.tolist() == ["id"]
+
+
+def test_memory_cache_is_bounded(s3_client, monkeypatch):
+    monkeypatch.setenv("REFERENCE_CACHE_MEMORY_MB", "0")
+    for name in "abc":
+        load_cached_object(
+            "ingested", put(s3_client, f"department/{name}.csv", b"id\n1\n")
+        )
+
+    assert len(transform_utils._reference_cache) == 1
+
+
+def test_disk_cache_evicts_least_recently_used_files(s3_client, monkeypatch):
+    monkeypatch.setenv("REFERENCE_CACHE_DISK_MB", "0")
+    for name in "abc":
+        load_cached_object(
+            "ingested", put(s3_client, f"department/{name}.csv", b"id\n1\n")
+        )
+
+    assert len(os.listdir(transform_utils.REFERENCE_CACHE_DIR)) == 1
+
+
+def test_only_reference_tables_are_cached(s3_client):
+    put(s3_client, "department/a.csv", b"department_id\n1\n")
+    put(s3_client, "staff/a.csv", b"staff_id\n1\n")
+
+    load_raw_data(
+        [
+            {"bucket": "ingested", "key": "department/"},
+            {"bucket": "ingested", "key": "staff/"},
+        ]
+    )
+
+    assert len(os.listdir(transform_utils.REFERENCE_CACHE_DIR)) == 1
+
+
+def test_unreadable_cached_files_are_loaded_from_s3_again(s3_client):
+    file = put(s3_client, "department/a.csv", b"id\n1\n")
+    load_cached_object("ingested", file)
+    clear_reference_cache()
+    [name] = os.listdir(transform_utils.REFERENCE_CACHE_DIR)
+    with open(os.path.join(transform_utils.REFERENCE_CACHE_DIR, name), "wb") as spill:
+        spill.write(b"PAR1 truncated")
+
+    df = load_cached_object("ingested", file)
+
+    assert df["id"].tolist() == [1]
+    clear_reference_cache()
+    assert load_cached_object("ingested", file)["id"].tolist() == [1]
+
+
+def test_concurrent_loads_share_the_disk_cache_safely(s3_client, monkeypatch):
+    monkeypatch.setenv("REFERENCE_CACHE_DISK_MB", "0")
+    files = [
+        put(s3_client, f"department/{i}.csv", f"id\n{i}\n".encode()) for i in range(16)
+    ]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        frames = list(
+            executor.map(lambda file: load_cached_object("ingested", file), files * 2)
+        )
+
+    assert [frame["id"].tolist() for frame in frames] == [[i] for i in range(16)] * 2
+    assert not [
+        name
+        for name in os.listdir(transform_utils.REFERENCE_CACHE_DIR)
+        if name.endswith(".tmp")
+    ]
@@ -0,0 +1,142 @@
+from transform_utils import (
+    save_to_s3,
+    time_of_day,
+    write_parquet_to_s3,
+)
+from lambda_utils import MultipartUploadWriter
+from unittest.mock import patch
+import io
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+BUCKET = "will-processed-data-bucket"
+
+
+def keys(s3_client):
+    return [obj["Key"] for obj in s3_client.list_objects_v2(Bucket=BUCKET)["Contents"]]
+
+
+def read_parquet_file(s3_client, key):
+    return pq.ParquetFile(
+        io.BytesIO(s3_client.get_object(Bucket=BUCKET, Key=key)["Body"].read())
+    )
+
+
+def fact(ids, created, updated):
+    updated = pd.to_datetime(pd.Series(updated))
+    return pd.DataFrame(
+        {
+            "sales_order_id": ids,
+            "created_date": pd.to_datetime(created),
+            "last_updated_date": updated.dt.normalize(),
+            "last_updated_time": time_of_day(updated),
+        }
+    )
+
+
+def saved_ids(s3_client):
+    return sorted(
+        sales_order_id
+        for key in keys(s3_client)
+        for sales_order_id in read_parquet_file(s3_client, key)
+        .read(columns=["sales_order_id"])
+        .column(0)
+        .to_pylist()
+    )
+
+
+def test_fact_rows_are_partitioned_by_date(s3_client):
+    save_to_s3(
+        fact(
+            [1, 2, 3],
+            ["2024-01-02", "2024-01-01", None],
+            ["2024-01-02 10:00"] * 3,
+        ),
+        "fact_sales_order",
+    )
+
+    partitions = sorted(key.rsplit("/", 1)[0] for key in keys(s3_client))
+    assert partitions == [
+        "fact_sales_order/year=2024/month=01/day=01",
+        "fact_sales_order/year=2024/month=01/day=02",
+        "fact_sales_order/year=__HIVE_DEFAULT_PARTITION__",
+    ]
+
+
+def test_reloaded_fact_rows_are_not_saved_again(s3_client):
+    save_to_s3(
+        fact([1, 2], ["2024-01-01", "2024-01-02"], ["2024-01-03 10:00"] * 2),
+        "fact_sales_order",
+    )
+
+    save_to_s3(
+        fact(
+            [1, 2, 1],
+            ["2024-01-01", "2024-01-02", "2024-01-01"],
+            ["2024-01-03 10:00", "2024-01-03 10:00", "2024-01-04 09:30"],
+        ),
+        "fact_sales_order",
+    )
+
+    assert saved_ids(s3_client) == [1, 1, 2]
+    assert len(keys(s3_client)) == 3
+
+
+def test_outputs_without_partition_column_use_the_run_date(s3_client):
+    save_to_s3(pd.DataFrame({"id": [1]}), "other_table")
+
+    assert keys(s3_client)[0].startswith("other_table/year=")
+
+
+def test_row_groups_carry_statistics(s3_client, monkeypatch):
+    monkeypatch.setenv("PARQUET_ROW_GROUP_SIZE", "2")
+    write_parquet_to_s3(pd.DataFrame({"id": [1, 2, 3, 4, 5]}), BUCKET, "t.parquet")
+
+    metadata = read_parquet_file(s3_client, "t.parquet").metadata
+    assert metadata.num_row_groups == 3
+    stats = metadata.row_group(1).column(0).statistics
+    assert (stats.min, stats.max) == (3, 4)
+
+
+def test_dictionary_encoding_can_be_limited_to_columns(s3_client, monkeypatch):
+    monkeypatch.setenv("PARQUET_DICTIONARY", "code")
+    write_parquet_to_s3(
+        pd.DataFrame({"id": [1, 2], "code": ["GBP", "GBP"]}), BUCKET, "t.parquet"
+    )
+
+    row_group = read_parquet_file(s3_client, "t.parquet").metadata.row_group(0)
+    assert "RLE_DICTIONARY" not in row_group.column(0).encodings
+    assert "RLE_DICTIONARY" in row_group.column(1).encodings
+
+
+def test_large_files_are_uploaded_in_parts(s3_client):
+    writer = MultipartUploadWriter(
+        s3_client, BUCKET, "big.bin", part_size=5 * 1024 * 1024
+    )
+    writer.write(b"a" * (5 * 1024 * 1024))
+    writer.write(b"b")
+    writer.close()
+
+    assert len(writer.parts) == 2
+    body = s3_client.get_object(Bucket=BUCKET, Key="big.bin")["Body"].read()
+    assert len(body) == 5 * 1024 * 1024 + 1
+
+
+def test_failed_writes_abort_the_upload(s3_client):
+    with patch("pyarrow.parquet.ParquetWriter.write_table", side_effect=ValueError):
+        with pytest.raises(ValueError):
+            write_parquet_to_s3(pd.DataFrame({"id": [1]}), BUCKET, "t.parquet")
+
+    assert "Contents" not in s3_client.list_objects_v2(Bucket=BUCKET)
+
+
+def test_abort_discards_uploaded_parts(s3_client):
+    writer = MultipartUploadWriter(
+        s3_client, BUCKET, "big.bin", part_size=5 * 1024 * 1024
+    )
+    writer.write(b"a" * (5 * 1024 * 1024))
+    writer.abort()
+
+    assert "Uploads" not in s3_client.list_multipart_uploads(Bucket=BUCKET)
+    assert "Contents" not in s3_client.list_objects_v2(Bucket=BUCKET)
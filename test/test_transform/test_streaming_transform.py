@@ -0,0 +1,159 @@
+from transform_utils import (
+    iter_object_chunks,
+    stream_dimension,
+    stream_transformations,
+    load_dimension_snapshot,
+    upsert_dimension,
+)
+from unittest.mock import patch
+import gzip
+import io
+import pandas as pd
+import pytest
+import zstandard
+
+
+CURRENCY_CSV = (
+    b"currency_id,currency_code,description,last_updated,created_at\n"
+    b"1,GBP,Pound,2024-01-01 00:00:00,x\n"
+    b"2,USD,Dollar,2024-01-01 00:00:00.5,x\n"
+    b"3,EUR,Euro,2024-01-01 00:00:00,x\n"
+    b"1,GBP,Pound sterling,2024-01-02 00:00:00,x\n"
+    b"4,JPY,Yen,2024-01-01 00:00:00,x\n"
+)
+
+
+def put(s3_client, key, body):
+    s3_client.put_object(Bucket="ingested", Key=key, Body=body)
+    return {"Key": key}
+
+
+def zstd(data):
+    buffer = io.BytesIO()
+    with zstandard.ZstdCompressor().stream_writer(buffer, closefd=False) as writer:
+        writer.write(data)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    "key, body",
+    [
+        ("currency/a.csv", CURRENCY_CSV),
+        ("currency/a.csv.gz", gzip.compress(CURRENCY_CSV)),
+        ("currency/a.csv.zst", zstd(CURRENCY_CSV)),
+    ],
+)
+def test_objects_are_read_in_chunks_with_the_read_spec(s3_client, key, body):
+    put(s3_client, key, body)
+    spec = {"currency_id": "Int64", "last_updated": "datetime"}
+
+    chunks = list(iter_object_chunks("ingested", key, spec, chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[0].columns.tolist() == ["currency_id", "last_updated"]
+    assert str(chunks[0]["currency_id"].dtype) == "Int64"
+    assert pd.api.types.is_datetime64_any_dtype(chunks[0]["last_updated"])
+
+
+def test_streamed_dimension_keeps_the_latest_row_of_each_key(s3_client):
+    objects = [put(s3_client, "currency/a.csv", CURRENCY_CSV)]
+
+    with patch("transform_utils.STREAM_CHUNK_SIZE", 2):
+        stream_dimension("dim_currency", "ingested", objects)
+
+    snapshot = load_dimension_snapshot("dim_currency").sort_values("currency_id")
+    assert snapshot["currency_id"].tolist() == [1, 2, 3, 4]
+    assert snapshot["description"].tolist()[0] == "Pound sterling"
+
+
+def test_streamed_dimension_merges_into_the_snapshot(s3_client):
+    upsert_dimension(
+        pd.DataFrame(
+            {
+                "currency_id": pd.array([1, 5], dtype="Int64"),
+                "currency_code": pd.array(["GBP", "CHF"], dtype="string"),
+                "description": pd.array(["Newer pound", "Franc"], dtype="string"),
+                "last_updated": pd.to_datetime(["2024-02-01", "2024-01-01"]),
+            }
+        ),
+        "dim_currency",
+    )
+    objects = [put(s3_client, "currency/a.csv", CURRENCY_CSV)]
+
+    stream_dimension("dim_currency", "ingested", objects)
+
+    snapshot = load_dimension_snapshot("dim_currency").sort_values("currency_id")
+    assert snapshot["currency_id"].tolist() == [1, 2, 3, 4, 5]
+    assert snapshot["description"].tolist()[0] == "Newer pound"
+
+
+def test_only_outputs_with_unshared_sources_are_streamed(s3_client):
+    put(s3_client, "currency/a.csv", CURRENCY_CSV)
+    files = [
+        {"bucket": "ingested", "key": "currency/"},
+        {"bucket": "ingested", "key": "staff/"},
+    ]
+
+    outputs, remaining, _ = stream_transformations(["dim_staff", "dim_currency"], files)
+
+    assert outputs == ["dim_staff"]
+    assert remaining == [{"bucket": "ingested", "key": "staff/"}]
+    assert len(load_dimension_snapshot("dim_currency")) == 4
+
+
+def test_streamed_chunks_and_old_snapshots_share_one_schema(s3_client):
+    old_snapshot = io.BytesIO()
+    pd.DataFrame(
+        {
+            "currency_id": [999],
+            "currency_code": pd.Series(["OLD"], dtype="category"),
+            "description": ["Legacy"],
+            "last_updated": pd.to_datetime(["2024-01-01"]),
+        }
+    ).to_parquet(old_snapshot, index=False)
+    s3_client.put_object(
+        Bucket="will-processed-data-bucket",
+        Key="dim_currency/old.parquet",
+        Body=old_snapshot.getvalue(),
+    )
+    s3_client.put_object(
+        Bucket="will-processed-data-bucket",
+        Key="dim_currency/_snapshot.json",
+        Body='{"snapshot": "dim_currency/old.parquet"}',
+    )
+    rows = b"".join(
+        f"{i},C{i},Currency {i},2024-01-01 00:00:00\n".encode() for i in range(300)
+    )
+    header = b"currency_id,currency_code,description,last_updated\n"
+    objects = [
+        put(s3_client, "currency/a.csv", header + rows[: rows.index(b"\n") + 1]),
+        put(s3_client, "currency/b.csv", header + rows),
+    ]
+
+    stream_dimension("dim_currency", "ingested", objects)
+
+    snapshot = load_dimension_snapshot("dim_currency")
+    assert len(snapshot) == 301
+    assert set(snapshot["currency_code"]) >= {"OLD", "C0", "C299"}
+
+
+def test_snapshot_saved_before_last_updated_is_merged(s3_client):
+    s3_client.put_object(
+        Bucket="will-processed-data-bucket",
+        Key="dim_currency/2024/01/01/dim_currency.parquet",
+        Body=pd.DataFrame(
+            {
+                "currency_id": [1, 9],
+                "currency_code": ["GBP", "AUD"],
+                "description": ["Old pound", "Dollar"],
+            }
+        ).to_parquet(index=False),
+    )
+    objects = [put(s3_client, "currency/a.csv", CURRENCY_CSV)]
+
+    stream_dimension("dim_currency", "ingested", objects)
+
+    snapshot = load_dimension_snapshot("dim_currency").sort_values("currency_id")
+    assert snapshot["currency_id"].tolist() == [1, 2, 3, 4, 9]
+    assert snapshot["description"].tolist()[0] == "Pound sterling"
+    assert snapshot["last_updated"].isna().tolist() == [False] * 4 + [True]
@@ -0,0 +1,105 @@
+from transform_utils import (
+    load_table_from_s3,
+    perform_transformations,
+    save_to_s3,
+    stream_dimension,
+    time_of_day,
+)
+import json
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def lambda_environment(monkeypatch):
+    monkeypatch.setenv("EMF_METRICS", "true")
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_NAME", "transform")
+
+
+def metric_lines(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_loading_a_table_reports_its_rows_and_bytes(s3_client, capsys):
+    s3_client.put_object(Bucket="test-bucket", Key="staff/a.csv", Body=b"id\n1\n2\n")
+
+    df = load_table_from_s3("test-bucket", "staff/a.csv")
+
+    [line] = metric_lines(capsys)
+    assert (line["Function"], line["Stage"], line["Table"]) == (
+        "transform",
+        "load_table_from_s3",
+        "staff",
+    )
+    assert line["Rows"] == 2
+    assert line["Bytes"] == df.memory_usage(index=False).sum()
+    assert line["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [
+        ["Function", "Stage", "Table"]
+    ]
+
+
+def test_each_transformation_is_reported_under_its_output(s3_client, capsys):
+    currency = pd.DataFrame(
+        {
+            "currency_id": [1, 2],
+            "currency_code": ["GBP", "EUR"],
+            "description": ["Pound", "Euro"],
+            "last_updated": pd.to_datetime(["2024-01-01", "2024-01-01"]),
+        }
+    )
+
+    perform_transformations({"currency": currency}, ["dim_currency"])
+
+    [line] = metric_lines(capsys)
+    assert (line["Stage"], line["Table"], line["Rows"]) == (
+        "transform",
+        "dim_currency",
+        2,
+    )
+    assert {
+        metric["Name"] for metric in line["_aws"]["CloudWatchMetrics"][0]["Metrics"]
+    } == {
+        "Duration",
+        "Rows",
+        "Bytes",
+        "PeakMemory",
+    }
+
+
+def test_saving_a_fact_table_reports_once_for_all_partitions(s3_client, capsys):
+    fact = pd.DataFrame(
+        {
+            "sales_order_id": [1, 2],
+            "created_date": pd.to_datetime(["2024-01-02", "2024-01-01"]),
+            "last_updated_date": pd.to_datetime(["2024-01-02", "2024-01-01"]),
+            "last_updated_time": time_of_day(
+                pd.to_datetime(pd.Series(["2024-01-02 10:00", "2024-01-01 10:00"]))
+            ),
+        }
+    )
+
+    save_to_s3(fact, "fact_sales_order")
+
+    [line] = metric_lines(capsys)
+    assert (line["Stage"], line["Table"], line["Rows"]) == (
+        "save_to_s3",
+        "fact_sales_order",
+        2,
+    )
+
+
+def test_streamed_dimensions_report_the_transform_stage(s3_client, capsys):
+    s3_client.put_object(
+        Bucket="test-bucket",
+        Key="currency/a.csv",
+        Body=b"currency_id,currency_code,description,last_updated\n"
+        b"1,GBP,Pound,2024-01-01\n2,EUR,Euro,2024-01-01\n",
+    )
+
+    stream_dimension("dim_currency", "test-bucket", [{"Key": "currency/a.csv"}])
+
+    lines = {line["Stage"]: line for line in metric_lines(capsys)}
+    assert lines["transform"]["Table"] == "dim_currency"
+    assert lines["transform"]["Rows"] == 2
+    assert lines["transform"]["Bytes"] > 0
+    assert lines["upsert_dimension"]["Rows"] == 2
@@ -0,0 +1,147 @@
+from transform_utils import (
+    plan_transformations,
+    perform_transformations,
+    load_dimension_snapshot,
+)
+from transform import lambda_handler
+from unittest.mock import patch
+import pandas as pd
+import pytest
+
+
+def event_for(*keys):
+    return [{"bucket": "ingested", "key": key} for key in keys]
+
+
+def test_event_for_one_table_plans_only_its_outputs():
+    outputs, files = plan_transformations(event_for("currency/2024/01/01/a.csv"))
+
+    assert outputs == ["dim_currency"]
+    assert files == event_for("currency/2024/01/01/a.csv")
+
+
+def test_missing_sources_are_read_in_full():
+    outputs, files = plan_transformations(event_for("department/2024/01/01/a.csv"))
+
+    assert outputs == ["dim_staff"]
+    assert files == [
+        {"bucket": "ingested", "key": "department/"},
+        {"bucket": "will-ingested-data-bucket", "key": "staff/"},
+    ]
+
+
+def test_lookup_tables_are_read_in_full_with_a_table_delta():
+    outputs, files = plan_transformations(
+        event_for("staff/2024/01/02/a.csv", "currency/2024/01/02/a.csv")
+    )
+
+    assert outputs == ["dim_staff", "dim_currency"]
+    assert files == event_for("staff/2024/01/02/a.csv", "currency/2024/01/02/a.csv") + [
+        {"bucket": "will-ingested-data-bucket", "key": "department/"}
+    ]
+
+
+def test_lookup_table_delta_reads_the_table_it_is_joined_onto_in_full():
+    _, files = plan_transformations(
+        event_for("staff/2024/01/02/a.csv", "department/2024/01/02/a.csv")
+    )
+
+    assert files == event_for("department/", "staff/")
+
+
+def test_unused_tables_are_not_loaded():
+    outputs, files = plan_transformations(
+        event_for("purchase_order/a.csv", "design/a.csv", "initial_extract/")
+    )
+
+    assert outputs == []
+    assert files == []
+
+
+def test_outputs_built_from_other_outputs_run_after_them():
+    calls = []
+
+    def build_base(table):
+        calls.append("base")
+        return table.assign(doubled=table["id"] * 2)
+
+    def build_derived(base):
+        calls.append("derived")
+        return base[["doubled"]]
+
+    transformations = {
+        "derived": (build_derived, ["base"]),
+        "base": (build_base, ["table"]),
+    }
+    with patch("transform_utils.TRANSFORMATIONS", transformations):
+        assert plan_transformations(event_for("table/a.csv"))[0] == ["derived", "base"]
+        result = perform_transformations(
+            {"table": pd.DataFrame({"id": [1, 2]})}, ["derived"]
+        )
+
+    assert calls == ["base", "derived"]
+    assert result["derived"]["doubled"].tolist() == [2, 4]
+
+
+def test_dependency_cycles_are_rejected():
+    transformations = {"a": (lambda b: b, ["b"]), "b": (lambda a: a, ["a"])}
+    with patch("transform_utils.TRANSFORMATIONS", transformations):
+        with pytest.raises(ValueError):
+            perform_transformations({}, ["a"])
+
+
+def test_currency_event_rebuilds_only_dim_currency(s3_client):
+    s3_client.put_object(
+        Bucket="will-ingested-data-bucket",
+        Key="currency/2024/01/01/a.csv",
+        Body=b"currency_id,currency_code,description\n1,GBP,Pound\n",
+    )
+    s3_client.put_object(
+        Bucket="will-ingested-data-bucket",
+        Key="address/2024/01/01/a.csv",
+        Body=b"address_id\n1\n",
+    )
+    event = {
+        "Records": [
+            {
+                "s3": {
+                    "bucket": {"name": "will-ingested-data-bucket"},
+                    "object": {"key": "currency/2024/01/01/a.csv"},
+                }
+            }
+        ]
+    }
+
+    lambda_handler(event, None)
+
+    saved = s3_client.list_objects_v2(Bucket="will-processed-data-bucket")["Contents"]
+    assert {obj["Key"].split("/")[0] for obj in saved} == {"dim_currency"}
+
+
+def test_department_delta_keeps_the_department_of_other_staff(s3_client):
+    for key, body in {
+        "staff/2024/01/01/a.csv": (
+            b"staff_id,first_name,last_name,department_id,email_address,last_updated\n"
+            b"1,Ann,Lee,1,a@t.com,2024-01-01\n2,Bob,Ray,2,b@t.com,2024-01-01\n"
+        ),
+        "department/2024/01/01/a.csv": b"department_id,department_name,location,manager\n"
+        b"1,Sales,Leeds,Cy\n2,Finance,York,Di\n",
+        "department/2024/01/02/a.csv": b"department_id,department_name,location,manager\n"
+        b"1,Sales,Hull,Cy\n",
+    }.items():
+        s3_client.put_object(Bucket="will-ingested-data-bucket", Key=key, Body=body)
+    event = {
+        "Records": [
+            {
+                "s3": {
+                    "bucket": {"name": "will-ingested-data-bucket"},
+                    "object": {"key": "department/2024/01/02/a.csv"},
+                }
+            }
+        ]
+    }
+
+    lambda_handler(event, None)
+
+    dim_staff = load_dimension_snapshot("dim_staff")
+    assert dim_staff["location"].tolist() == ["Hull", "York"]
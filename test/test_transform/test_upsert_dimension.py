@@ -0,0 +1,125 @@
+from transform_utils import (
+    merge_dimension,
+    upsert_dimension,
+    load_dimension_snapshot,
+    current_snapshot_key,
+    load_snapshot_manifest,
+)
+from unittest.mock import patch
+import io
+import json
+import pandas as pd
+
+BUCKET = "will-processed-data-bucket"
+
+
+def currency(ids, codes, updated=None):
+    df = pd.DataFrame({"currency_id": ids, "currency_code": codes})
+    if updated is not None:
+        df["last_updated"] = pd.to_datetime(updated)
+    return df
+
+
+def test_merge_upserts_on_the_natural_key():
+    merged = merge_dimension(
+        currency([1, 2], ["GBP", "USD"]),
+        currency([2, 3], ["EUR", "JPY"]),
+        ["currency_id"],
+    )
+
+    assert merged.to_dict("list") == {
+        "currency_id": [1, 2, 3],
+        "currency_code": ["GBP", "EUR", "JPY"],
+    }
+
+
+def test_merge_keeps_the_latest_last_updated():
+    snapshot = currency([1, 2], ["GBP", "USD"], ["2024-01-02", "2024-01-01"])
+    batch = currency([1, 2], ["OLD", "NEW"], ["2024-01-01", "2024-01-02"])
+
+    merged = merge_dimension(snapshot, batch, ["currency_id"])
+
+    assert merged["currency_code"].tolist() == ["GBP", "NEW"]
+
+
+def test_merge_prefers_the_batch_on_equal_last_updated():
+    snapshot = currency([1], ["GBP"], ["2024-01-01"])
+    batch = currency([1], ["EUR"], ["2024-01-01"])
+
+    assert merge_dimension(snapshot, batch, ["currency_id"])[
+        "currency_code"
+    ].tolist() == ["EUR"]
+
+
+def test_first_upsert_publishes_the_batch(s3_client):
+    key = upsert_dimension(currency([1], ["GBP"]), "dim_currency")
+
+    assert current_snapshot_key("dim_currency") == key
+    assert load_dimension_snapshot("dim_currency")["currency_id"].tolist() == [1]
+
+
+def test_upserts_accumulate_into_a_complete_snapshot(s3_client):
+    first = upsert_dimension(currency([1, 2], ["GBP", "USD"]), "dim_currency")
+    second = upsert_dimension(currency([2, 3], ["EUR", "JPY"]), "dim_currency")
+
+    assert first != second
+    assert load_dimension_snapshot("dim_currency").to_dict("list") == {
+        "currency_id": [1, 2, 3],
+        "currency_code": ["GBP", "EUR", "JPY"],
+    }
+    manifest = json.loads(
+        s3_client.get_object(Bucket=BUCKET, Key="dim_currency/_snapshot.json")[
+            "Body"
+        ].read()
+    )
+    assert manifest == {"snapshot": second, "previous": first, "rows": 3}
+
+
+def test_only_the_current_and_previous_snapshots_are_kept(s3_client):
+    first = upsert_dimension(currency([1], ["GBP"]), "dim_currency")
+    second = upsert_dimension(currency([2], ["USD"]), "dim_currency")
+    third = upsert_dimension(currency([3], ["JPY"]), "dim_currency")
+
+    parquet_keys = [
+        obj["Key"]
+        for obj in s3_client.list_objects_v2(Bucket=BUCKET)["Contents"]
+        if obj["Key"].endswith(".parquet")
+    ]
+    assert first not in parquet_keys
+    assert sorted(parquet_keys) == sorted([second, third])
+    assert load_dimension_snapshot("dim_currency")["currency_id"].tolist() == [1, 2, 3]
+
+
+def test_snapshots_saved_before_manifests_are_merged(s3_client):
+    buffer = io.BytesIO()
+    currency([1], ["GBP"]).to_parquet(buffer, index=False)
+    s3_client.put_object(
+        Bucket=BUCKET,
+        Key="dim_currency/2024/01/01/dim_currency.parquet",
+        Body=buffer.getvalue(),
+    )
+
+    upsert_dimension(currency([2], ["USD"]), "dim_currency")
+
+    assert load_dimension_snapshot("dim_currency")["currency_id"].tolist() == [1, 2]
+
+
+def test_upsert_is_redone_when_another_run_publishes_first(s3_client):
+    upsert_dimension(currency([1], ["GBP"]), "dim_currency")
+    original = load_snapshot_manifest("dim_currency")
+    upsert_dimension(currency([2], ["USD"]), "dim_currency")
+    concurrent = load_snapshot_manifest("dim_currency")
+    manifests = iter([original, concurrent, concurrent, concurrent])
+
+    with patch("transform_utils.load_snapshot_manifest", lambda table: next(manifests)):
+        upsert_dimension(currency([3], ["JPY"]), "dim_currency")
+
+    assert load_dimension_snapshot("dim_currency")["currency_id"].tolist() == [1, 2, 3]
+    parquet_keys = [
+        obj["Key"]
+        for obj in s3_client.list_objects_v2(Bucket=BUCKET)["Contents"]
+        if obj["Key"].endswith(".parquet")
+    ]
+    assert sorted(parquet_keys) == sorted(
+        [concurrent["snapshot"], current_snapshot_key("dim_currency")]
+    )